@@ -0,0 +1,86 @@
+"""add full-text search column to historico_mensagem
+
+Revision ID: 3c7a9e1b5d42
+Revises: 8d4e2a6c1f90
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7a9e1b5d42'
+down_revision: Union[str, Sequence[str], None] = '8d4e2a6c1f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Linhas atualizadas por transação no backfill (evita um UPDATE gigante segurando locks)
+TAMANHO_LOTE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Configuração de busca em português que ignora acentos ("pressao" acha "pressão")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'portugues_unaccent') THEN
+                CREATE TEXT SEARCH CONFIGURATION portugues_unaccent (COPY = portuguese);
+                ALTER TEXT SEARCH CONFIGURATION portugues_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+            END IF;
+        END
+        $$
+    """)
+
+    op.add_column('historico_mensagem', sa.Column('mensagem_tsv', postgresql.TSVECTOR(), nullable=True))
+
+    # Trigger mantém o tsvector das mensagens novas; as antigas entram no backfill abaixo
+    op.execute("""
+        CREATE OR REPLACE FUNCTION historico_mensagem_tsv_atualizar() RETURNS trigger AS $$
+        BEGIN
+            NEW.mensagem_tsv := to_tsvector('portugues_unaccent', coalesce(NEW.mensagem_texto, ''));
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER historico_mensagem_tsv_atualizar
+        BEFORE INSERT OR UPDATE OF mensagem_texto ON historico_mensagem
+        FOR EACH ROW EXECUTE FUNCTION historico_mensagem_tsv_atualizar()
+    """)
+
+    with op.get_context().autocommit_block():
+        conexao = op.get_bind()
+        while True:
+            resultado = conexao.execute(sa.text("""
+                UPDATE historico_mensagem
+                SET mensagem_tsv = to_tsvector('portugues_unaccent', coalesce(mensagem_texto, ''))
+                WHERE id_historico IN (
+                    SELECT id_historico FROM historico_mensagem
+                    WHERE mensagem_tsv IS NULL
+                    LIMIT :lote
+                )
+            """), {"lote": TAMANHO_LOTE})
+            if resultado.rowcount < TAMANHO_LOTE:
+                break
+
+        op.create_index(
+            'ix_historico_mensagem_tsv', 'historico_mensagem', ['mensagem_tsv'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_historico_mensagem_tsv', table_name='historico_mensagem', postgresql_concurrently=True, if_exists=True)
+    op.execute("DROP TRIGGER IF EXISTS historico_mensagem_tsv_atualizar ON historico_mensagem")
+    op.execute("DROP FUNCTION IF EXISTS historico_mensagem_tsv_atualizar()")
+    op.drop_column('historico_mensagem', 'mensagem_tsv')
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS portugues_unaccent")
@@ -0,0 +1,35 @@
+"""add hash_conteudo and tamanho_bytes to documentos
+
+Revision ID: 3c9e5a7b1f08
+Revises: 7f3b1d5e9c24
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e5a7b1f08'
+down_revision: Union[str, Sequence[str], None] = '7f3b1d5e9c24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # sha256 calculado durante o upload; documentos antigos ficam sem hash até serem reenviados
+    op.add_column('documentos', sa.Column('hash_conteudo', sa.String(length=64), nullable=True))
+    op.add_column('documentos', sa.Column('tamanho_bytes', sa.BigInteger(), nullable=True))
+    # Único: dois uploads simultâneos do mesmo arquivo não viram duas linhas
+    op.create_index('ux_documentos_hash_conteudo', 'documentos', ['hash_conteudo'], unique=True,
+                    postgresql_where=sa.text('hash_conteudo IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_documentos_hash_conteudo', table_name='documentos', postgresql_where=sa.text('hash_conteudo IS NOT NULL'))
+    op.drop_column('documentos', 'tamanho_bytes')
+    op.drop_column('documentos', 'hash_conteudo')
@@ -0,0 +1,43 @@
+"""create conhecimento_web
+
+Revision ID: 5b1f0c3a9d27
+Revises: cc777d3f77f2
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c3a9d27'
+down_revision: Union[str, Sequence[str], None] = 'cc777d3f77f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('conhecimento_web',
+    sa.Column('id_conhecimento', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('pergunta', sa.Text(), nullable=False),
+    sa.Column('consulta_normalizada', sa.Text(), nullable=False),
+    sa.Column('conteudo', sa.Text(), nullable=False),
+    sa.Column('fontes', postgresql.ARRAY(sa.Text()), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('data_criacao', sa.DateTime(), nullable=True),
+    sa.Column('data_revisao', sa.DateTime(), nullable=True),
+    sa.Column('id_revisor', sa.UUID(), nullable=True),
+    sa.ForeignKeyConstraint(['id_revisor'], ['usuarios.id_usuario'], ),
+    sa.PrimaryKeyConstraint('id_conhecimento')
+    )
+    op.create_index(op.f('ix_conhecimento_web_consulta_normalizada'), 'conhecimento_web', ['consulta_normalizada'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_conhecimento_web_consulta_normalizada'), table_name='conhecimento_web')
+    op.drop_table('conhecimento_web')
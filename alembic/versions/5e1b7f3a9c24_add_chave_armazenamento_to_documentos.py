@@ -0,0 +1,29 @@
+"""add chave_armazenamento to documentos
+
+Revision ID: 5e1b7f3a9c24
+Revises: 9d4a2c6e8b13
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1b7f3a9c24'
+down_revision: Union[str, Sequence[str], None] = '9d4a2c6e8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Documentos existentes ficam sem chave e continuam lidos de app/base_conhecimento/<nome_arquivo>
+    op.add_column('documentos', sa.Column('chave_armazenamento', sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('documentos', 'chave_armazenamento')
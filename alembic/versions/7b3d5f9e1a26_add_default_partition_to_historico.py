@@ -0,0 +1,35 @@
+"""add default partition to historico_mensagem
+
+Revision ID: 7b3d5f9e1a26
+Revises: 5e1b7f3a9c24
+Create Date: 2026-10-20 09:00:00.000000
+
+Sem ela, se a manutenção de app/services/partition_service.py ficar parada além da folga de
+partições futuras, todo INSERT no histórico falha com "no partition of relation found for row".
+As linhas que caírem aqui voltam para a partição do mês quando a manutenção a criar.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3d5f9e1a26'
+down_revision: Union[str, Sequence[str], None] = '5e1b7f3a9c24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE TABLE historico_mensagem_default PARTITION OF historico_mensagem DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    linhas = op.get_bind().execute(sa.text("SELECT count(*) FROM historico_mensagem_default")).scalar()
+    if linhas:
+        # Apagar a DEFAULT com linhas perderia mensagens: rode a manutenção (cria as partições e as move) antes
+        raise RuntimeError(f"historico_mensagem_default tem {linhas} mensagens; rode a manutenção das partições antes")
+    op.execute("DROP TABLE historico_mensagem_default")
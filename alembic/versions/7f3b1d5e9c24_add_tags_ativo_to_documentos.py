@@ -0,0 +1,32 @@
+"""add tags and ativo to documentos
+
+Revision ID: 7f3b1d5e9c24
+Revises: e2b7d9f1a3c5
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3b1d5e9c24'
+down_revision: Union[str, Sequence[str], None] = 'e2b7d9f1a3c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Vão também para os metadados dos chunks no Chroma, onde filtram a busca vetorial
+    op.add_column('documentos', sa.Column('tags', postgresql.ARRAY(sa.String(length=50)), server_default='{}', nullable=False))
+    op.add_column('documentos', sa.Column('ativo', sa.Boolean(), server_default=sa.true(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('documentos', 'ativo')
+    op.drop_column('documentos', 'tags')
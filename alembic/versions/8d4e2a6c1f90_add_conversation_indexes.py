@@ -0,0 +1,40 @@
+"""add composite indexes for conversation queries
+
+Revision ID: 8d4e2a6c1f90
+Revises: 5b1f0c3a9d27
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e2a6c1f90'
+down_revision: Union[str, Sequence[str], None] = '5b1f0c3a9d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação; não bloqueia escritas nas tabelas
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_historico_mensagem_conversa_data_hora', 'historico_mensagem',
+            ['id_conversa', 'data_hora', 'id_historico'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_conversas_usuario_ultima_msg', 'conversas',
+            ['id_usuario', 'data_ultima_msg', 'id_conversa'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_conversas_usuario_ultima_msg', table_name='conversas', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_historico_mensagem_conversa_data_hora', table_name='historico_mensagem', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""add catalog columns to documentos
+
+Revision ID: 9d4a2c6e8b13
+Revises: 3c9e5a7b1f08
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a2c6e8b13'
+down_revision: Union[str, Sequence[str], None] = '3c9e5a7b1f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Preenchidos pela indexação; documentos existentes ficam "pendente" até o próximo /reindex
+    op.add_column('documentos', sa.Column('paginas', sa.Integer(), nullable=True))
+    op.add_column('documentos', sa.Column('chunks', sa.Integer(), nullable=True))
+    op.add_column('documentos', sa.Column('status_indexacao', sa.String(length=20), server_default='pendente', nullable=False))
+    op.add_column('documentos', sa.Column('data_indexacao', sa.DateTime(), nullable=True))
+    # /documents/list: ORDER BY data_criacao DESC, id_documento DESC (keyset)
+    op.create_index('ix_documentos_data_criacao', 'documentos', ['data_criacao', 'id_documento'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documentos_data_criacao', table_name='documentos')
+    op.drop_column('documentos', 'data_indexacao')
+    op.drop_column('documentos', 'status_indexacao')
+    op.drop_column('documentos', 'chunks')
+    op.drop_column('documentos', 'paginas')
@@ -0,0 +1,126 @@
+"""partition historico_mensagem by month of data_hora
+
+Revision ID: a4f6c8e0b2d1
+Revises: 3c7a9e1b5d42
+Create Date: 2026-10-19 12:00:00.000000
+
+A tabela é recriada como particionada (RANGE por data_hora, uma partição por mês) e os dados
+são copiados da tabela antiga. A cópia segura um lock exclusivo em historico_mensagem até o fim
+da migração: rodar em janela de manutenção. Partições futuras e arquivamento das antigas ficam
+com o job de app/services/partition_service.py.
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f6c8e0b2d1'
+down_revision: Union[str, Sequence[str], None] = '3c7a9e1b5d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partições criadas à frente do mês atual (o job mantém essa folga depois)
+MESES_A_FRENTE = 3
+
+COLUNAS = "id_historico, id_conversa, id_usuario, id_documento, mensagem_texto, tipo, origem_contexto, data_hora, mensagem_tsv"
+
+
+def _somar_meses(mes: date, quantidade: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + quantidade
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _criar_indices_e_trigger(tabela: str) -> None:
+    op.execute(f"CREATE INDEX ix_historico_mensagem_conversa_data_hora ON {tabela} (id_conversa, data_hora, id_historico)")
+    op.execute(f"CREATE INDEX ix_historico_mensagem_tsv ON {tabela} USING gin (mensagem_tsv)")
+    op.execute(f"""
+        CREATE TRIGGER historico_mensagem_tsv_atualizar
+        BEFORE INSERT OR UPDATE OF mensagem_texto ON {tabela}
+        FOR EACH ROW EXECUTE FUNCTION historico_mensagem_tsv_atualizar()
+    """)
+
+
+def _renomear_antiga(sufixo: str) -> None:
+    # Nomes de índice são únicos no schema: a tabela antiga libera os nomes para a nova
+    op.execute(f"ALTER TABLE historico_mensagem RENAME TO historico_mensagem_{sufixo}")
+    op.execute(f"ALTER TABLE historico_mensagem_{sufixo} RENAME CONSTRAINT historico_mensagem_pkey TO historico_mensagem_{sufixo}_pkey")
+    op.execute(f"ALTER INDEX ix_historico_mensagem_conversa_data_hora RENAME TO ix_historico_mensagem_{sufixo}_conversa_data_hora")
+    op.execute(f"ALTER INDEX ix_historico_mensagem_tsv RENAME TO ix_historico_mensagem_{sufixo}_tsv")
+    op.execute(f"DROP TRIGGER historico_mensagem_tsv_atualizar ON historico_mensagem_{sufixo}")
+
+
+def _sql_criar_tabela(data_hora: str, chave_primaria: str, sufixo: str = "") -> str:
+    return f"""
+        CREATE TABLE historico_mensagem (
+            id_historico BIGINT NOT NULL DEFAULT nextval('historico_mensagem_id_historico_seq'),
+            id_conversa BIGINT NOT NULL,
+            id_usuario UUID NOT NULL,
+            id_documento UUID,
+            mensagem_texto TEXT NOT NULL,
+            tipo VARCHAR(20),
+            origem_contexto VARCHAR(50),
+            data_hora {data_hora},
+            mensagem_tsv TSVECTOR,
+            CONSTRAINT historico_mensagem_pkey PRIMARY KEY ({chave_primaria}),
+            CONSTRAINT historico_mensagem_id_conversa_fkey FOREIGN KEY (id_conversa) REFERENCES conversas (id_conversa),
+            CONSTRAINT historico_mensagem_id_usuario_fkey FOREIGN KEY (id_usuario) REFERENCES usuarios (id_usuario),
+            CONSTRAINT historico_mensagem_id_documento_fkey FOREIGN KEY (id_documento) REFERENCES documentos (id_documento)
+        ){sufixo}
+    """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conexao = op.get_bind()
+    _renomear_antiga("legado")
+
+    # Mensagens antigas sem data_hora herdam a data de início da conversa
+    data_efetiva = "COALESCE(h.data_hora, c.data_inicio, now() AT TIME ZONE 'utc')"
+
+    op.execute(_sql_criar_tabela(
+        "TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc')",
+        "id_historico, data_hora",
+        " PARTITION BY RANGE (data_hora)",
+    ))
+
+    mes_atual = date.today().replace(day=1)
+    primeira = conexao.execute(sa.text(
+        f"SELECT min({data_efetiva}) FROM historico_mensagem_legado h LEFT JOIN conversas c USING (id_conversa)"
+    )).scalar()
+    mes = min(primeira.date().replace(day=1), mes_atual) if primeira else mes_atual
+    while mes <= _somar_meses(mes_atual, MESES_A_FRENTE):
+        seguinte = _somar_meses(mes, 1)
+        op.execute(
+            f"CREATE TABLE historico_mensagem_p{mes:%Y_%m} PARTITION OF historico_mensagem "
+            f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{seguinte.isoformat()}')"
+        )
+        mes = seguinte
+
+    # Copia antes de criar índices e trigger (o tsvector já vem calculado da tabela antiga)
+    op.execute(f"""
+        INSERT INTO historico_mensagem ({COLUNAS})
+        SELECT h.id_historico, h.id_conversa, h.id_usuario, h.id_documento, h.mensagem_texto,
+               h.tipo, h.origem_contexto, {data_efetiva}, h.mensagem_tsv
+        FROM historico_mensagem_legado h LEFT JOIN conversas c USING (id_conversa)
+    """)
+    _criar_indices_e_trigger("historico_mensagem")
+
+    op.execute("ALTER SEQUENCE historico_mensagem_id_historico_seq OWNED BY historico_mensagem.id_historico")
+    op.execute("DROP TABLE historico_mensagem_legado")
+    op.execute("ANALYZE historico_mensagem")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Só volta o que ainda está anexado: partições já arquivadas ficam nos arquivos .csv.gz
+    _renomear_antiga("particionada")
+
+    op.execute(_sql_criar_tabela("TIMESTAMP WITHOUT TIME ZONE", "id_historico"))
+    op.execute(f"INSERT INTO historico_mensagem ({COLUNAS}) SELECT {COLUNAS} FROM historico_mensagem_particionada")
+    _criar_indices_e_trigger("historico_mensagem")
+
+    op.execute("ALTER SEQUENCE historico_mensagem_id_historico_seq OWNED BY historico_mensagem.id_historico")
+    op.execute("DROP TABLE historico_mensagem_particionada")
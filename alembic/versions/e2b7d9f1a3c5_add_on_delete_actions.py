@@ -0,0 +1,42 @@
+"""add ON DELETE actions to foreign keys
+
+Revision ID: e2b7d9f1a3c5
+Revises: a4f6c8e0b2d1
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7d9f1a3c5'
+down_revision: Union[str, Sequence[str], None] = 'a4f6c8e0b2d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (constraint, tabela, coluna, tabela referenciada, coluna referenciada, ação no delete)
+CHAVES = [
+    ('historico_mensagem_id_conversa_fkey', 'historico_mensagem', 'id_conversa', 'conversas', 'id_conversa', 'CASCADE'),
+    ('historico_mensagem_id_usuario_fkey', 'historico_mensagem', 'id_usuario', 'usuarios', 'id_usuario', 'CASCADE'),
+    ('historico_mensagem_id_documento_fkey', 'historico_mensagem', 'id_documento', 'documentos', 'id_documento', 'SET NULL'),
+    ('conversas_id_usuario_fkey', 'conversas', 'id_usuario', 'usuarios', 'id_usuario', 'CASCADE'),
+    ('documentos_id_usuario_fkey', 'documentos', 'id_usuario', 'usuarios', 'id_usuario', 'CASCADE'),
+    ('conhecimento_web_id_revisor_fkey', 'conhecimento_web', 'id_revisor', 'usuarios', 'id_usuario', 'SET NULL'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # O banco apaga em lote os dependentes; o ORM não precisa mais carregar as linhas filhas
+    for nome, tabela, coluna, referencia, coluna_referencia, acao in CHAVES:
+        op.drop_constraint(nome, tabela, type_='foreignkey')
+        op.create_foreign_key(nome, tabela, referencia, [coluna], [coluna_referencia], ondelete=acao)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for nome, tabela, coluna, referencia, coluna_referencia, _ in CHAVES:
+        op.drop_constraint(nome, tabela, type_='foreignkey')
+        op.create_foreign_key(nome, tabela, referencia, [coluna], [coluna_referencia])
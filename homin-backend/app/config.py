@@ -10,13 +10,113 @@ class Settings(BaseSettings):
     db_name: str
     db_user: str
     db_password: str
+
+    # Pool de conexões do engine async (um único pool por processo)
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0  # segundos esperando uma conexão livre antes de erro
+    db_pool_recycle: int = 1800  # recicla conexões com mais de 30 min
+    db_pool_pre_ping: bool = False
+    db_statement_cache_size: int = 100  # 0 se estiver atrás de PgBouncer (modo transaction)
+    # Pool do engine síncrono (psycopg2): base vetorial pgvector, que roda em threads, e scripts
+    db_sync_pool_size: int = 5
+    db_sync_max_overflow: int = 5
+
+    # Réplica de leitura opcional para as rotas só de consulta (sem URL, tudo vai para o primário)
+    database_replica_url: str | None = None
+    # Read-your-writes: após uma escrita o cliente recebe o LSN do primário (cookie/cabeçalho assinado) e, por
+    # esse tempo, só lê da réplica que já reproduziu esse ponto do WAL
+    replica_consistencia_segundos: float = 60.0
+    replica_pausa_falha_segundos: float = 30.0  # após erro de conexão, réplica fica de fora por esse tempo
     
     # Configurações de IA
     openai_api_key: str
     
+    # Roteamento de modelos por etapa: o 1º da lista é o preferido e os seguintes são fallback (erro ou timeout)
+    modelos_classificacao: list[str] = ["gpt-4o-mini", "gpt-4o"]
+    modelos_social: list[str] = ["gpt-4o-mini", "gpt-4o"]
+    modelos_resposta_medica: list[str] = ["gpt-4o", "gpt-4o-mini"]
+    modelos_busca_web: list[str] = ["gpt-4o-mini", "gpt-4o"]
+    timeout_classificacao_segundos: float = 5.0  # por modelo tentado
+    timeout_social_segundos: float = 15.0
+    timeout_resposta_medica_segundos: float = 45.0
+    # busca_web usa o orçamento busca_web_timeout_segundos para a rota inteira
+
     # ChromaDB (banco de vetores para IA)
     chroma_db_path: str = "./banco_de_dados"
 
+    # Base vetorial: chroma, pgvector (tabela no Postgres da aplicação) ou numpy (matriz float32 em mmap)
+    vetores_backend: str = "chroma"
+    vetores_dir: str | None = None  # chroma e numpy; padrão: app/banco_de_dados
+    vetores_hnsw: bool = False  # numpy: grafo HNSW (requer hnswlib) em vez da busca exata
+    # numpy: matriz varrida em float16/int8 e/ou truncada nas primeiras N dimensões (text-embedding-3 permite);
+    # os k * reordenar melhores são reordenados com os vetores float32 (0 = não guarda os float32)
+    vetores_quantizacao: str = "float32"
+    vetores_dimensoes: int | None = None
+    vetores_reordenar: int = 4
+
+    # Busca web (DuckDuckGo) usada quando a base local não tem bons resultados
+    busca_web_cache_dir: str | None = None  # padrão: app/cache_busca_web
+    busca_web_cache_ttl_segundos: int = 60 * 60 * 24
+    busca_web_cache_memoria_max: int = 1000  # entradas em memória (LRU); o disco guarda todas
+    busca_web_timeout_segundos: float = 8.0
+    busca_web_max_concorrencia: int = 4
+
+    # Controle de admissão do chat: token bucket por usuário + gerações simultâneas com fila limitada
+    chat_limite_por_minuto: float = 20.0
+    chat_limite_rajada: int = 5
+    llm_max_concorrencia: int = 16
+    llm_fila_maxima: int = 64
+    llm_espera_maxima_segundos: float = 20.0
+
+    # Upload de documentos: gravado em blocos num arquivo temporário e movido para a base só no fim
+    upload_tamanho_maximo_mb: int = 50
+    upload_bloco_bytes: int = 1024 * 1024
+    upload_lote_maximo_arquivos: int = 200  # PDFs por chamada do upload em lote (somando os de dentro de ZIPs)
+    upload_lote_maximo_mb: int = 2048  # total de PDFs por chamada do upload em lote, já descompactados
+
+    # Armazenamento dos PDFs, endereçados pelo sha256 do conteúdo: local (pasta) ou s3 (S3/MinIO, requer boto3)
+    armazenamento_backend: str = "local"
+    armazenamento_dir: str | None = None  # local; padrão: app/base_conhecimento/objetos
+    armazenamento_leitura_memoria_mb: int = 16  # s3: PDF baixado para indexar vai para disco acima disso
+    s3_bucket: str | None = None
+    s3_prefixo: str = "documentos"
+    s3_endpoint_url: str | None = None  # ex.: "http://localhost:9000" para MinIO
+    s3_regiao: str | None = None
+    s3_access_key: str | None = None  # sem chave/segredo, usa as credenciais padrão da AWS
+    s3_secret_key: str | None = None
+
+    # Promoção de respostas da web para a base local (opt-in, passa por revisão de admin)
+    promocao_web_habilitada: bool = False
+
+    # Observabilidade: tracing do pipeline e logs estruturados
+    tracing_habilitado: bool = True
+    tracing_buffer_tamanho: int = 2000  # spans mantidos em memória para o endpoint admin
+    tracing_arquivo_jsonl: str | None = None  # ex.: "./traces.jsonl" para exportar em disco
+    log_level: str = "INFO"
+    log_formato_json: bool = True
+
+    # Paginação (keyset) das rotas de conversa e da listagem de documentos
+    # None: sem `limite` na requisição, devolve tudo (compatível com os clientes de antes da paginação)
+    paginacao_conversas_padrao: int | None = None
+    paginacao_historico_padrao: int | None = None
+    paginacao_busca_padrao: int = 50  # busca no histórico (ts_headline por linha): sempre paginada
+    paginacao_documentos_padrao: int = 50
+    paginacao_limite_maximo: int = 200
+
+    # Partições mensais do historico_mensagem e arquivamento das antigas em .csv.gz
+    historico_particoes_meses_a_frente: int = 3
+    historico_arquivamento_habilitado: bool = False
+    historico_retencao_meses: int = 12  # partições mais antigas que isso saem do banco
+    historico_arquivo_dir: str | None = None  # padrão: app/arquivo_historico
+    historico_manutencao_intervalo_horas: float = 24.0
+    historico_desanexar_lock_timeout_segundos: float = 5.0  # espera máxima pelo lock do DETACH; desiste e tenta na próxima
+
+    # Inicialização: aquecimento no lifespan (Chroma, pool HTTP da OpenAI, JWKS) e cache do JWKS
+    aquecimento_pre_conectar: bool = True  # abre as conexões com a OpenAI antes da 1ª requisição
+    aquecimento_timeout_segundos: float = 15.0  # por etapa
+    jwks_cache_ttl_segundos: int = 60 * 60
+
     # Configurações Auth0
     auth0_domain: str
     auth0_client_id: str
@@ -0,0 +1,115 @@
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+from app.config import settings
+from app.core.metrics import FILA_ADMISSAO, GERACOES_EM_ANDAMENTO, ESPERA_ADMISSAO, REJEICOES_ADMISSAO
+
+# Limites valem por processo: com N workers, a capacidade total é N vezes a configurada
+
+
+class LimitadorPorUsuario:
+    """Token bucket por usuário: `rajada` pedidos seguidos, reabastecendo `por_minuto` por minuto"""
+
+    def __init__(self, por_minuto: float, rajada: int):
+        self.taxa = por_minuto / 60.0
+        self.rajada = rajada
+        self._baldes: dict = {}  # chave -> (tokens, atualizado_em)
+
+    def consumir(self, chave) -> float:
+        """Gasta um token; retorna 0 se liberado ou os segundos até o próximo token"""
+        agora = time.monotonic()
+        tokens, atualizado_em = self._baldes.get(chave, (self.rajada, agora))
+        tokens = min(self.rajada, tokens + (agora - atualizado_em) * self.taxa)
+
+        if tokens < 1:
+            self._baldes[chave] = (tokens, agora)
+            return (1 - tokens) / self.taxa
+
+        self._baldes[chave] = (tokens - 1, agora)
+        if len(self._baldes) > 10_000:
+            self._descartar_cheios(agora)
+        return 0.0
+
+    def _descartar_cheios(self, agora: float) -> None:
+        # Balde que já reabasteceu por completo equivale a não ter entrada
+        cheio_apos = self.rajada / self.taxa
+        for chave in [c for c, (_, em) in self._baldes.items() if agora - em >= cheio_apos]:
+            del self._baldes[chave]
+
+
+class ControleAdmissao:
+    """Semáforo global de gerações com fila de espera limitada; o excesso é rejeitado com 503"""
+
+    def __init__(self, max_concorrencia: int, fila_maxima: int, espera_maxima: float):
+        self.max_concorrencia = max_concorrencia
+        self.fila_maxima = fila_maxima
+        self.espera_maxima = espera_maxima
+        self._semaforo = asyncio.Semaphore(max_concorrencia)
+        self._na_fila = 0
+        self._duracao_media = 5.0  # média móvel de uma geração, usada para sugerir o Retry-After
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._duracao_media * (self._na_fila + 1) / self.max_concorrencia))
+
+    def _rejeitar(self, motivo: str):
+        REJEICOES_ADMISSAO.labels(motivo=motivo).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serviço ocupado, tente novamente em instantes",
+            headers={"Retry-After": str(self._retry_after())},
+        )
+
+    async def _aguardar_vaga(self) -> None:
+        if not self._semaforo.locked():
+            await self._semaforo.acquire()
+            ESPERA_ADMISSAO.observe(0)
+            return
+
+        if self._na_fila >= self.fila_maxima:
+            self._rejeitar("fila_cheia")
+
+        self._na_fila += 1
+        FILA_ADMISSAO.set(self._na_fila)
+        inicio = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), timeout=self.espera_maxima)
+        except asyncio.TimeoutError:
+            self._rejeitar("tempo_esgotado")
+        finally:
+            self._na_fila -= 1
+            FILA_ADMISSAO.set(self._na_fila)
+            ESPERA_ADMISSAO.observe(time.monotonic() - inicio)
+
+    @asynccontextmanager
+    async def admitir(self):
+        await self._aguardar_vaga()
+        GERACOES_EM_ANDAMENTO.inc()
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            self._duracao_media = 0.9 * self._duracao_media + 0.1 * (time.monotonic() - inicio)
+            GERACOES_EM_ANDAMENTO.dec()
+            self._semaforo.release()
+
+
+limitador_chat = LimitadorPorUsuario(settings.chat_limite_por_minuto, settings.chat_limite_rajada)
+admissao_llm = ControleAdmissao(
+    settings.llm_max_concorrencia,
+    settings.llm_fila_maxima,
+    settings.llm_espera_maxima_segundos,
+)
+
+
+def verificar_limite_usuario(id_usuario) -> None:
+    """429 com Retry-After quando o usuário esgotou o balde de mensagens"""
+    espera = limitador_chat.consumir(id_usuario)
+    if espera > 0:
+        REJEICOES_ADMISSAO.labels(motivo="limite_usuario").inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas mensagens em pouco tempo, aguarde um instante",
+            headers={"Retry-After": str(max(1, math.ceil(espera)))},
+        )
@@ -1,23 +1,8 @@
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
-from ..config import settings
+from sqlalchemy.ext.asyncio import AsyncSession
 
-# Usar asyncpg para PostgreSQL async
-engine = create_async_engine(
-    settings.database_url.replace("postgresql://", "postgresql+asyncpg://"),
-    pool_pre_ping=True,
-    echo=False
-)
-
-AsyncSessionLocal = async_sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-    class_=AsyncSession
-)
-
-Base = declarative_base()
+# Reaproveita o engine/pool de app.database.config em vez de abrir um segundo pool
+from app.database.config import async_engine as engine, AsyncSessionLocal, Base
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependência async para obter sessão do banco"""
@@ -25,4 +10,4 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
@@ -0,0 +1,46 @@
+import json
+import logging
+from datetime import datetime, timezone
+from app.config import settings
+from app.core.tracing import trace_id_atual
+
+# Atributos padrão do LogRecord: tudo que não estiver aqui veio via `extra=` e vira campo do JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class FormatadorJson(logging.Formatter):
+    """Uma linha JSON por log, com o trace_id da requisição atual quando houver"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        trace_id = trace_id_atual()
+        if trace_id:
+            dados["trace_id"] = trace_id
+
+        for chave, valor in record.__dict__.items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                dados[chave] = valor
+
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+def configurar_logging() -> None:
+    """Configura o logger raiz da aplicação (nível e formato vêm do Settings)"""
+    handler = logging.StreamHandler()
+    if settings.log_formato_json:
+        handler.setFormatter(FormatadorJson())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+
+    logger_app = logging.getLogger("app")
+    logger_app.handlers = [handler]
+    logger_app.setLevel(settings.log_level.upper())
+    logger_app.propagate = False
@@ -0,0 +1,204 @@
+import time
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+from app.database.config import estatisticas_pool
+
+# ========== MÉTRICAS DA API ==========
+
+LATENCIA_HTTP = Histogram(
+    "homin_http_requisicao_segundos",
+    "Latência das requisições HTTP por rota",
+    ["metodo", "rota", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60),
+)
+
+LEITURAS_BANCO = Counter(
+    "homin_db_sessoes_leitura_total",
+    "Sessões das rotas só de leitura por destino",
+    ["destino"],  # replica, primario, fallback
+)
+
+INICIALIZACAO = Gauge(
+    "homin_inicializacao_segundos",
+    "Duração do import dos módulos e das etapas de aquecimento na subida",
+    ["etapa"],
+)
+
+# Folga das partições do histórico: alertar quando `homin_historico_particoes_ate_timestamp - time()` ficar
+# curta (a manutenção parou). Sem folga as mensagens caem na partição DEFAULT, que a manutenção esvazia depois.
+PARTICOES_ATE = Gauge(
+    "homin_historico_particoes_ate_timestamp",
+    "Fim (epoch) do último mês com partição do historico_mensagem criada",
+)
+
+LINHAS_PARTICAO_DEFAULT = Gauge(
+    "homin_historico_particao_default_linhas",
+    "Mensagens na partição DEFAULT do historico_mensagem na última manutenção",
+)
+
+# ========== CONTROLE DE ADMISSÃO DO CHAT ==========
+
+FILA_ADMISSAO = Gauge(
+    "homin_admissao_fila",
+    "Requisições de chat esperando vaga para gerar resposta",
+)
+
+GERACOES_EM_ANDAMENTO = Gauge(
+    "homin_admissao_em_andamento",
+    "Gerações de resposta (pipeline com LLM) rodando agora",
+)
+
+ESPERA_ADMISSAO = Histogram(
+    "homin_admissao_espera_segundos",
+    "Tempo na fila até conseguir vaga para gerar a resposta",
+    buckets=(0, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30),
+)
+
+REJEICOES_ADMISSAO = Counter(
+    "homin_admissao_rejeicoes_total",
+    "Requisições de chat rejeitadas pelo controle de admissão",
+    ["motivo"],  # limite_usuario (429), fila_cheia e tempo_esgotado (503)
+)
+
+# ========== MÉTRICAS DO PIPELINE RAG ==========
+
+CHAMADAS_LLM = Counter(
+    "homin_llm_chamadas_total",
+    "Chamadas a LLM e embeddings por modelo",
+    ["modelo", "tipo"],  # tipo: chat, embedding, agente
+)
+
+TOKENS_LLM = Counter(
+    "homin_llm_tokens_total",
+    "Tokens consumidos por modelo",
+    ["modelo", "direcao"],  # direcao: entrada, saida, entrada_cache (parte da entrada lida do cache de prompt)
+)
+
+CLASSIFICACOES = Counter(
+    "homin_classificacao_total",
+    "Distribuição das categorias do classificador",
+    ["categoria"],
+)
+
+ORIGEM_CONTEXTO = Counter(
+    "homin_origem_contexto_total",
+    "Origem do contexto usado nas respostas",
+    ["origem"],  # local, web, social, none
+)
+
+# Razão de acerto = hit / (hit + miss) no PromQL
+CACHE_CONSULTAS = Counter(
+    "homin_cache_consultas_total",
+    "Consultas aos caches da aplicação",
+    ["cache", "resultado"],  # resultado: hit, miss
+)
+
+# Roteamento de modelos: permite conferir latência e custo de cada modelo na etapa em que foi colocado
+LATENCIA_ETAPA_LLM = Histogram(
+    "homin_llm_etapa_segundos",
+    "Latência das chamadas de LLM por etapa do pipeline e modelo",
+    ["etapa", "modelo"],  # etapa: classificacao, social, resposta_medica, busca_web
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+
+CUSTO_LLM = Counter(
+    "homin_llm_custo_usd_total",
+    "Custo estimado (USD) pelos tokens informados e a tabela de preços do roteador",
+    ["etapa", "modelo"],
+)
+
+FALHAS_MODELO = Counter(
+    "homin_llm_falhas_total",
+    "Chamadas que falharam e passaram para o próximo modelo da rota",
+    ["etapa", "modelo", "motivo"],  # motivo: timeout, erro
+)
+
+DURACAO_INGESTAO = Histogram(
+    "homin_ingestao_segundos",
+    "Duração dos jobs de indexação de documentos",
+    ["resultado"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+
+
+def registrar_uso_llm(modelo: str, tipo: str, tokens_entrada: int | None = None, tokens_saida: int | None = None,
+                      tokens_cache: int | None = None) -> None:
+    CHAMADAS_LLM.labels(modelo=modelo, tipo=tipo).inc()
+    if tokens_entrada:
+        TOKENS_LLM.labels(modelo=modelo, direcao="entrada").inc(tokens_entrada)
+    if tokens_saida:
+        TOKENS_LLM.labels(modelo=modelo, direcao="saida").inc(tokens_saida)
+    if tokens_cache:
+        TOKENS_LLM.labels(modelo=modelo, direcao="entrada_cache").inc(tokens_cache)
+
+
+def registrar_etapa_llm(etapa: str, modelo: str, segundos: float, custo_usd: float | None = None) -> None:
+    LATENCIA_ETAPA_LLM.labels(etapa=etapa, modelo=modelo).observe(segundos)
+    if custo_usd:
+        CUSTO_LLM.labels(etapa=etapa, modelo=modelo).inc(custo_usd)
+
+
+def registrar_cache(cache: str, acerto: bool) -> None:
+    CACHE_CONSULTAS.labels(cache=cache, resultado="hit" if acerto else "miss").inc()
+
+
+# ========== POOL DO BANCO ==========
+
+class ColetorPoolBanco:
+    """Lê o estado dos pools do banco (async_engine e, se criado, o síncrono do pgvector) no momento do scrape"""
+
+    def collect(self):
+        estatisticas = estatisticas_pool()
+        conexoes = GaugeMetricFamily("homin_db_pool_conexoes", "Conexões do pool do banco por estado", labels=["estado"])
+        for estado in ("em_uso", "ociosas", "overflow", "tamanho"):
+            if estado in estatisticas:
+                conexoes.add_metric([estado], estatisticas[estado])
+        yield conexoes
+
+        if "sincrono" in estatisticas:
+            sincrono = GaugeMetricFamily(
+                "homin_db_pool_sincrono_conexoes", "Conexões do pool do engine síncrono (pgvector) por estado", labels=["estado"]
+            )
+            for estado in ("em_uso", "ociosas", "overflow", "tamanho"):
+                if estado in estatisticas["sincrono"]:
+                    sincrono.add_metric([estado], estatisticas["sincrono"][estado])
+            yield sincrono
+
+
+REGISTRY.register(ColetorPoolBanco())
+
+
+def gerar_metricas() -> tuple[bytes, str]:
+    """Texto no formato de exposição do Prometheus e o content-type correspondente"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede a latência de cada requisição pelo template da rota"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"codigo": 500}
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status["codigo"] = mensagem["status"]
+            await send(mensagem)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # Usa o template (/ai/conversas/{conversa_id}) para não explodir a cardinalidade
+            rota = scope.get("route")
+            LATENCIA_HTTP.labels(
+                metodo=scope["method"],
+                rota=getattr(rota, "path", "desconhecida"),
+                status=str(status["codigo"]),
+            ).observe(time.perf_counter() - inicio)
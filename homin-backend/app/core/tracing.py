@@ -0,0 +1,177 @@
+import json
+import time
+import uuid
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from app.config import settings
+
+# Span ativo na tarefa/requisição atual (os filhos herdam o trace_id dele)
+_span_atual: ContextVar["Span | None"] = ContextVar("span_atual", default=None)
+
+# Exportadores offline: ring buffer em memória (lido pelo endpoint admin) e, opcionalmente, JSON lines
+_buffer_spans: deque = deque(maxlen=settings.tracing_buffer_tamanho)
+
+# O JSON lines é gravado por uma thread: a requisição só enfileira, nunca faz I/O de arquivo no loop.
+# Fila cheia (disco travado) descarta o span do arquivo; o ring buffer continua com ele
+_fila_arquivo: queue.Queue = queue.Queue(maxsize=10_000)
+_FIM = object()
+_escritor: threading.Thread | None = None
+_lock_escritor = threading.Lock()
+
+
+def _novo_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    """Trecho cronometrado do pipeline com atributos (k, scores, categoria, tokens...)"""
+
+    __slots__ = ("nome", "trace_id", "span_id", "id_pai", "inicio", "duracao_ms", "status", "atributos", "_t0")
+
+    def __init__(self, nome: str, trace_id: str, id_pai: str | None, atributos: dict):
+        self.nome = nome
+        self.trace_id = trace_id
+        self.span_id = _novo_id()
+        self.id_pai = id_pai
+        self.inicio = datetime.now(timezone.utc)
+        self.duracao_ms: float | None = None
+        self.status = "ok"
+        self.atributos = atributos
+        self._t0 = time.perf_counter()
+
+    def definir(self, **atributos) -> None:
+        self.atributos.update(atributos)
+
+    def finalizar(self) -> None:
+        self.duracao_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+
+    def para_dict(self) -> dict:
+        return {
+            "nome": self.nome,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "id_pai": self.id_pai,
+            "inicio": self.inicio.isoformat(),
+            "duracao_ms": self.duracao_ms,
+            "status": self.status,
+            "atributos": self.atributos,
+        }
+
+
+def trace_id_atual() -> str | None:
+    span_ativo = _span_atual.get()
+    return span_ativo.trace_id if span_ativo else None
+
+
+@contextmanager
+def span(nome: str, **atributos):
+    """
+    Abre um span filho do span atual (ou a raiz de um novo trace).
+    Uso: `with span("rag.busca_vetorial", k=4) as s: ...; s.definir(scores=[...])`
+    """
+    if not settings.tracing_habilitado:
+        yield Span(nome, "", None, atributos)
+        return
+
+    pai = _span_atual.get()
+    novo = Span(nome, pai.trace_id if pai else _novo_id(), pai.span_id if pai else None, atributos)
+    token = _span_atual.set(novo)
+    try:
+        yield novo
+    except BaseException as e:
+        novo.status = "erro"
+        novo.definir(erro=repr(e))
+        raise
+    finally:
+        novo.finalizar()
+        _span_atual.reset(token)
+        _exportar(novo)
+
+
+def _gravar_arquivo() -> None:
+    while True:
+        itens = [_fila_arquivo.get()]
+        # Junta o que já estiver na fila numa escrita só
+        while len(itens) < 500:
+            try:
+                itens.append(_fila_arquivo.get_nowait())
+            except queue.Empty:
+                break
+        fim = any(item is _FIM for item in itens)
+        linhas = "".join(json.dumps(item, ensure_ascii=False, default=str) + "\n" for item in itens if item is not _FIM)
+        if linhas and settings.tracing_arquivo_jsonl:
+            try:
+                with open(settings.tracing_arquivo_jsonl, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(linhas)
+            except OSError:
+                pass
+        if fim:
+            return
+
+
+def _iniciar_escritor() -> None:
+    global _escritor
+    with _lock_escritor:
+        if _escritor is None or not _escritor.is_alive():
+            _escritor = threading.Thread(target=_gravar_arquivo, name="tracing-jsonl", daemon=True)
+            _escritor.start()
+
+
+def encerrar_exportacao(timeout: float = 5.0) -> None:
+    """Grava no arquivo o que ainda estiver na fila (chamado no shutdown do app)"""
+    global _escritor
+    with _lock_escritor:
+        escritor, _escritor = _escritor, None
+    if escritor is not None and escritor.is_alive():
+        _fila_arquivo.put(_FIM)
+        escritor.join(timeout)
+
+
+def _exportar(span_finalizado: Span) -> None:
+    dados = span_finalizado.para_dict()
+    _buffer_spans.append(dados)
+
+    if settings.tracing_arquivo_jsonl:
+        if _escritor is None:
+            _iniciar_escritor()
+        try:
+            _fila_arquivo.put_nowait(dados)
+        except queue.Full:
+            pass
+
+
+def spans_recentes(trace_id: str | None = None, limite: int = 200) -> list[dict]:
+    """Spans mais recentes do ring buffer (mais novos primeiro), opcionalmente de um único trace"""
+    spans = [s for s in reversed(_buffer_spans) if trace_id is None or s["trace_id"] == trace_id]
+    return spans[:limite]
+
+
+class TracingMiddleware:
+    """Middleware ASGI que abre o span raiz de cada requisição HTTP e devolve o X-Trace-Id"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with span("http.requisicao", metodo=scope["method"], caminho=scope["path"]) as raiz:
+            async def enviar(mensagem):
+                if mensagem["type"] == "http.response.start":
+                    raiz.definir(status_code=mensagem["status"])
+                    if raiz.trace_id:
+                        mensagem.setdefault("headers", [])
+                        mensagem["headers"] = list(mensagem["headers"]) + [(b"x-trace-id", raiz.trace_id.encode())]
+                await send(mensagem)
+
+            await self.app(scope, receive, enviar)
+
+            rota = scope.get("route")
+            if rota is not None:
+                raiz.definir(rota=getattr(rota, "path", None))
@@ -0,0 +1,113 @@
+import time
+import asyncio
+import logging
+import importlib
+from app.config import settings
+from app.core.metrics import INICIALIZACAO
+
+logger = logging.getLogger(__name__)
+
+# Módulos pesados (langchain, chromadb, agno) que saíram do import do app.main e carregam no lifespan
+MODULOS_IA = (
+    "app.services.ai_service",
+    "app.services.document_service",
+    "app.services.knowledge_service",
+)
+
+# Sem estas etapas a primeira requisição de chat falharia ou pagaria o custo todo: /ready espera por elas
+ETAPAS_OBRIGATORIAS = {"importacao", "base_vetorial"}
+
+
+class EstadoAquecimento:
+    """Tempos de import e de cada etapa do aquecimento, expostos em /ready"""
+
+    def __init__(self):
+        self.pronto = False
+        self.importacao_ms: dict[str, float] = {}
+        self.etapas_ms: dict[str, float] = {}
+        self.erros: dict[str, str] = {}
+
+    def registrar_import(self, modulo: str, segundos: float) -> None:
+        self.importacao_ms[modulo] = round(segundos * 1000, 1)
+        INICIALIZACAO.labels(etapa=f"import:{modulo}").set(segundos)
+
+    def para_dict(self) -> dict:
+        return {
+            "pronto": self.pronto,
+            "importacao_ms": self.importacao_ms,
+            "aquecimento_ms": self.etapas_ms,
+            "erros": self.erros,
+        }
+
+
+estado = EstadoAquecimento()
+
+
+def _importar_modulos_ia() -> None:
+    for modulo in MODULOS_IA:
+        inicio = time.perf_counter()
+        importlib.import_module(modulo)
+        estado.registrar_import(modulo, time.perf_counter() - inicio)
+
+
+def _abrir_bases_vetoriais() -> None:
+    from app.services.vector_store import COLECAO_DOCUMENTOS, COLECAO_WEB, obter_indice
+
+    # count() força a abertura dos arquivos/conexão do backend fora do caminho da requisição
+    obter_indice(COLECAO_DOCUMENTOS).contar()
+    obter_indice(COLECAO_WEB).contar()
+
+
+async def _completar_metadados_antigos() -> None:
+    from app.services.document_service import completar_metadados_antigos
+    await completar_metadados_antigos()
+
+
+async def _pre_conectar() -> None:
+    if not settings.aquecimento_pre_conectar:
+        return
+    from app.services.ai_service import pre_conectar_clientes
+    await pre_conectar_clientes()
+
+
+async def _baixar_jwks() -> None:
+    from app.utils.deps import obter_jwks
+    await asyncio.to_thread(obter_jwks)
+
+
+async def _executar_etapa(nome: str, etapa) -> bool:
+    inicio = time.perf_counter()
+    try:
+        await asyncio.wait_for(etapa(), timeout=settings.aquecimento_timeout_segundos)
+        return True
+    except Exception as e:
+        estado.erros[nome] = str(e) or type(e).__name__
+        logger.warning("falha no aquecimento", extra={"etapa": nome, "erro": estado.erros[nome]})
+        return False
+    finally:
+        duracao = time.perf_counter() - inicio
+        estado.etapas_ms[nome] = round(duracao * 1000, 1)
+        INICIALIZACAO.labels(etapa=nome).set(duracao)
+
+
+async def aquecer() -> None:
+    """Carrega e aquece as dependências de IA; marca o app como pronto quando as obrigatórias passam"""
+    inicio = time.perf_counter()
+    etapas = [
+        ("importacao", lambda: asyncio.to_thread(_importar_modulos_ia)),
+        ("base_vetorial", lambda: asyncio.to_thread(_abrir_bases_vetoriais)),
+        ("metadados_antigos", _completar_metadados_antigos),
+        ("clientes_http", _pre_conectar),
+        ("jwks", _baixar_jwks),
+    ]
+
+    falhas = set()
+    for nome, etapa in etapas:
+        if not await _executar_etapa(nome, etapa):
+            falhas.add(nome)
+            if nome == "importacao":
+                break
+
+    estado.pronto = not (falhas & ETAPAS_OBRIGATORIAS)
+    INICIALIZACAO.labels(etapa="total").set(time.perf_counter() - inicio)
+    logger.info("aquecimento concluído", extra=estado.para_dict())
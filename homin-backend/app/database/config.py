@@ -1,26 +1,96 @@
 # Configurações do banco de dados SQLAlchemy
 # Conexão com PostgreSQL usando as configurações do config.py
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import hmac
+import time
+import hashlib
+import threading
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from ..config import settings
 
-# Criar engine async do SQLAlchemy usando a DATABASE_URL do .env
-async_engine = create_async_engine(
-    settings.database_url.replace("postgresql://", "postgresql+asyncpg://"),
-    # Para PostgreSQL, adicionar configurações de pool se necessário
-    pool_pre_ping=True,  # Verifica conexão antes de usar
-    echo=False  # True para debug SQL, False para produção
-)
 
-# Criar engine síncrono para migrações do Alembic
-sync_engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    echo=False
-)
+def criar_async_engine(url: str | None = None, **opcoes) -> AsyncEngine:
+    """
+    Fábrica única de engines async: pool e cache de statements vêm do Settings.
+    `opcoes` sobrescreve qualquer argumento do create_async_engine (ex.: poolclass em scripts).
+    """
+    url = (url or settings.database_url).replace("postgresql://", "postgresql+asyncpg://")
+    argumentos = dict(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        # pre_ping custa um round-trip por checkout; pool_recycle já descarta conexões velhas
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            # cache de prepared statements por conexão (0 para PgBouncer em modo transaction)
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "statement_cache_size": settings.db_statement_cache_size,
+        },
+        echo=False  # True para debug SQL, False para produção
+    )
+    argumentos.update(opcoes)
+    return create_async_engine(url, **argumentos)
+
+
+# Engine async da aplicação (único pool do processo), descartado no shutdown do FastAPI
+async_engine = criar_async_engine()
+
+
+# Engine síncrono: a interface da base vetorial é síncrona (os backends rodam em asyncio.to_thread e no executor
+# da indexação), então o pgvector precisa de um driver bloqueante. Pool próprio e pequeno, ajustado pelo Settings,
+# que aparece em estatisticas_pool e é descartado no shutdown junto com o async_engine
+_sync_engine: Engine | None = None
+_trava_sync_engine = threading.Lock()
+
+
+def obter_sync_engine() -> Engine:
+    """Engine síncrono (psycopg2), criado só quando alguém precisa (pgvector, create_tables, scripts)"""
+    global _sync_engine
+    with _trava_sync_engine:
+        if _sync_engine is None:
+            _sync_engine = create_engine(
+                settings.database_url,
+                pool_size=settings.db_sync_pool_size,
+                max_overflow=settings.db_sync_max_overflow,
+                pool_timeout=settings.db_pool_timeout,
+                pool_recycle=settings.db_pool_recycle,
+                pool_pre_ping=True,
+                echo=False
+            )
+        return _sync_engine
+
+
+def descartar_sync_engine() -> None:
+    """Fecha as conexões do engine síncrono, se ele chegou a ser criado (shutdown do FastAPI)"""
+    global _sync_engine
+    with _trava_sync_engine:
+        engine, _sync_engine = _sync_engine, None
+    if engine is not None:
+        engine.dispose()
+
+
+def _estado_pool(pool) -> dict:
+    estatisticas = {"classe": type(pool).__name__}
+    for nome, leitor in (("tamanho", "size"), ("em_uso", "checkedout"), ("ociosas", "checkedin"), ("overflow", "overflow")):
+        if hasattr(pool, leitor):
+            estatisticas[nome] = getattr(pool, leitor)()
+    return estatisticas
+
+
+def estatisticas_pool() -> dict:
+    """Estado atual do pool do async_engine e, em `sincrono`, do engine síncrono quando ele existe"""
+    estatisticas = _estado_pool(async_engine.pool)
+    estatisticas["max_overflow"] = settings.db_max_overflow
+    estatisticas["timeout_segundos"] = settings.db_pool_timeout
+    if _sync_engine is not None:
+        estatisticas["sincrono"] = {**_estado_pool(_sync_engine.pool), "max_overflow": settings.db_sync_max_overflow}
+    return estatisticas
+
 
 # Criar SessionLocal async para gerenciar sessões do banco
 AsyncSessionLocal = async_sessionmaker(
@@ -29,11 +99,84 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
-# Criar SessionLocal síncrono para compatibilidade (se precisar)
+# ========== RÉPLICA DE LEITURA ==========
+
+# Engine da réplica (mesma fábrica e ajustes de pool); None quando não há réplica configurada
+replica_engine = criar_async_engine(settings.database_replica_url) if settings.database_replica_url else None
+
+AsyncReplicaSessionLocal = async_sessionmaker(
+    bind=replica_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+) if replica_engine is not None else None
+
+# Read-your-writes: quem escreveu leva no cliente (cookie e cabeçalho) o LSN do WAL do primário após o commit,
+# assinado com a APP_SECRET_KEY. Vale entre workers e instâncias da API: a leitura só usa a réplica que já
+# reproduziu esse LSN (pg_last_wal_replay_lsn), senão vai ao primário.
+COOKIE_CONSISTENCIA = "homin_lsn"
+CABECALHO_CONSISTENCIA = "X-Homin-Lsn"
+
+_replica_pausada_ate = 0.0
+
+
+def _assinatura(conteudo: str) -> str:
+    return hmac.new(settings.app_secret_key.encode("utf-8"), conteudo.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def token_consistencia(lsn: str, emitido_em: float | None = None) -> str:
+    conteudo = f"{lsn}:{int(emitido_em if emitido_em is not None else time.time())}"
+    return f"{conteudo}:{_assinatura(conteudo)}"
+
+
+def lsn_do_token(token: str | None) -> str | None:
+    """LSN que a leitura precisa enxergar; None se não há token, se é inválido ou se já expirou"""
+    if not token:
+        return None
+    try:
+        lsn, emitido_em, assinatura = token.rsplit(":", 2)
+        valido = hmac.compare_digest(assinatura, _assinatura(f"{lsn}:{emitido_em}"))
+        recente = time.time() - int(emitido_em) <= settings.replica_consistencia_segundos
+    except ValueError:
+        return None
+    return lsn if valido and recente else None
+
+
+async def marcar_escrita(sessao: AsyncSession, response) -> None:
+    """Chamar após o commit de uma escrita do usuário (chat, nova conversa, exclusão), na sessão do primário"""
+    if AsyncReplicaSessionLocal is None:
+        return
+    lsn = await sessao.scalar(text("SELECT pg_current_wal_lsn()::text"))
+    token = token_consistencia(lsn)
+    response.headers[CABECALHO_CONSISTENCIA] = token
+    response.set_cookie(
+        COOKIE_CONSISTENCIA, token, max_age=int(settings.replica_consistencia_segundos), httponly=True, samesite="lax"
+    )
+
+
+async def replica_alcancou(sessao: AsyncSession, lsn: str) -> bool:
+    """A réplica já reproduziu o WAL até `lsn`? (NULL fora de recuperação: sem como saber, conta como não)"""
+    # O asyncpg não tem codec para parâmetro pg_lsn: vai como texto e o cast fica no servidor
+    alcancou = await sessao.scalar(
+        text("SELECT pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn)"), {"lsn": lsn}
+    )
+    return bool(alcancou)
+
+
+def replica_disponivel() -> bool:
+    """False se não há réplica configurada ou se ela está pausada por falha recente"""
+    return AsyncReplicaSessionLocal is not None and time.monotonic() >= _replica_pausada_ate
+
+
+def pausar_replica() -> None:
+    """Tira a réplica de uso por um tempo depois de uma falha de conexão"""
+    global _replica_pausada_ate
+    _replica_pausada_ate = time.monotonic() + settings.replica_pausa_falha_segundos
+
+
+# SessionLocal síncrono para compatibilidade: o engine é ligado na hora de abrir a sessão
 SessionLocal = sessionmaker(
     autocommit=False, 
-    autoflush=False, 
-    bind=sync_engine
+    autoflush=False
 )
 
 # Base para os modelos SQLAlchemy
@@ -54,7 +197,7 @@ def get_db():
     Dependência do FastAPI para obter sessão do banco.
     Uso: def endpoint(db: Session = Depends(get_db)):
     """
-    db = SessionLocal()
+    db = SessionLocal(bind=obter_sync_engine())
     try:
         yield db
     finally:
@@ -66,4 +209,4 @@ def create_tables():
     Cria todas as tabelas no banco de dados.
     Chamar uma vez quando inicializar a aplicação.
     """
-    Base.metadata.create_all(bind=sync_engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=obter_sync_engine())
\ No newline at end of file
@@ -1,10 +1,10 @@
 from datetime import datetime
 import uuid
 from sqlalchemy import (
-    Column, String, Text, DateTime, ForeignKey, BigInteger, Boolean
+    Column, String, Text, DateTime, ForeignKey, BigInteger, Integer, Boolean, Index, true, text
 )
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from .config import Base
 
 class Usuario(Base):
@@ -16,44 +16,96 @@ class Usuario(Base):
     role = Column(String(20), nullable=False, default="user")
     data_cadastro = Column(DateTime, default=datetime.utcnow)
 
-    # relationships
-    conversas = relationship("Conversa", back_populates="usuario", cascade="all, delete-orphan")
-    documentos = relationship("Documento", back_populates="usuario", cascade="all, delete-orphan")
-    historicos = relationship("HistoricoMensagem", back_populates="usuario")
+    # relationships (passive_deletes: o ON DELETE das FKs apaga os dependentes em lote no banco)
+    conversas = relationship("Conversa", back_populates="usuario", cascade="all, delete-orphan", passive_deletes=True)
+    documentos = relationship("Documento", back_populates="usuario", cascade="all, delete-orphan", passive_deletes=True)
+    historicos = relationship("HistoricoMensagem", back_populates="usuario", passive_deletes=True)
 
 class Documento(Base):
     __tablename__ = "documentos"
     id_documento = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    id_usuario = Column(UUID(as_uuid=True), ForeignKey("usuarios.id_usuario"), nullable=False)
+    id_usuario = Column(UUID(as_uuid=True), ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), nullable=False)
     nome_arquivo = Column(String(255))
     tipo_documento = Column(String(100))
     data_criacao = Column(DateTime, default=datetime.utcnow)
+    # Copiados para os metadados dos chunks no Chroma: filtram a busca antes do ANN
+    tags = Column(ARRAY(String(50)), nullable=False, default=list, server_default="{}")
+    ativo = Column(Boolean, nullable=False, default=True, server_default=true())
+    # sha256 e tamanho calculados durante o upload (reenviar os mesmos bytes não cria outro documento)
+    hash_conteudo = Column(String(64), nullable=True)
+    tamanho_bytes = Column(BigInteger, nullable=True)
+    # Chave no armazenamento (app/services/storage); vazia nos PDFs antigos, gravados direto em base_conhecimento/
+    chave_armazenamento = Column(String(255), nullable=True)
+    # Catálogo preenchido pela indexação (status: pendente, indexado ou erro)
+    paginas = Column(Integer, nullable=True)
+    chunks = Column(Integer, nullable=True)
+    status_indexacao = Column(String(20), nullable=False, default="pendente", server_default="pendente")
+    data_indexacao = Column(DateTime, nullable=True)
 
     usuario = relationship("Usuario", back_populates="documentos")
-    historicos = relationship("HistoricoMensagem", back_populates="documento")
+    historicos = relationship("HistoricoMensagem", back_populates="documento", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ux_documentos_hash_conteudo", "hash_conteudo", unique=True,
+              postgresql_where=text("hash_conteudo IS NOT NULL")),
+        # listar_documentos: ORDER BY data_criacao DESC, id_documento DESC
+        Index("ix_documentos_data_criacao", "data_criacao", "id_documento"),
+    )
 
 class Conversa(Base):
     __tablename__ = "conversas"
     id_conversa = Column(BigInteger, primary_key=True, autoincrement=True)
-    id_usuario = Column(UUID(as_uuid=True), ForeignKey("usuarios.id_usuario"), nullable=False)
+    id_usuario = Column(UUID(as_uuid=True), ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), nullable=False)
     titulo = Column(String(255))
     data_inicio = Column(DateTime, default=datetime.utcnow)
     data_ultima_msg = Column(DateTime, nullable=True)
 
     usuario = relationship("Usuario", back_populates="conversas")
-    historicos = relationship("HistoricoMensagem", back_populates="conversa", cascade="all, delete-orphan")
+    historicos = relationship("HistoricoMensagem", back_populates="conversa", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # listar_conversas: WHERE id_usuario = ? ORDER BY data_ultima_msg DESC
+        Index("ix_conversas_usuario_ultima_msg", "id_usuario", "data_ultima_msg", "id_conversa"),
+    )
 
 class HistoricoMensagem(Base):
     __tablename__ = "historico_mensagem"
+    # Particionada por mês de data_hora: a chave de partição precisa fazer parte da PK
     id_historico = Column(BigInteger, primary_key=True, autoincrement=True)
-    id_conversa = Column(BigInteger, ForeignKey("conversas.id_conversa"), nullable=False)
-    id_usuario = Column(UUID(as_uuid=True), ForeignKey("usuarios.id_usuario"), nullable=False)
-    id_documento = Column(UUID(as_uuid=True), ForeignKey("documentos.id_documento"), nullable=True)
+    id_conversa = Column(BigInteger, ForeignKey("conversas.id_conversa", ondelete="CASCADE"), nullable=False)
+    id_usuario = Column(UUID(as_uuid=True), ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), nullable=False)
+    id_documento = Column(UUID(as_uuid=True), ForeignKey("documentos.id_documento", ondelete="SET NULL"), nullable=True)
     mensagem_texto = Column(Text, nullable=False)
     tipo = Column(String(20))  # 'user' ou 'admin' / ou gerar enum
     origem_contexto = Column(String(50))  # 'local','web','none', etc
-    data_hora = Column(DateTime, default=datetime.utcnow)
+    data_hora = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    # Preenchido por trigger (config portugues_unaccent); deferred para não trafegar no SELECT padrão
+    mensagem_tsv = deferred(Column(TSVECTOR, nullable=True))
 
     conversa = relationship("Conversa", back_populates="historicos")
     usuario = relationship("Usuario", back_populates="historicos")
-    documento = relationship("Documento", back_populates="historicos")
\ No newline at end of file
+    documento = relationship("Documento", back_populates="historicos")
+
+    __table_args__ = (
+        # chat_with_ai / obter_conversa_com_historico: WHERE id_conversa = ? ORDER BY data_hora
+        Index("ix_historico_mensagem_conversa_data_hora", "id_conversa", "data_hora", "id_historico"),
+        # buscar_no_historico: mensagem_tsv @@ websearch_to_tsquery(...)
+        Index("ix_historico_mensagem_tsv", "mensagem_tsv", postgresql_using="gin"),
+        # Partições mensais são criadas e arquivadas por app/services/partition_service.py
+        {"postgresql_partition_by": "RANGE (data_hora)"},
+    )
+
+class ConhecimentoWeb(Base):
+    """Contexto obtido na busca web, aguardando revisão de um admin para entrar na base local"""
+    __tablename__ = "conhecimento_web"
+    id_conhecimento = Column(BigInteger, primary_key=True, autoincrement=True)
+    pergunta = Column(Text, nullable=False)
+    consulta_normalizada = Column(Text, nullable=False, index=True)
+    conteudo = Column(Text, nullable=False)
+    fontes = Column(ARRAY(Text), nullable=False, default=list)  # URLs citadas na busca
+    status = Column(String(20), nullable=False, default="pendente")  # 'pendente','aprovado','rejeitado'
+    data_criacao = Column(DateTime, default=datetime.utcnow)
+    data_revisao = Column(DateTime, nullable=True)
+    id_revisor = Column(UUID(as_uuid=True), ForeignKey("usuarios.id_usuario", ondelete="SET NULL"), nullable=True)
+
+    revisor = relationship("Usuario")
@@ -1,19 +1,66 @@
 # Arquivo principal da aplicação FastAPI
 # Aqui será configurado o app FastAPI, middlewares, CORS, etc.
 
-from fastapi import FastAPI
+import sys
+import time
+_inicio_import = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.logs import configurar_logging
+from app.core.tracing import TracingMiddleware, encerrar_exportacao
+from app.core.metrics import MetricsMiddleware, gerar_metricas
+from app.core.warmup import aquecer, estado as estado_aquecimento
+from app.database.config import async_engine, replica_engine, descartar_sync_engine
+from app.services.partition_service import loop_manutencao
+from app.services.upload_service import LimiteCorpoUploadMiddleware
 from app.routes.rag.ai_routes import router as ai_router
 from app.routes.auth.auth_routes import router as auth_router
 from app.routes.documents.document_routes import router as document_router
+from app.routes.knowledge.knowledge_routes import router as knowledge_router
+from app.routes.admin.admin_routes import router as admin_router
+
+configurar_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Dependências de IA carregam e aquecem em segundo plano; /ready responde 503 até terminar
+    aquecimento = asyncio.create_task(aquecer())
+    # Partições futuras do histórico (e arquivamento das antigas, se habilitado)
+    manutencao = asyncio.create_task(loop_manutencao())
+    yield
+    aquecimento.cancel()
+    manutencao.cancel()
+    # Espera as tarefas saírem (conexão da manutenção devolvida ao pool) antes de fechar clientes e engines
+    await asyncio.gather(aquecimento, manutencao, return_exceptions=True)
+    if "app.services.ai_service" in sys.modules:
+        await sys.modules["app.services.ai_service"].fechar_clientes()
+    # Fecha as conexões do pool no shutdown (evita conexões órfãs no Postgres entre reloads)
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+    # Pool síncrono do pgvector (só existe se algo o criou)
+    await asyncio.to_thread(descartar_sync_engine)
+    # Spans que ainda estão na fila do exportador JSON lines
+    await asyncio.to_thread(encerrar_exportacao)
+
 
 # Inicialização do app FastAPI
 app = FastAPI(
     title="Homin API",
     description="API para o projeto Homin",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Upload acima do limite é recusado antes de o multipart inteiro ir para o disco (o mais interno: o 413 ainda
+# passa por CORS, tracing e métricas)
+app.add_middleware(LimiteCorpoUploadMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -21,8 +68,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "Retry-After", "X-Homin-Lsn"],
 )
 
+# Span raiz por requisição (os spans do pipeline ficam pendurados nele)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # Página inicial simples
 @app.get("/")
 async def root():
@@ -37,13 +89,33 @@ async def root():
     }
 
 
+# Readiness: 200 só depois do aquecimento (Chroma aberto, clientes e JWKS prontos)
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    return JSONResponse(
+        status_code=200 if estado_aquecimento.pronto else 503,
+        content=estado_aquecimento.para_dict(),
+    )
+
+
+# Métricas no formato do Prometheus (latência por rota, LLM/tokens, cache, pool do banco, ingestão)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    conteudo, content_type = gerar_metricas()
+    return Response(content=conteudo, media_type=content_type)
+
+
 app.include_router(ai_router)
 app.include_router(auth_router)
 app.include_router(document_router)
+app.include_router(knowledge_router)
+app.include_router(admin_router)
 
 
 # incluir as rotas aqui
 
 
 # app.include_router(auth_router)
-# app.include_router(document_router)
\ No newline at end of file
+# app.include_router(document_router)
+
+estado_aquecimento.registrar_import("app.main", time.perf_counter() - _inicio_import)
@@ -0,0 +1,29 @@
+from typing import Optional
+from fastapi import APIRouter
+from app.core.permissions import Permissions
+from app.core.tracing import spans_recentes
+from app.database.config import estatisticas_pool
+from app.services.auth import LoggedUserDep
+from app.utils.permission_utils import validate_permission
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+# spans recentes do pipeline (ring buffer em memória), apenas admin
+@router.get("/traces")
+async def listar_traces(
+    auth_user: LoggedUserDep,
+    trace_id: Optional[str] = None,
+    limite: int = 200,
+):
+    await validate_permission(auth_user, Permissions.ADMIN_DOCUMENTS)
+
+    return {"spans": spans_recentes(trace_id=trace_id, limite=min(limite, 2000))}
+
+
+# estado do pool de conexões do banco, apenas admin
+@router.get("/db/pool")
+async def pool_do_banco(auth_user: LoggedUserDep):
+    await validate_permission(auth_user, Permissions.ADMIN_DOCUMENTS)
+
+    return estatisticas_pool()
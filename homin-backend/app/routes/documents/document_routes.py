@@ -1,54 +1,242 @@
 import os
 import uuid
+import asyncio
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
-from sqlalchemy import select
+from typing import List
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Response, status
+from sqlalchemy import select, desc, tuple_
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
 from app.core.permissions import Permissions
 from app.database.models import Documento
-from app.utils.deps import SessionDep, LocalUserDep
+from app.utils.deps import SessionDep, ReadSessionDep, LocalUserDep
 from app.services.auth import LoggedUserDep
 from app.utils.permission_utils import validate_permission
-from app.services.document_service import criar_db_async
-from app.routes.documents.schema import DocumentOut, DocumentCreate, DocumentList, DocumentsListResponse, MessageResponse, DocumentList
+from app.utils.pagination import codificar_cursor, decodificar_cursor, tamanho_pagina
+from app.routes.documents.schema import DocumentOut, DocumentCreate, DocumentList, DocumentsListResponse, MessageResponse, DocumentList, DocumentUpdate, DocumentUpdateOut, DocumentBulkOut, ArquivoLoteOut
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
 
+async def _documento_por_hash(db_session, hash_conteudo: str) -> Documento | None:
+    return await db_session.scalar(select(Documento).where(Documento.hash_conteudo == hash_conteudo))
+
+
 # apenas admin pode subir documentos que manda para o postgre e salva na base para IA 
-@router.post("/upload", status_code=status.HTTP_201_CREATED, response_model=DocumentOut)
+@router.post(
+    "/upload", status_code=status.HTTP_201_CREATED, response_model=DocumentOut,
+    responses={200: {"description": "Mesmo conteúdo já enviado: devolve o documento existente sem reindexar"},
+               413: {"description": "Arquivo maior que UPLOAD_TAMANHO_MAXIMO_MB"}},
+)
 async def upload_document(
     user: LocalUserDep,
     auth_user: LoggedUserDep,
     db_session: SessionDep,
+    response: Response,
     file: UploadFile = File(...),
+    tags: List[str] = Form([]),
 ):
     # Admin pode fazer tudo com documentos
     await validate_permission(auth_user, Permissions.ADMIN_DOCUMENTS)
     
+    from app.services.document_service import normalizar_tags
+    from app.services.storage import obter_armazenamento
+    from app.services.upload_service import ArquivoGrandeDemais, receber_upload, descartar_upload
+
+    armazenamento = obter_armazenamento()
+    safe_filename = Path(file.filename).name
     try:
-        safe_filename = Path(file.filename).name
-        file_path = f"app/base_conhecimento/{safe_filename}"
-        
+        # Em blocos para um temporário, com sha256 e limite de tamanho; nada vai para a memória inteiro
+        recebido = await receber_upload(file, armazenamento.pasta_temporaria)
+    except ArquivoGrandeDemais as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+    try:
+        # Mesmos bytes já enviados: não cria outro documento nem reindexa
+        existente = await _documento_por_hash(db_session, recebido.hash_conteudo)
+        if existente:
+            await descartar_upload(recebido.caminho_temporario)
+            response.status_code = status.HTTP_200_OK
+            return existente
+
         # salvar no banco de dados
         novo_documento = Documento(
             id_usuario=user.id_usuario,
             nome_arquivo=safe_filename,
-            tipo_documento=file.content_type or "application/pdf"
+            tipo_documento=file.content_type or "application/pdf",
+            tags=normalizar_tags(tags),
+            hash_conteudo=recebido.hash_conteudo,
+            tamanho_bytes=recebido.tamanho_bytes,
         )
         db_session.add(novo_documento)
+        await db_session.flush()
+        # Guardado pelo hash: nomes iguais não se sobrescrevem. Se o commit falhar, o objeto fica órfão
+        # (inofensivo; o próximo upload do mesmo conteúdo o reaproveita)
+        novo_documento.chave_armazenamento = await armazenamento.salvar(recebido)
         await db_session.commit()
         await db_session.refresh(novo_documento)
+    except IntegrityError:
+        # Upload simultâneo do mesmo conteúdo ganhou a corrida pelo índice único do hash
+        await db_session.rollback()
+        await descartar_upload(recebido.caminho_temporario)
+        existente = await _documento_por_hash(db_session, recebido.hash_conteudo)
+        if not existente:
+            raise HTTPException(status_code=409, detail="Conflito ao salvar o documento, tente novamente")
+        response.status_code = status.HTTP_200_OK
+        return existente
+    except Exception as e:
+        await db_session.rollback()  #  tudo funciona ou nada funciona
+        await descartar_upload(recebido.caminho_temporario)
+        raise HTTPException(status_code=500, detail=f"Erro ao processar documento: {str(e)}")
 
-        os.makedirs("app/base_conhecimento", exist_ok=True)
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+    try:
+        # import tardio: langchain/chromadb carregam no aquecimento do lifespan, não no import do app
+        from app.services.document_service import criar_db_async
         await criar_db_async()
+        # status/páginas/chunks foram gravados pela indexação em outra sessão
+        await db_session.refresh(novo_documento)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Documento salvo, mas falhou ao indexar: {str(e)}")
+
+    return novo_documento
+
+
+async def _receber_lote(files: List[UploadFile], pasta: str) -> list:
+    """
+    Cada item vira (nome, ArquivoRecebido) ou (nome, motivo do erro); ZIPs são abertos em PDFs.
+    Quantidade de PDFs e bytes descompactados são conferidos enquanto chegam (LoteGrandeDemais);
+    qualquer falha no meio descarta os temporários já recebidos.
+    """
+    from app.services.upload_service import (
+        ArquivoGrandeDemais, ArquivoRecebido, LoteInvalido, OrcamentoLote,
+        receber_upload, descartar_upload, extrair_pdfs_do_zip,
+    )
+    orcamento = OrcamentoLote()
+    itens = []
+    try:
+        for file in files:
+            nome = Path(file.filename or "").name
+            extensao = os.path.splitext(nome)[1].lower()
+            if extensao not in (".pdf", ".zip"):
+                itens.append((nome, "só são aceitos arquivos PDF ou ZIP"))
+                continue
+            try:
+                recebido = await receber_upload(file, pasta)
+            except ArquivoGrandeDemais as e:
+                itens.append((nome, str(e)))
+                continue
+            if extensao == ".pdf":
+                itens.append((nome, recebido))
+                orcamento.reservar_arquivos(1)
+                orcamento.consumir_bytes(recebido.tamanho_bytes)
+                continue
+            try:
+                itens += await asyncio.to_thread(extrair_pdfs_do_zip, recebido.caminho_temporario, pasta, orcamento)
+            except LoteInvalido as e:
+                itens.append((nome, str(e)))
+            finally:
+                await descartar_upload(recebido.caminho_temporario)
+    except BaseException:
+        for _, item in itens:
+            if isinstance(item, ArquivoRecebido):
+                await descartar_upload(item.caminho_temporario)
+        raise
+    return itens
+
+
+# vários PDFs (ou ZIPs com PDFs) de uma vez: uma transação para as linhas e uma única indexação no fim
+@router.post(
+    "/upload/bulk", response_model=DocumentBulkOut,
+    responses={413: {"description": "Mais PDFs que UPLOAD_LOTE_MAXIMO_ARQUIVOS ou mais bytes que UPLOAD_LOTE_MAXIMO_MB"}},
+)
+async def upload_documentos_em_lote(
+    user: LocalUserDep,
+    auth_user: LoggedUserDep,
+    db_session: SessionDep,
+    files: List[UploadFile] = File(...),
+    tags: List[str] = Form([]),
+):
+    await validate_permission(auth_user, Permissions.ADMIN_DOCUMENTS)
+
+    from app.services.document_service import normalizar_tags
+    from app.services.storage import obter_armazenamento
+    from app.services.upload_service import ArquivoRecebido, LoteGrandeDemais, descartar_upload
+
+    armazenamento = obter_armazenamento()
+    try:
+        itens = await _receber_lote(files, armazenamento.pasta_temporaria)
+    except LoteGrandeDemais as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    recebidos = [item for _, item in itens if isinstance(item, ArquivoRecebido)]
+    try:
+        # Duplicados contra o banco numa consulta só, e dentro do próprio lote pelo hash
+        hashes = {recebido.hash_conteudo for recebido in recebidos}
+        existentes = {
+            documento.hash_conteudo: documento
+            for documento in await db_session.scalars(select(Documento).where(Documento.hash_conteudo.in_(hashes)))
+        } if hashes else {}
 
-        return novo_documento
+        resultados: list[ArquivoLoteOut] = []
+        novos: dict[str, Documento] = {}
+        publicar: list[ArquivoRecebido] = []
+        for nome, item in itens:
+            if not isinstance(item, ArquivoRecebido):
+                resultados.append(ArquivoLoteOut(nome_arquivo=nome, status="erro", detalhe=item))
+            elif item.hash_conteudo in existentes or item.hash_conteudo in novos:
+                resultados.append(ArquivoLoteOut(nome_arquivo=nome, status="duplicado"))
+            else:
+                # Nome repetido com outro conteúdo é outro documento: o armazenamento é por hash
+                novos[item.hash_conteudo] = Documento(
+                    id_usuario=user.id_usuario,
+                    nome_arquivo=nome,
+                    tipo_documento="application/pdf",
+                    tags=normalizar_tags(tags),
+                    hash_conteudo=item.hash_conteudo,
+                    tamanho_bytes=item.tamanho_bytes,
+                )
+                publicar.append(item)
+                resultados.append(ArquivoLoteOut(nome_arquivo=nome, status="criado"))
+
+        if novos:
+            db_session.add_all(novos.values())
+            await db_session.flush()
+            for recebido in publicar:
+                novos[recebido.hash_conteudo].chave_armazenamento = await armazenamento.salvar(recebido)
+            await db_session.commit()
+    except HTTPException:
+        raise
+    except IntegrityError:
+        await db_session.rollback()
+        raise HTTPException(status_code=409, detail="Outro upload com o mesmo conteúdo terminou antes, envie o lote de novo")
     except Exception as e:
-        await db_session.rollback()  #  tudo funciona ou nada funciona
-        raise HTTPException(status_code=500, detail=f"Erro ao processar documento: {str(e)}")
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail=f"Erro ao processar lote: {str(e)}")
+    finally:
+        # Temporários que não foram salvos (duplicados, erro, rollback); os salvos já não existem
+        for recebido in recebidos:
+            await descartar_upload(recebido.caminho_temporario)
+
+    # id de cada resultado: o documento criado agora ou o que já tinha o mesmo conteúdo
+    por_hash = {**existentes, **novos}
+    hash_por_posicao = [item.hash_conteudo if isinstance(item, ArquivoRecebido) else None for _, item in itens]
+    for resultado, hash_conteudo in zip(resultados, hash_por_posicao):
+        if resultado.status != "erro":
+            resultado.id_documento = por_hash[hash_conteudo].id_documento
+
+    indexado = False
+    if novos:
+        from app.services.document_service import criar_db_async
+        indexado = bool(await criar_db_async())
+
+    return DocumentBulkOut(
+        criados=sum(r.status == "criado" for r in resultados),
+        duplicados=sum(r.status == "duplicado" for r in resultados),
+        erros=sum(r.status == "erro" for r in resultados),
+        indexado=indexado,
+        arquivos=resultados,
+    )
 
 
 #lista documento da base e só apenas adm pode ver
@@ -56,28 +244,74 @@ async def upload_document(
 async def listar_documentos(
     user: LocalUserDep,
     auth_user: LoggedUserDep,
-    db_session: SessionDep,
+    db_session: ReadSessionDep,
+    limite: Optional[int] = Query(None, ge=1, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="proximo_cursor da página anterior"),
+    status_indexacao: Optional[str] = Query(None, description="pendente, indexado ou erro"),
+    ativo: Optional[bool] = Query(None),
+    tag: Optional[str] = Query(None, description="Só documentos com esta tag"),
+    nome: Optional[str] = Query(None, description="Trecho do nome do arquivo"),
 ):
+    """Catálogo do banco (mais recentes primeiro, paginado por cursor); não lê a pasta de arquivos"""
     await validate_permission(auth_user, Permissions.ADMIN_DOCUMENTS)
 
+    from app.services.document_service import normalizar_tags
+    tamanho = tamanho_pagina(limite, settings.paginacao_documentos_padrao)
+
+    # Keyset em (data_criacao, id_documento), mesma ordem do índice ix_documentos_data_criacao
+    stmt = select(Documento).order_by(desc(Documento.data_criacao), desc(Documento.id_documento)).limit(tamanho + 1)
+    if status_indexacao:
+        stmt = stmt.where(Documento.status_indexacao == status_indexacao)
+    if ativo is not None:
+        stmt = stmt.where(Documento.ativo == ativo)
+    if tag:
+        stmt = stmt.where(Documento.tags.contains(normalizar_tags([tag])))
+    if nome:
+        stmt = stmt.where(Documento.nome_arquivo.icontains(nome, autoescape=True))
+    if cursor:
+        data_criacao, id_documento = decodificar_cursor(cursor, datetime, uuid.UUID)
+        stmt = stmt.where(tuple_(Documento.data_criacao, Documento.id_documento) < tuple_(data_criacao, id_documento))
+
+    documentos = list(await db_session.scalars(stmt))
+
+    proximo_cursor = None
+    if len(documentos) > tamanho:
+        documentos = documentos[:tamanho]
+        proximo_cursor = codificar_cursor(documentos[-1].data_criacao, str(documentos[-1].id_documento))
+
+    return DocumentsListResponse(
+        documents=[DocumentList.model_validate(documento) for documento in documentos], proximo_cursor=proximo_cursor
+    )
+
+
+# tags/ativo do documento: atualiza a linha e os metadados dos chunks no Chroma, sem gerar embeddings de novo
+@router.patch("/{documento_id}", response_model=DocumentUpdateOut)
+async def atualizar_documento(
+    documento_id: uuid.UUID,
+    dados: DocumentUpdate,
+    user: LoggedUserDep,
+    db_session: SessionDep
+):
+    await validate_permission(user, Permissions.ADMIN_DOCUMENTS)
+
+    from app.services.document_service import normalizar_tags, atualizar_metadados_chunks
+    documento = await db_session.get(Documento, documento_id)
+    if not documento:
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+
+    if dados.tags is not None:
+        documento.tags = normalizar_tags(dados.tags)
+    if dados.ativo is not None:
+        documento.ativo = dados.ativo
+    await db_session.commit()
+
+    # O banco é a fonte da verdade: se o Chroma falhar aqui, o /reindex reaplica os metadados
     try:
-        base_path = "app/base_conhecimento"
-        if not os.path.exists(base_path):
-            return DocumentsListResponse(documents=[])
-        
-        documents = []
-        for filename in os.listdir(base_path):
-            if filename.endswith('.pdf'):
-                file_path = os.path.join(base_path, filename)
-                size = os.path.getsize(file_path)
-                documents.append(DocumentList(
-                    filename=filename,
-                    size_bytes=size
-                ))
-        
-        return DocumentsListResponse(documents=documents)
+        chunks = await atualizar_metadados_chunks(documento)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao listar documentos: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Documento salvo, mas falhou ao atualizar a base da IA: {str(e)}")
+
+    return DocumentUpdateOut(**DocumentOut.model_validate(documento).model_dump(), chunks_atualizados=chunks)
 
 
 #deletar pelo id unico e apagar da base de conhecimento apenas adm apaga documentos
@@ -97,15 +331,32 @@ async def delete_documento(
         if not documento:
             raise HTTPException(status_code=404, detail="Documento não encontrado")
 
-        # Remover arquivo físico
-        file_path = f"app/base_conhecimento/{documento.nome_arquivo}"
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
         # Remover do banco
         await db_session.delete(documento)
         await db_session.commit()
 
+        # Remover o arquivo: o hash é único entre os documentos, então nenhum outro usa o mesmo objeto
+        from app.services.document_service import PASTA_BASE
+        if documento.chave_armazenamento:
+            from app.services.storage import obter_armazenamento
+            await obter_armazenamento().remover(documento.chave_armazenamento)
+        else:
+            # Documento antigo, gravado pelo nome direto na pasta base: antigos com o mesmo nome dividem o
+            # arquivo, que só sai com o último deles
+            compartilhado = await db_session.scalar(
+                select(Documento.id_documento).where(
+                    Documento.nome_arquivo == documento.nome_arquivo,
+                    Documento.chave_armazenamento.is_(None),
+                ).limit(1)
+            )
+            file_path = os.path.join(PASTA_BASE, documento.nome_arquivo)
+            if compartilhado is None and os.path.exists(file_path):
+                os.remove(file_path)
+
+        # e os chunks dele da base da IA (antes ficavam até o próximo reindex)
+        from app.services.document_service import remover_chunks
+        await remover_chunks(documento_id)
+
         return {"message": f"Documento {documento.nome_arquivo} removido com sucesso"}
     except Exception as e:
         await db_session.rollback()
@@ -117,6 +368,7 @@ async def delete_documento(
 async def reindexar_documents(user: LoggedUserDep, db_session: SessionDep):
     await validate_permission(user, Permissions.ADMIN_DOCUMENTS)
     
+    from app.services.document_service import criar_db_async
     try:
         await criar_db_async()  # Só reprocessa, não modifica DB
         return {"message": "Base de conhecimento reprocessada com sucesso"}
@@ -1,7 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from datetime import datetime
 import uuid
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 class DocumentOut(BaseModel):
     id_documento: uuid.UUID
@@ -9,20 +9,58 @@ class DocumentOut(BaseModel):
     nome_arquivo: str
     tipo_documento: Optional[str]
     data_criacao: datetime
+    tags: List[str] = []
+    ativo: bool = True
+    hash_conteudo: Optional[str] = None
+    tamanho_bytes: Optional[int] = None
+    status_indexacao: str = "pendente"
     
     class Config:
         from_attributes = True
 
+class DocumentUpdate(BaseModel):
+    tags: Optional[List[str]] = Field(None, description="Substitui as tags do documento")
+    ativo: Optional[bool] = Field(None, description="Documento inativo sai da busca da IA sem reindexar")
+
+class DocumentUpdateOut(DocumentOut):
+    chunks_atualizados: int = Field(description="Chunks do Chroma com os metadados reaplicados")
+
+class ArquivoLoteOut(BaseModel):
+    nome_arquivo: str
+    status: Literal["criado", "duplicado", "erro"]
+    id_documento: Optional[uuid.UUID] = None
+    detalhe: Optional[str] = None
+
+class DocumentBulkOut(BaseModel):
+    criados: int
+    duplicados: int
+    erros: int
+    indexado: bool = Field(description="Resultado da passada única de indexação do lote (False se nada foi criado)")
+    arquivos: List[ArquivoLoteOut]
+
 class DocumentCreate(BaseModel):
     # Para uploads via UploadFile, não precisa de campos
     pass
 
-class DocumentList(BaseModel):
-    filename: str
-    size_bytes: int
+class DocumentList(DocumentOut):
+    paginas: Optional[int] = None
+    chunks: Optional[int] = None
+    data_indexacao: Optional[datetime] = None
+
+    # Campos da listagem antiga (que varria a pasta), mantidos para os clientes existentes
+    @computed_field
+    @property
+    def filename(self) -> str:
+        return self.nome_arquivo
+
+    @computed_field
+    @property
+    def size_bytes(self) -> Optional[int]:
+        return self.tamanho_bytes
 
 class DocumentsListResponse(BaseModel):
     documents: List[DocumentList]
+    proximo_cursor: Optional[str] = Field(None, description="Cursor para a próxima página (null se não houver)")
 
 class MessageResponse(BaseModel):
     message: str
@@ -0,0 +1,87 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import select
+from app.core.permissions import Permissions
+from app.database.models import ConhecimentoWeb
+from app.utils.deps import SessionDep, LocalUserDep
+from app.services.auth import LoggedUserDep
+from app.utils.permission_utils import validate_permission
+from .schema import ConhecimentoWebOut, ConhecimentoWebListResponse, RevisaoIn
+
+router = APIRouter(prefix="/knowledge", tags=["Knowledge"])
+
+
+# fila de conteúdo vindo da web aguardando revisão, apenas admin
+@router.get("/pendentes", response_model=ConhecimentoWebListResponse)
+async def listar_pendentes(
+    auth_user: LoggedUserDep,
+    db_session: SessionDep,
+    limite: int = 50,
+):
+    await validate_permission(auth_user, Permissions.ADMIN_DOCUMENTS)
+
+    stmt = select(ConhecimentoWeb).where(
+        ConhecimentoWeb.status == "pendente"
+    ).order_by(ConhecimentoWeb.data_criacao).limit(min(limite, 200))
+    itens = await db_session.scalars(stmt)
+
+    return ConhecimentoWebListResponse(itens=list(itens))
+
+
+async def _buscar_item(db_session, id_conhecimento: int) -> ConhecimentoWeb:
+    item = await db_session.get(ConhecimentoWeb, id_conhecimento)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item não encontrado")
+    return item
+
+
+# aprova e vetoriza só este item na coleção web, sem reindexar os PDFs
+@router.post("/{id_conhecimento}/aprovar", response_model=ConhecimentoWebOut)
+async def aprovar_conhecimento(
+    id_conhecimento: int,
+    user: LocalUserDep,
+    auth_user: LoggedUserDep,
+    db_session: SessionDep,
+    revisao: Optional[RevisaoIn] = None,
+):
+    await validate_permission(auth_user, Permissions.ADMIN_DOCUMENTS)
+
+    item = await _buscar_item(db_session, id_conhecimento)
+    if revisao and revisao.conteudo:
+        item.conteudo = revisao.conteudo
+
+    # import tardio: langchain/chromadb carregam no aquecimento do lifespan, não no import do app
+    from app.services.knowledge_service import indexar_conhecimento, marcar_revisao
+    try:
+        await indexar_conhecimento(item)
+        marcar_revisao(item, "aprovado", user.id_usuario)
+        await db_session.commit()
+        await db_session.refresh(item)
+        return item
+    except Exception as e:
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail=f"Erro ao aprovar conhecimento: {str(e)}")
+
+
+@router.post("/{id_conhecimento}/rejeitar", response_model=ConhecimentoWebOut)
+async def rejeitar_conhecimento(
+    id_conhecimento: int,
+    user: LocalUserDep,
+    auth_user: LoggedUserDep,
+    db_session: SessionDep,
+):
+    await validate_permission(auth_user, Permissions.ADMIN_DOCUMENTS)
+
+    item = await _buscar_item(db_session, id_conhecimento)
+
+    from app.services.knowledge_service import remover_conhecimento, marcar_revisao
+    try:
+        if item.status == "aprovado":
+            await remover_conhecimento(item)
+        marcar_revisao(item, "rejeitado", user.id_usuario)
+        await db_session.commit()
+        await db_session.refresh(item)
+        return item
+    except Exception as e:
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail=f"Erro ao rejeitar conhecimento: {str(e)}")
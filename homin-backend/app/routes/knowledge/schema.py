@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, List
+
+class ConhecimentoWebOut(BaseModel):
+    id_conhecimento: int
+    pergunta: str
+    conteudo: str
+    fontes: List[str]
+    status: str
+    data_criacao: datetime
+    data_revisao: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class ConhecimentoWebListResponse(BaseModel):
+    itens: List[ConhecimentoWebOut]
+
+class RevisaoIn(BaseModel):
+    conteudo: Optional[str] = Field(None, description="Texto revisado pelo admin (opcional, substitui o original)")
@@ -1,24 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, desc
-from app.services.ai_service import gerar_resposta
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import (
+    select, insert, update, delete, values, column, literal, literal_column, true, func, desc, or_, and_, tuple_,
+    Text, String, DateTime
+)
+from app.config import settings
 from app.services.auth import LoggedUserDep, require_permission
 from app.core.permissions import Permissions
 from app.utils.permission_utils import validate_permission
-from app.utils.deps import SessionDep, LocalUserDep
+from app.utils.deps import SessionDep, ReadSessionDep, LocalUserDep
+from app.database.config import marcar_escrita
 from app.database.models import Conversa, HistoricoMensagem
+from app.core.tracing import span
+from app.core.admission import admissao_llm, verificar_limite_usuario
+from app.utils.pagination import codificar_cursor, decodificar_cursor, tamanho_pagina
 from .schema import (
     ChatIn, ChatOut, ConversaCreate, ConversaOut, 
-    ConversaComHistorico, ConversasListResponse, MensagemHistorico
+    ConversaComHistorico, ConversasListResponse, MensagemHistorico,
+    BuscaHistoricoResponse, ResultadoBusca
 )
 
 router = APIRouter(prefix="/ai", tags=["AI"])
 
+# Configuração de texto da coluna mensagem_tsv (português sem acentos, ver migração 3c7a9e1b5d42)
+CONFIG_BUSCA = literal_column("'portugues_unaccent'::regconfig")
+
+async def _carregar_historico(db_session, conversa_id: int, id_usuario) -> Optional[list]:
+    """
+    Checa a posse da conversa e busca as últimas 10 mensagens numa única consulta
+    (LEFT JOIN LATERAL). Retorna None se a conversa não existe ou é de outro usuário.
+    """
+    ultimas = select(
+        HistoricoMensagem.tipo,
+        HistoricoMensagem.mensagem_texto,
+        HistoricoMensagem.data_hora,
+        HistoricoMensagem.id_historico,
+    ).where(
+        HistoricoMensagem.id_conversa == Conversa.id_conversa
+    ).order_by(
+        desc(HistoricoMensagem.data_hora), desc(HistoricoMensagem.id_historico)
+    ).limit(10).lateral("ultimas")
+    
+    stmt = select(Conversa.id_conversa, ultimas.c.tipo, ultimas.c.mensagem_texto).outerjoin(
+        ultimas, true()
+    ).where(
+        Conversa.id_conversa == conversa_id,
+        Conversa.id_usuario == id_usuario
+    ).order_by(ultimas.c.data_hora, ultimas.c.id_historico)
+    
+    linhas = (await db_session.execute(stmt)).all()
+    if not linhas:
+        return None
+    # Conversa sem mensagens volta uma linha com as colunas do LATERAL nulas
+    return [linha for linha in linhas if linha.tipo is not None]
+
+
+async def _persistir_turno(
+    db_session,
+    conversa_id: Optional[int],
+    id_usuario,
+    titulo: str,
+    mensagens: list[tuple[str, str, str, datetime]],
+    data_ultima_msg: datetime,
+) -> Optional[int]:
+    """
+    Grava as mensagens do turno e atualiza (ou cria) a conversa num único INSERT ... SELECT
+    com CTE de escrita. Retorna o id da conversa, ou None se ela sumiu durante a geração.
+    """
+    if conversa_id:
+        stmt_conversa = update(Conversa).where(
+            Conversa.id_conversa == conversa_id,
+            Conversa.id_usuario == id_usuario
+        ).values(data_ultima_msg=data_ultima_msg)
+    else:
+        stmt_conversa = insert(Conversa).values(
+            id_usuario=id_usuario,
+            titulo=titulo,
+            data_inicio=mensagens[0][3],
+            data_ultima_msg=data_ultima_msg
+        )
+    conversa = stmt_conversa.returning(Conversa.id_conversa).cte("conversa")
+    
+    linhas = values(
+        column("mensagem_texto", Text),
+        column("tipo", String),
+        column("origem_contexto", String),
+        column("data_hora", DateTime),
+        name="mensagens"
+    ).data(mensagens)
+    
+    stmt = insert(HistoricoMensagem).from_select(
+        ["id_conversa", "id_usuario", "mensagem_texto", "tipo", "origem_contexto", "data_hora"],
+        select(
+            conversa.c.id_conversa,
+            literal(id_usuario, HistoricoMensagem.id_usuario.type),
+            linhas.c.mensagem_texto,
+            linhas.c.tipo,
+            linhas.c.origem_contexto,
+            linhas.c.data_hora,
+        ).select_from(conversa).join(linhas, true())
+    ).returning(HistoricoMensagem.id_conversa)
+    
+    return (await db_session.execute(stmt)).scalars().first()
+
+
 @router.post("/chat", response_model=ChatOut)
 async def chat_with_ai(
     request: ChatIn,
     user: LocalUserDep,
     auth_user: LoggedUserDep,
-    db_session: SessionDep
+    db_session: SessionDep,
+    response: Response,
 ) -> ChatOut:
     """
     Endpoint para chat com IA - requer login e permissão chat:access.
@@ -29,29 +122,22 @@ async def chat_with_ai(
     # Validar permissão usando o novo sistema
     await validate_permission(auth_user, Permissions.CHAT_ACCESS)
     
+    id_usuario, nome_usuario = user.id_usuario, user.nome
+    data_pergunta = datetime.utcnow()
+    
+    # 429 antes de tocar no banco ou no LLM se o usuário estourou o limite
+    verificar_limite_usuario(id_usuario)
+    
     try:
-        # 1. Buscar ou criar conversa
-        conversa = None
+        # 1. Checar a conversa e buscar o histórico (uma consulta)
         historico_conversa = ""
         
         if request.conversa_id:
-            # Buscar conversa existente
-            stmt = select(Conversa).where(
-                Conversa.id_conversa == request.conversa_id,
-                Conversa.id_usuario == user.id_usuario
-            )
-            conversa = await db_session.scalar(stmt)
-            
-            if not conversa:
-                raise HTTPException(status_code=404, detail="Conversa não encontrada")
-            
-            # Buscar histórico para contexto
-            stmt_historico = select(HistoricoMensagem).where(
-                HistoricoMensagem.id_conversa == request.conversa_id
-            ).order_by(HistoricoMensagem.data_hora.desc()).limit(10)
-            
-            mensagens_anteriores = await db_session.scalars(stmt_historico)
-            historico_list = list(reversed(list(mensagens_anteriores)))
+            with span("db.carregar_historico", conversa_id=request.conversa_id) as s:
+                historico_list = await _carregar_historico(db_session, request.conversa_id, id_usuario)
+                if historico_list is None:
+                    raise HTTPException(status_code=404, detail="Conversa não encontrada")
+                s.definir(mensagens=len(historico_list))
             
             # Formar contexto do histórico
             if historico_list:
@@ -60,53 +146,49 @@ async def chat_with_ai(
                     for msg in historico_list
                 ])
         
-        else:
-            # Criar nova conversa
-            titulo = request.message[:50] + "..." if len(request.message) > 50 else request.message
-            conversa = Conversa(
-                id_usuario=user.id_usuario,
-                titulo=titulo
-            )
-            db_session.add(conversa)
-            await db_session.flush()  # Para obter o ID
-        
-        # 2. Gerar resposta da IA
-        resposta = await gerar_resposta(historico_conversa, request.message, user.nome)
-        
-        # 3. Determinar origem do contexto (simplificado)
-        origem_contexto = "local"  # Você pode modificar gerar_resposta para retornar isso
+        # Devolve a conexão ao pool enquanto o LLM responde; a sessão reabre uma no passo 3
+        await db_session.close()
         
-        # 4. Salvar mensagem do usuário
-        msg_usuario = HistoricoMensagem(
-            id_conversa=conversa.id_conversa,
-            id_usuario=user.id_usuario,
-            mensagem_texto=request.message,
-            tipo="user",
-            origem_contexto="none"
-        )
-        db_session.add(msg_usuario)
+        # 2. Gerar resposta da IA (import tardio: o módulo já foi carregado no aquecimento)
+        from app.services.ai_service import gerar_resposta
+        with span("rag.gerar_resposta"):
+            # Vaga no limite global de gerações (fila limitada, 503 com Retry-After se lotar)
+            async with admissao_llm.admitir():
+                resposta, origem_contexto = await gerar_resposta(
+                    historico_conversa, request.message, nome_usuario, request.tags, request.documentos
+                )
         
-        # 5. Salvar resposta da IA
-        msg_assistant = HistoricoMensagem(
-            id_conversa=conversa.id_conversa,
-            id_usuario=user.id_usuario,
-            mensagem_texto=resposta,
-            tipo="assistant",
-            origem_contexto=origem_contexto
-        )
-        db_session.add(msg_assistant)
-        
-        # 6. Atualizar última mensagem da conversa
-        conversa.data_ultima_msg = msg_assistant.data_hora
-        
-        await db_session.commit()
+        # 3. Salvar as duas mensagens e a data da última mensagem num único comando
+        with span("db.persistir_mensagens"):
+            data_resposta = datetime.utcnow()
+            titulo = request.message[:50] + "..." if len(request.message) > 50 else request.message
+            conversa_id = await _persistir_turno(
+                db_session,
+                request.conversa_id,
+                id_usuario,
+                titulo,
+                [
+                    (request.message, "user", "none", data_pergunta),
+                    (resposta, "assistant", origem_contexto, data_resposta),
+                ],
+                data_resposta,
+            )
+            if conversa_id is None:
+                # Conversa apagada enquanto a resposta era gerada
+                raise HTTPException(status_code=404, detail="Conversa não encontrada")
+            
+            await db_session.commit()
+            await marcar_escrita(db_session, response)
         
         return ChatOut(
             response=resposta,
-            conversa_id=conversa.id_conversa,
+            conversa_id=conversa_id,
             origem_contexto=origem_contexto
         )
-        
+    
+    except HTTPException:
+        await db_session.rollback()
+        raise
     except Exception as e:
         await db_session.rollback()
         raise HTTPException(status_code=500, detail=f"Erro ao processar mensagem: {str(e)}")
@@ -117,7 +199,8 @@ async def criar_conversa(
     request: ConversaCreate,
     user: LocalUserDep,
     auth_user: LoggedUserDep,
-    db_session: SessionDep
+    db_session: SessionDep,
+    response: Response,
 ) -> ConversaOut:
     """Criar nova conversa"""
     await validate_permission(auth_user, Permissions.CHAT_ACCESS)
@@ -129,6 +212,7 @@ async def criar_conversa(
     db_session.add(conversa)
     await db_session.commit()
     await db_session.refresh(conversa)
+    await marcar_escrita(db_session, response)
     
     return conversa
 
@@ -137,18 +221,119 @@ async def criar_conversa(
 async def listar_conversas(
     user: LocalUserDep,
     auth_user: LoggedUserDep,
-    db_session: SessionDep
+    db_session: ReadSessionDep,
+    limite: Optional[int] = Query(None, ge=1, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="proximo_cursor da página anterior"),
 ) -> ConversasListResponse:
-    """Listar conversas do usuário"""
+    """Listar conversas do usuário (mais recentes primeiro, paginado por cursor)"""
     await validate_permission(auth_user, Permissions.CHAT_ACCESS)
     
+    tamanho = tamanho_pagina(limite, settings.paginacao_conversas_padrao)
+    
+    # Keyset em (data_ultima_msg, id_conversa), mesma ordem do índice ix_conversas_usuario_ultima_msg.
+    # No Postgres DESC coloca os NULL (conversas sem mensagens) primeiro.
     stmt = select(Conversa).where(
         Conversa.id_usuario == user.id_usuario
-    ).order_by(desc(Conversa.data_ultima_msg))
+    ).order_by(desc(Conversa.data_ultima_msg), desc(Conversa.id_conversa))
+    if tamanho is not None:
+        stmt = stmt.limit(tamanho + 1)
+    
+    if cursor:
+        ultima_msg, id_conversa = decodificar_cursor(cursor, datetime, int)
+        if ultima_msg is None:
+            stmt = stmt.where(or_(
+                and_(Conversa.data_ultima_msg.is_(None), Conversa.id_conversa < id_conversa),
+                Conversa.data_ultima_msg.is_not(None)
+            ))
+        else:
+            stmt = stmt.where(tuple_(Conversa.data_ultima_msg, Conversa.id_conversa) < tuple_(ultima_msg, id_conversa))
+    
+    conversas = list(await db_session.scalars(stmt))
+    
+    proximo_cursor = None
+    if tamanho is not None and len(conversas) > tamanho:
+        conversas = conversas[:tamanho]
+        proximo_cursor = codificar_cursor(conversas[-1].data_ultima_msg, conversas[-1].id_conversa)
+    
+    return ConversasListResponse(conversas=conversas, proximo_cursor=proximo_cursor)
+
+
+# Declarada antes de /conversas/{conversa_id} para "search" não ser lido como id
+@router.get("/conversas/search", response_model=BuscaHistoricoResponse)
+async def buscar_no_historico(
+    user: LocalUserDep,
+    auth_user: LoggedUserDep,
+    db_session: ReadSessionDep,
+    q: str = Query(..., min_length=2, description="Termos da busca (aceita \"frase\", OR e -termo)"),
+    limite: Optional[int] = Query(None, ge=1, description="Resultados por página"),
+    cursor: Optional[str] = Query(None, description="proximo_cursor da página anterior"),
+) -> BuscaHistoricoResponse:
+    """Busca textual nas mensagens de todas as conversas do usuário, por relevância"""
+    await validate_permission(auth_user, Permissions.CHAT_ACCESS)
+    
+    tamanho = tamanho_pagina(limite, settings.paginacao_busca_padrao)
+    consulta = func.websearch_to_tsquery(CONFIG_BUSCA, q)
+    relevancia = func.ts_rank_cd(HistoricoMensagem.mensagem_tsv, consulta).label("relevancia")
+    
+    # Página pelo keyset (relevancia, id_historico) usando o índice GIN em mensagem_tsv
+    stmt_pagina = select(
+        HistoricoMensagem.id_historico,
+        HistoricoMensagem.id_conversa,
+        HistoricoMensagem.tipo,
+        HistoricoMensagem.data_hora,
+        HistoricoMensagem.mensagem_texto,
+        relevancia,
+    ).where(
+        HistoricoMensagem.id_usuario == user.id_usuario,
+        HistoricoMensagem.mensagem_tsv.op("@@")(consulta)
+    ).order_by(desc(relevancia), desc(HistoricoMensagem.id_historico)).limit(tamanho + 1)
     
-    conversas = await db_session.scalars(stmt)
+    if cursor:
+        relevancia_cursor, id_historico = decodificar_cursor(cursor, float, int)
+        stmt_pagina = stmt_pagina.where(
+            tuple_(relevancia, HistoricoMensagem.id_historico) < tuple_(relevancia_cursor, id_historico)
+        )
+    
+    pagina = stmt_pagina.subquery("pagina")
+    
+    # ts_headline é caro: só roda nas linhas da página
+    stmt = select(
+        pagina.c.id_historico,
+        pagina.c.id_conversa,
+        Conversa.titulo,
+        pagina.c.tipo,
+        pagina.c.data_hora,
+        pagina.c.relevancia,
+        func.ts_headline(
+            CONFIG_BUSCA, pagina.c.mensagem_texto, consulta,
+            "MaxFragments=2, MaxWords=30, MinWords=10, StartSel=<b>, StopSel=</b>"
+        ).label("trecho"),
+    ).join(
+        Conversa, Conversa.id_conversa == pagina.c.id_conversa
+    ).order_by(desc(pagina.c.relevancia), desc(pagina.c.id_historico))
+    
+    linhas = (await db_session.execute(stmt)).all()
+    
+    proximo_cursor = None
+    if len(linhas) > tamanho:
+        linhas = linhas[:tamanho]
+        proximo_cursor = codificar_cursor(linhas[-1].relevancia, linhas[-1].id_historico)
     
-    return ConversasListResponse(conversas=list(conversas))
+    return BuscaHistoricoResponse(
+        resultados=[
+            ResultadoBusca(
+                id_historico=linha.id_historico,
+                id_conversa=linha.id_conversa,
+                titulo_conversa=linha.titulo,
+                tipo=linha.tipo,
+                data_hora=linha.data_hora,
+                trecho=linha.trecho,
+                relevancia=linha.relevancia,
+            )
+            for linha in linhas
+        ],
+        proximo_cursor=proximo_cursor
+    )
 
 
 @router.get("/conversas/{conversa_id}", response_model=ConversaComHistorico)
@@ -156,9 +341,16 @@ async def obter_conversa_com_historico(
     conversa_id: int,
     user: LocalUserDep,
     auth_user: LoggedUserDep,
-    db_session: SessionDep
+    db_session: ReadSessionDep,
+    limite: Optional[int] = Query(None, ge=1, description="Mensagens por página"),
+    cursor: Optional[str] = Query(None, description="proximo_cursor para buscar mensagens mais antigas"),
 ) -> ConversaComHistorico:
-    """Obter conversa específica com histórico completo"""
+    """
+    Obter conversa específica com histórico.
+    
+    Retorna as mensagens mais recentes em ordem cronológica; páginas mais antigas
+    vêm pelo proximo_cursor.
+    """
     await validate_permission(auth_user, Permissions.CHAT_ACCESS)
     
     # Buscar conversa
@@ -171,16 +363,32 @@ async def obter_conversa_com_historico(
     if not conversa:
         raise HTTPException(status_code=404, detail="Conversa não encontrada")
     
-    # Buscar histórico
+    tamanho = tamanho_pagina(limite, settings.paginacao_historico_padrao)
+    
+    # Buscar histórico de trás para frente com keyset em (data_hora, id_historico)
     stmt_historico = select(HistoricoMensagem).where(
         HistoricoMensagem.id_conversa == conversa_id
-    ).order_by(HistoricoMensagem.data_hora)
+    ).order_by(desc(HistoricoMensagem.data_hora), desc(HistoricoMensagem.id_historico))
+    if tamanho is not None:
+        stmt_historico = stmt_historico.limit(tamanho + 1)
+    
+    if cursor:
+        data_hora, id_historico = decodificar_cursor(cursor, datetime, int)
+        stmt_historico = stmt_historico.where(
+            tuple_(HistoricoMensagem.data_hora, HistoricoMensagem.id_historico) < tuple_(data_hora, id_historico)
+        )
+    
+    historico = list(await db_session.scalars(stmt_historico))
     
-    historico = await db_session.scalars(stmt_historico)
+    proximo_cursor = None
+    if tamanho is not None and len(historico) > tamanho:
+        historico = historico[:tamanho]
+        proximo_cursor = codificar_cursor(historico[-1].data_hora, historico[-1].id_historico)
     
     return ConversaComHistorico(
         conversa=conversa,
-        historico=list(historico)
+        historico=list(reversed(historico)),
+        proximo_cursor=proximo_cursor
     )
 
 
@@ -189,22 +397,23 @@ async def deletar_conversa(
     conversa_id: int,
     user: LocalUserDep,
     auth_user: LoggedUserDep,
-    db_session: SessionDep
+    db_session: SessionDep,
+    response: Response,
 ):
     """Deletar conversa e todo seu histórico"""
     await validate_permission(auth_user, Permissions.CHAT_ACCESS)
     
-    stmt = select(Conversa).where(
+    # Um único DELETE: o ON DELETE CASCADE da FK apaga as mensagens no próprio banco
+    stmt = delete(Conversa).where(
         Conversa.id_conversa == conversa_id,
         Conversa.id_usuario == user.id_usuario
-    )
-    conversa = await db_session.scalar(stmt)
+    ).returning(Conversa.id_conversa)
     
-    if not conversa:
+    if not (await db_session.execute(stmt)).scalar():
         raise HTTPException(status_code=404, detail="Conversa não encontrada")
     
-    await db_session.delete(conversa)
     await db_session.commit()
+    await marcar_escrita(db_session, response)
     
     return {"message": "Conversa deletada com sucesso"}
 
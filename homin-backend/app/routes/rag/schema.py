@@ -1,10 +1,13 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+import uuid
 
 class ChatIn(BaseModel):
     message: str = Field(min_length=1, description="Mensagem para a IA")
     conversa_id: Optional[int] = Field(None, description="ID da conversa existente (opcional para nova conversa)")
+    tags: Optional[List[str]] = Field(None, description="Restringe a busca a documentos com alguma destas tags")
+    documentos: Optional[List[uuid.UUID]] = Field(None, description="Restringe a busca a estes documentos")
 
 class ChatOut(BaseModel):
     response: str = Field(description="Resposta da IA")
@@ -36,6 +39,21 @@ class MensagemHistorico(BaseModel):
 class ConversaComHistorico(BaseModel):
     conversa: ConversaOut
     historico: List[MensagemHistorico]
+    proximo_cursor: Optional[str] = Field(None, description="Cursor para buscar mensagens mais antigas (null se não houver)")
 
 class ConversasListResponse(BaseModel):
-    conversas: List[ConversaOut]
\ No newline at end of file
+    conversas: List[ConversaOut]
+    proximo_cursor: Optional[str] = Field(None, description="Cursor para a próxima página (null se não houver)")
+
+class ResultadoBusca(BaseModel):
+    id_historico: int
+    id_conversa: int
+    titulo_conversa: Optional[str]
+    tipo: str
+    data_hora: datetime
+    trecho: str = Field(description="Trecho da mensagem com os termos encontrados entre <b></b>")
+    relevancia: float
+
+class BuscaHistoricoResponse(BaseModel):
+    resultados: List[ResultadoBusca]
+    proximo_cursor: Optional[str] = Field(None, description="Cursor para a próxima página (null se não houver)")
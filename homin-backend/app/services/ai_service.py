@@ -1,22 +1,32 @@
-import os
-from dotenv import load_dotenv
-import openai
-from langchain_core.output_parsers import StrOutputParser
-from langchain_community.document_loaders import PyPDFDirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma, chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-import dotenv
-
-CAMINHO_BANCO_DE_DADOS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'banco_de_dados')
-
-load_dotenv()
-OPENAI_API_KEY=os.getenv("OPENAI_API_KEY")
+import json
+import asyncio
+import logging
+from typing import NamedTuple
+from langchain_core.prompts import ChatPromptTemplate
+from app.config import settings
+from app.services.model_router import MODELO_EMBEDDING, cliente_http, embeddings, invocar, obter_chat, rota
+from app.services.web_search_service import buscar_na_web, normalizar_consulta
+from app.services.knowledge_service import enfileirar_para_revisao
+from app.services.document_service import montar_filtro
+from app.core.tracing import span
+from app.core.metrics import registrar_uso_llm, CLASSIFICACOES, ORIGEM_CONTEXTO
+from app.services.vector_store import COLECAO_DOCUMENTOS, COLECAO_WEB, obter_indice
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = settings.openai_api_key
+
+# Embeddings e modelos de chat de cada etapa vêm do roteador (app/services/model_router.py)
+
+
+async def pre_conectar_clientes() -> None:
+    """Abre as conexões do pool HTTP com a OpenAI sem gastar tokens (listagem de modelos)"""
+    await obter_chat(rota("resposta_medica").modelos[0]).root_async_client.models.list()
+
+
+async def fechar_clientes() -> None:
+    await cliente_http.aclose()
 
 
 def extrair_primeiro_nome(nome: str | None) -> str | None:
@@ -31,9 +41,27 @@ def extrair_primeiro_nome(nome: str | None) -> str | None:
     except Exception:
         return primeiro
 
-agente_classificador = Agent(
-    model=OpenAIChat(id="gpt-4o"),
-    instructions=""" 
+def buscar_contexto(vetor, k, filtro=None, incluir_web=True):
+    """
+    Busca na base de PDFs e na coleção de conhecimento web aprovado, juntando pelos melhores scores.
+    `filtro` (where no formato do Chroma) vale só para os PDFs e é aplicado antes da busca vetorial.
+    """
+    resultados = obter_indice(COLECAO_DOCUMENTOS).buscar(vetor, k, filtro)
+    if incluir_web:
+        try:
+            resultados += obter_indice(COLECAO_WEB).buscar(vetor, k)
+        except Exception as e:
+            logger.warning("coleção de conhecimento web indisponível", extra={"erro": str(e)})
+    return sorted(resultados, key=lambda r: r[1], reverse=True)[:k]
+
+# ========== PROMPTS ==========
+# Parte fixa (persona e instruções) vai na mensagem de sistema, no começo: é o prefixo que o provedor
+# consegue reaproveitar do cache entre chamadas. O que varia vem depois, do mais estável (nome, histórico,
+# que só cresce no fim) para o mais volátil (contexto e pergunta). Templates compilados uma vez no import.
+
+PERSONA = "Você é a Touch, assistente do Homin focada em saúde do homem."
+
+INSTRUCOES_CLASSIFICADOR = """
     Você é um classificador de mensagens . 
     Classifique a mensagem do usuário em UMA das categorias:
     
@@ -41,56 +69,91 @@ agente_classificador = Agent(
     - MEDICA: perguntas relacionadas à saúde, sintomas, tratamentos
     - GERAL: outras perguntas não relacionadas à saúde
     
-    Responda APENAS com a categoria: SOCIAL, MEDICA ou GERAL""",
-    markdown=False,
-)
+    Responda APENAS com a categoria: SOCIAL, MEDICA ou GERAL"""
+
+INSTRUCOES_SOCIAL = "Responda de forma amigável e natural ao cumprimento/agradecimento/despedida, considerando o contexto da conversa. Use o primeiro nome do usuário quando apropriado para personalizar a resposta. Se apropriado, ofereça ajuda com temas de saúde masculina. Seja calorosa mas mantenha o foco profissional."
+
+INSTRUCOES_RESPOSTA = "Responda de forma clara, amigável, considerando o contexto da conversa anterior. Use o nome do usuário quando apropriado para personalizar a resposta. Cite a fonte das informações quando possível."
+
+PROMPT_CLASSIFICACAO = ChatPromptTemplate.from_messages([
+    ("system", INSTRUCOES_CLASSIFICADOR),
+    ("human", "{mensagem}"),
+])
+
+PROMPT_SOCIAL = ChatPromptTemplate.from_messages([
+    ("system", f"{PERSONA}\n\n{INSTRUCOES_SOCIAL}"),
+    ("human", "{perfil}{historico}O usuário disse: {pergunta}"),
+])
+
+PROMPT_RESPOSTA = ChatPromptTemplate.from_messages([
+    ("system", f"{PERSONA}\n\n{INSTRUCOES_RESPOSTA}"),
+    ("human", "{perfil}{historico}{contexto}\n\nPergunta do usuário: {pergunta}"),
+])
+
+
+def _secoes_do_usuario(historico_conversa, nome_usuario) -> dict:
+    """Partes variáveis por usuário/conversa, na ordem em que entram na mensagem"""
+    primeiro_nome = extrair_primeiro_nome(nome_usuario)
+    return {
+        "perfil": f"Informação do usuário: O primeiro nome do usuário é {primeiro_nome}.\n" if primeiro_nome else "",
+        "historico": f"Histórico da conversa:\n{historico_conversa}\n\n" if historico_conversa else "",
+    }
+
+
+class ContextoPergunta(NamedTuple):
+    categoria: str
+    contexto_final: str
+    origem_contexto: str
+
 
-async def gerar_resposta(historico_conversa, entrada_usuario, nome_usuario=None):
+# Chave é a pergunta normalizada (mesma do cache da busca web) mais o filtro de documentos
+coalescedor_contexto = SingleFlight("coalescencia_contexto")
+
+
+async def _preparar_contexto(entrada_usuario, filtro=None, incluir_web=True) -> ContextoPergunta:
+    """Etapas que só dependem da pergunta (e dos filtros): embedding, busca vetorial, classificação e busca web"""
     # Primeiro, fazer uma busca rápida na base para ver se há conteúdo relevante
-    print("🔍 [DEBUG] Verificando relevância na base local...")
-    db = Chroma(persist_directory=CAMINHO_BANCO_DE_DADOS, embedding_function=OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY, model='text-embedding-3-small'))
-    resultados_busca = db.similarity_search_with_relevance_scores(entrada_usuario, k=2)
+    logger.debug("verificando relevância na base local")
+
+    # A pergunta é embedada uma vez só e o mesmo vetor serve para todas as buscas
+    with span("rag.embedding", modelo=MODELO_EMBEDDING):
+        vetor_pergunta = await embeddings.aembed_query(entrada_usuario)
+        registrar_uso_llm(MODELO_EMBEDDING, "embedding")
+
+    with span("rag.busca_vetorial", k=4, filtro=filtro) as s:
+        resultados = await asyncio.to_thread(buscar_contexto, vetor_pergunta, 4, filtro, incluir_web)
+        s.definir(scores=[round(r[1], 3) for r in resultados])
+    resultados_busca = resultados[:2]
     
     # Verificar se há conteúdo relevante na base (Chroma usa distância cosine, valores menores = mais similares)
-    tem_conteudo_relevante = resultados_busca and resultados_busca[0][1] > -0.5
+    tem_conteudo_relevante = bool(resultados_busca) and resultados_busca[0][1] > -0.5
     
     # Classificar com contexto sobre a base
-    try:
-        contexto_classificacao = ""
-        if tem_conteudo_relevante:
-            contexto_classificacao = "\n\nNOTA: Há documentos relevantes na base de conhecimento para esta pergunta."
-        
-        prompt_classificacao = f"{entrada_usuario}{contexto_classificacao}"
-        resposta = await agente_classificador.arun(prompt_classificacao)
-        categoria = resposta.content.strip().upper()
-        print(f"✅ [DEBUG] Categoria classificada: '{categoria}' (base relevante: {tem_conteudo_relevante})")
-    except Exception:
-        categoria = "MEDICA" if tem_conteudo_relevante else "GERAL"  # Se tem conteúdo relevante, força MEDICA
+    with span("rag.classificacao", base_relevante=tem_conteudo_relevante) as s:
+        try:
+            contexto_classificacao = ""
+            if tem_conteudo_relevante:
+                contexto_classificacao = "\n\nNOTA: Há documentos relevantes na base de conhecimento para esta pergunta."
+            
+            prompt_classificacao = f"{entrada_usuario}{contexto_classificacao}"
+            resposta, uso = await invocar(
+                "classificacao", PROMPT_CLASSIFICACAO.format_messages(mensagem=prompt_classificacao)
+            )
+            s.definir(**uso)
+            categoria = resposta.content.strip().upper()
+            logger.info("categoria classificada", extra={"categoria": categoria, "base_relevante": tem_conteudo_relevante})
+        except Exception as e:
+            categoria = "MEDICA" if tem_conteudo_relevante else "GERAL"  # Se tem conteúdo relevante, força MEDICA
+            logger.warning("falha no classificador, usando fallback", extra={"categoria": categoria, "erro": str(e)})
+        s.definir(categoria=categoria)
+    CLASSIFICACOES.labels(categoria=categoria if categoria in ("SOCIAL", "MEDICA", "GERAL") else "OUTRA").inc()
 
-    #  Para SOCIAL, usar modelo com contexto específico
     if categoria == "SOCIAL":
-        historico_texto = ""
-        if historico_conversa:
-            historico_texto = f"Histórico da conversa:\n{historico_conversa}\n"
-        
-        primeiro_nome = extrair_primeiro_nome(nome_usuario)
-        nome_texto = f"Informação do usuário: O primeiro nome do usuário é {primeiro_nome}.\n" if primeiro_nome else ""
-        
-        prompt_social = f"""Você é a Touch, assistente do Homin focada em saúde do homem.
-        
-        {nome_texto}
-        {historico_texto}
-        
-        O usuário disse: {entrada_usuario}  
-        
-        Responda de forma amigável e natural ao cumprimento/agradecimento/despedida, considerando o contexto da conversa. Use o primeiro nome do usuário quando apropriado para personalizar a resposta. Se apropriado, ofereça ajuda com temas de saúde masculina. Seja calorosa mas mantenha o foco profissional."""
-
-        model = ChatOpenAI(model="gpt-4o", openai_api_key=OPENAI_API_KEY, temperature=0.3)
-        resposta_social = await model.ainvoke(prompt_social)
-        return resposta_social.content
+        return ContextoPergunta(categoria, "", "social")
 
     # Inicializar contexto_final
     contexto_final = "Conhecimento geral sobre saúde do homem"
+    origem_contexto = "none"
 
     # GERAL - mas se tem conteúdo relevante trata como MEDICA
     if categoria == "GERAL" and not tem_conteudo_relevante:
@@ -98,26 +161,16 @@ async def gerar_resposta(historico_conversa, entrada_usuario, nome_usuario=None)
 
     # MEDICA ou GERAL com conteúdo relevante - busca local e web se necessário
     else:
-        # Usar os resultados já obtidos
-        print("🔍 [DEBUG] Fazendo busca detalhada por similaridade...")
-        resultados = db.similarity_search_with_relevance_scores(entrada_usuario, k=4)
-        
-        # Debug melhorado
-        if resultados:
-            print(f"🔍 [DEBUG] Scores encontrados: {[round(r[1], 3) for r in resultados]}")
+        # Usar os resultados já obtidos (busca com k=4 feita acima)
+        logger.debug("scores encontrados", extra={"scores": [round(r[1], 3) for r in resultados]})
 
         # Se não achou nada bom localmente busca web (Chroma: valores menores = mais similares)
         if len(resultados) == 0 or resultados[0][1] > -0.3:
-            print("🌍 [DEBUG] Score baixo ou sem resultados - buscando na web...")
-            try:
-                agente_busca = Agent(
-                    tools=[DuckDuckGoTools()],
-                    instructions="Busque informações sobre saúde do homem"
-                )
-                resultado = await agente_busca.arun(entrada_usuario)
-                resposta_busca = resultado.content
-            except Exception:
-                resposta_busca = ""
+            logger.info("score baixo ou sem resultados, buscando na web")
+            # Agente único, com cache por pergunta, orçamento de tempo e limite de concorrência
+            with span("rag.busca_web") as s:
+                resposta_busca = await buscar_na_web(entrada_usuario)
+                s.definir(encontrou=bool(resposta_busca))
         else:
             resposta_busca = ""
 
@@ -125,31 +178,53 @@ async def gerar_resposta(historico_conversa, entrada_usuario, nome_usuario=None)
         if resultados and resultados[0][1] <= -0.4:
             contexto_docs = "\n".join([doc[0].page_content for doc in resultados])
             contexto_final = f"Com base nos documentos internos:\n{contexto_docs}"
-            print("✅ [DEBUG] Usando documentos da base local!")
+            origem_contexto = "local"
+            logger.info("usando documentos da base local")
         elif resposta_busca:
             contexto_final = f"Com base em informações encontradas na web:\n{resposta_busca}"
-            print("🌍 [DEBUG] Usando busca web!")
-
-    # Gerar resposta final
-    historico_texto_final = ""
-    if historico_conversa:
-        historico_texto_final = f"Histórico da conversa:\n{historico_conversa}\n"
+            origem_contexto = "web"
+            logger.info("usando contexto da busca web")
+            # Guarda para revisão do admin, que pode promover para a base local
+            await enfileirar_para_revisao(entrada_usuario, resposta_busca)
+
+    return ContextoPergunta(categoria, contexto_final, origem_contexto)
+
+
+async def gerar_resposta(historico_conversa, entrada_usuario, nome_usuario=None, tags=None, id_documentos=None):
+    """
+    Gera a resposta da Touch e retorna (resposta, origem_contexto), origem em local/web/social/none.
+    A busca considera só documentos ativos; `tags`/`id_documentos` restringem mais (e deixam de fora
+    o conhecimento web aprovado, que não pertence a nenhum documento).
+    """
+    filtro = montar_filtro(tags, id_documentos)
+    incluir_web = not (tags or id_documentos)
+    chave = f"{normalizar_consulta(entrada_usuario)}|{json.dumps(filtro, sort_keys=True)}"
+
+    # Perguntas iguais em paralelo (de usuários diferentes) compartilham embedding, buscas e classificação;
+    # histórico e nome entram só na geração, que continua por requisição
+    with span("rag.preparo_contexto") as s:
+        preparo = await coalescedor_contexto.executar(
+            chave, lambda: _preparar_contexto(entrada_usuario, filtro, incluir_web)
+        )
+        s.definir(categoria=preparo.categoria)
+    categoria, contexto_final, origem_contexto = preparo
+
+    secoes = _secoes_do_usuario(historico_conversa, nome_usuario)
 
-    primeiro_nome_final = extrair_primeiro_nome(nome_usuario)
-    nome_texto_final = f"Informação do usuário: O primeiro nome do usuário é {primeiro_nome_final}.\n" if primeiro_nome_final else ""
-    
-    prompt = f"""Você é a Touch, assistente do Homin focada em saúde do homem.
-    
-    {nome_texto_final}
-    {historico_texto_final}
-    
-    {contexto_final}
-
-    Pergunta do usuário: {entrada_usuario}
-
-    Responda de forma clara, amigável, considerando o contexto da conversa anterior. Use o nome do usuário quando apropriado para personalizar a resposta. Cite a fonte das informações quando possível."""
+    #  Para SOCIAL, usar modelo com contexto específico
+    if categoria == "SOCIAL":
+        mensagens = PROMPT_SOCIAL.format_messages(**secoes, pergunta=entrada_usuario)
+        with span("rag.geracao", tipo="social") as s:
+            resposta_social, uso = await invocar("social", mensagens, temperatura=0.3)
+            s.definir(**uso)
+        ORIGEM_CONTEXTO.labels(origem="social").inc()
+        return resposta_social.content, "social"
 
-    model = ChatOpenAI(model="gpt-4o", openai_api_key=OPENAI_API_KEY, temperature=0)
-    resposta_final = await model.ainvoke(prompt)
+    # Gerar resposta final
+    mensagens = PROMPT_RESPOSTA.format_messages(**secoes, contexto=contexto_final, pergunta=entrada_usuario)
+    with span("rag.geracao", tipo="resposta") as s:
+        resposta_final, uso = await invocar("resposta_medica", mensagens)
+        s.definir(**uso)
 
-    return resposta_final.content
\ No newline at end of file
+    ORIGEM_CONTEXTO.labels(origem=origem_contexto).inc()
+    return resposta_final.content, origem_contexto
@@ -1,5 +1,6 @@
 import os
 import json
+import logging
 import requests
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
@@ -10,10 +11,14 @@ from typing import Dict, List, Annotated
 from sqlalchemy import select
 from app.core.permissions import Permissions
 from app.database.models import Usuario
+from app.database.config import AsyncSessionLocal
 from app.utils.deps import SessionDep, verify_jwt
+from app.core.tracing import span
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN")
 AUTH0_CLIENT_ID = os.getenv("AUTH0_CLIENT_ID")
 AUTH0_CLIENT_SECRET = os.getenv("AUTH0_CLIENT_SECRET")
@@ -102,7 +107,7 @@ def get_user_permissions_from_auth0(access_token: str):
                 return 'user'  # default
                 
     except Exception as e:
-        print(f"⚠️ Erro ao obter permissões do Auth0: {e}")
+        logger.warning("erro ao obter permissões do Auth0", extra={"erro": str(e)})
     
     return 'user'  # fallback
 
@@ -117,7 +122,7 @@ async def sync_user_to_local_db(payload: Dict, db_session: SessionDep, access_to
         permissions = payload.get("permissions", [])
         
         if not auth0_sub:
-            print(f"⚠️ Sub ausente - não é possível sincronizar. Payload: {payload}")
+            logger.warning("sub ausente, não é possível sincronizar o usuário")
             return
         
         # Determinar role baseado nas permissões
@@ -138,7 +143,7 @@ async def sync_user_to_local_db(payload: Dict, db_session: SessionDep, access_to
         if not user:
             # Se não tem email (JWT), não criar usuário - só no callback
             if not email:
-                print(f"ℹ️ Usuário {auth0_sub} não encontrado na base local. Aguardando callback com email.")
+                logger.info("usuário não encontrado na base local, aguardando callback com email", extra={"auth0_sub": auth0_sub})
                 return
                 
             # Primeira vez: criar usuário (só no callback quando tem email)
@@ -150,7 +155,7 @@ async def sync_user_to_local_db(payload: Dict, db_session: SessionDep, access_to
             )
             db_session.add(user)
             await db_session.commit()
-            print(f"✅ Novo usuário criado: {email} (role: {user_role}, sub: {auth0_sub})")
+            logger.info("novo usuário criado", extra={"email": email, "role": user_role, "auth0_sub": auth0_sub})
         else:
             # Atualizar dados se mudaram
             updated = False
@@ -174,28 +179,30 @@ async def sync_user_to_local_db(payload: Dict, db_session: SessionDep, access_to
                 old_role = user.role
                 user.role = user_role
                 updated = True
-                print(f"✅ Role atualizado para {user.email or auth0_sub}: {old_role} -> {user_role}")
+                logger.info("role atualizado", extra={"usuario": user.email or auth0_sub, "role_anterior": old_role, "role": user_role})
             
             if updated:
                 await db_session.commit()
-                print(f"✅ Usuário atualizado: {user.email or auth0_sub}")
+                logger.info("usuário atualizado", extra={"usuario": user.email or auth0_sub})
                 
     except Exception as e:
-        print(f"⚠️ Erro ao sincronizar usuário na base local: {e}")
+        logger.warning("erro ao sincronizar usuário na base local", extra={"erro": str(e)})
         # Não falha - continua com auth normal
 
 
 async def get_current_user(
-    db_session: SessionDep,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> Dict:
     """Obtém o usuário atual validando o JWT + sincroniza na base local"""
     token = credentials.credentials
-    payload = verify_jwt(token)
+    with span("auth.verificar_jwt"):
+        payload = verify_jwt(token)
     
-    # Sincronizar com base local (em background, sem bloquear)
+    # Sincronizar com base local numa sessão curta, fechada antes da rota (não prende conexão do primário)
     # Usar o próprio token JWT como access_token para buscar permissões
-    await sync_user_to_local_db(payload, db_session, access_token=token)
+    with span("auth.sincronizar_usuario"):
+        async with AsyncSessionLocal() as sessao:
+            await sync_user_to_local_db(payload, sessao, access_token=token)
     
     return payload
 
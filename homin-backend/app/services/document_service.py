@@ -1,13 +1,29 @@
 import os
+import time
 import asyncio
+import hashlib
+import logging
+import contextvars
+from collections import Counter
+from datetime import datetime
+from typing import NamedTuple
 from concurrent.futures import ThreadPoolExecutor
-from langchain_community.document_loaders import PyPDFDirectoryLoader
+from sqlalchemy import select
+from pypdf import PdfReader
+from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-from dotenv import load_dotenv
+from app.config import settings
+from app.core.metrics import DURACAO_INGESTAO
+from app.database.config import AsyncSessionLocal
+from app.database.models import Documento
+from app.services.web_search_service import normalizar_consulta
+from app.services.model_router import embeddings
+from app.services.vector_store import COLECAO_DOCUMENTOS, obter_indice
+from app.services.storage import obter_armazenamento
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# PDFs de antes do armazenamento por conteúdo (e os copiados direto aqui) continuam sendo indexados desta pasta
 PASTA_BASE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'base_conhecimento')
 if not os.path.exists(PASTA_BASE):
     os.makedirs(PASTA_BASE)
@@ -15,59 +31,234 @@ if not os.path.exists(PASTA_BASE):
 # Executor para tarefas pesadas em background
 executor = ThreadPoolExecutor(max_workers=1)
 
-def criar_db_sync():
-    """Versão síncrona original - roda em thread separada"""
-    print("🚀 Iniciando criação do banco de dados...")
-    
+# Chaves de metadados que vêm da linha em `documentos` (as de tag são "tag_<slug>": True, uma por tag,
+# porque o Chroma não filtra por item de lista)
+CAMPOS_DOCUMENTO = ("id_documento", "nome_arquivo", "tipo_documento", "data_upload", "ativo")
+PREFIXO_TAG = "tag_"
+
+
+# ========== METADADOS DOS CHUNKS ==========
+
+def normalizar_tags(tags) -> list[str]:
+    """minúsculas, sem acento, espaços viram _ e sem repetição (mesma forma no banco e no Chroma)"""
+    normalizadas = []
+    for tag in tags or []:
+        slug = normalizar_consulta(tag).replace(" ", "_")
+        if slug and slug not in normalizadas:
+            normalizadas.append(slug)
+    return normalizadas
+
+
+def metadados_documento(documento: Documento) -> dict:
+    metadados = {
+        "id_documento": str(documento.id_documento),
+        "nome_arquivo": documento.nome_arquivo,
+        "tipo_documento": documento.tipo_documento or "application/pdf",
+        "data_upload": int(documento.data_criacao.timestamp()) if documento.data_criacao else 0,
+        "ativo": bool(documento.ativo),
+    }
+    metadados.update({f"{PREFIXO_TAG}{tag}": True for tag in documento.tags or []})
+    return metadados
+
+
+def montar_filtro(tags=None, id_documentos=None, somente_ativos: bool = True) -> dict | None:
+    """Filtro `where` do Chroma, aplicado antes da busca vetorial"""
+    condicoes = []
+    if somente_ativos:
+        condicoes.append({"ativo": True})
+    if tags:
+        por_tag = [{f"{PREFIXO_TAG}{tag}": True} for tag in normalizar_tags(tags)]
+        condicoes.append(por_tag[0] if len(por_tag) == 1 else {"$or": por_tag})
+    if id_documentos:
+        condicoes.append({"id_documento": {"$in": [str(i) for i in id_documentos]}})
+
+    if not condicoes:
+        return None
+    return condicoes[0] if len(condicoes) == 1 else {"$and": condicoes}
+
+
+# ========== FONTES DA INDEXAÇÃO ==========
+
+class FonteDocumento(NamedTuple):
+    """Um PDF a indexar: no armazenamento (`chave`) ou solto em PASTA_BASE (`caminho`)"""
+    nome_arquivo: str
+    metadados: dict
+    chave: str | None = None
+    caminho: str | None = None
+
+
+def fontes_da_pasta(ignorar: set[str] = frozenset()) -> list[FonteDocumento]:
+    """PDFs soltos em PASTA_BASE (sem subpastas); sem linha em `documentos`, entram ativos e sem tags"""
+    return [
+        FonteDocumento(nome, {"nome_arquivo": nome, "ativo": True}, caminho=os.path.join(PASTA_BASE, nome))
+        for nome in sorted(os.listdir(PASTA_BASE))
+        if nome.lower().endswith(".pdf") and not nome.startswith(".") and nome not in ignorar
+        and os.path.isfile(os.path.join(PASTA_BASE, nome))
+    ]
+
+
+async def listar_fontes() -> list[FonteDocumento]:
+    """Linhas de `documentos` (pela chave no armazenamento ou, as antigas, pelo nome em PASTA_BASE) + PDFs soltos"""
+    async with AsyncSessionLocal() as sessao:
+        documentos = list(await sessao.scalars(select(Documento)))
+
+    fontes, nomes_antigos = [], set()
+    for documento in documentos:
+        if documento.chave_armazenamento:
+            fontes.append(FonteDocumento(documento.nome_arquivo, metadados_documento(documento), chave=documento.chave_armazenamento))
+        elif documento.nome_arquivo not in nomes_antigos:
+            # Antigos com o mesmo nome dividiam o mesmo arquivo: só o primeiro é indexado
+            nomes_antigos.add(documento.nome_arquivo)
+            caminho = os.path.join(PASTA_BASE, documento.nome_arquivo)
+            if os.path.isfile(caminho):
+                fontes.append(FonteDocumento(documento.nome_arquivo, metadados_documento(documento), caminho=caminho))
+    return fontes + fontes_da_pasta(nomes_antigos)
+
+
+def _origem(metadados: dict) -> str:
+    # id do documento; PDF solto na pasta não tem linha no banco e fica identificado pelo nome
+    return metadados.get("id_documento") or metadados.get("nome_arquivo", "")
+
+
+def _id_chunk(chunk) -> str:
+    # Determinístico: reindexar sobrescreve (upsert) em vez de duplicar os chunks
+    chave = f"{_origem(chunk.metadata)}:{chunk.metadata.get('page', 0)}:{chunk.metadata.get('start_index', 0)}"
+    return hashlib.sha1(chave.encode("utf-8")).hexdigest()
+
+
+def contar_por_documento(fontes: list[FonteDocumento], documentos, chunks, falhas=frozenset()) -> dict[str, dict]:
+    """
+    id_documento (ou nome, se solto na pasta) -> páginas, chunks e tamanho, para o catálogo em `documentos`;
+    `falhas` são as origens que não abriram nesta passada
+    """
+    paginas = Counter(_origem(doc.metadata) for doc in documentos)
+    por_documento = Counter(_origem(chunk.metadata) for chunk in chunks)
+    return {
+        _origem(fonte.metadados): {
+            "paginas": paginas[_origem(fonte.metadados)],
+            "chunks": por_documento[_origem(fonte.metadados)],
+            "falhou_leitura": _origem(fonte.metadados) in falhas,
+            # Os do armazenamento já têm o tamanho gravado no upload
+            "tamanho_bytes": os.path.getsize(fonte.caminho) if fonte.caminho and os.path.isfile(fonte.caminho) else None,
+        }
+        for fonte in fontes
+    }
+
+
+async def registrar_indexacao(estatisticas: dict[str, dict], sucesso: bool) -> None:
+    """Grava o resultado da passada de indexação nas linhas de `documentos` (o catálogo não lê a pasta)"""
+    agora = datetime.utcnow()
+    async with AsyncSessionLocal() as sessao:
+        for documento in await sessao.scalars(select(Documento)):
+            info = estatisticas.get(str(documento.id_documento))
+            if not sucesso:
+                # Falhou a passada inteira: o que estava indexado continua na base vetorial
+                if documento.status_indexacao == "pendente":
+                    documento.status_indexacao = "erro"
+                continue
+            if info is not None and info["falhou_leitura"]:
+                # Não abriu desta vez: os chunks da indexação anterior continuam na base (e a contagem também)
+                documento.status_indexacao = "erro"
+                continue
+            if info is None or not info["chunks"]:
+                # Arquivo sumiu, não abriu ou o PDF não tem texto extraível: nenhum chunk dele ficou na base
+                documento.status_indexacao = "erro"
+                documento.chunks = 0
+                continue
+            documento.paginas = info["paginas"]
+            documento.chunks = info["chunks"]
+            documento.tamanho_bytes = documento.tamanho_bytes or info["tamanho_bytes"]
+            documento.status_indexacao = "indexado"
+            documento.data_indexacao = agora
+        await sessao.commit()
+
+
+def criar_db_sync(fontes: list[FonteDocumento] | None = None, estatisticas: dict | None = None):
+    """
+    Versão síncrona original - roda em thread separada; `estatisticas` recebe o contar_por_documento.
+    Sem `fontes` (listar_fontes precisa do loop async), indexa só os PDFs soltos em PASTA_BASE.
+    """
     # Verificar se a pasta base existe
     if not os.path.exists(PASTA_BASE):
-        print(f"❌ Erro: Pasta {PASTA_BASE} não encontrada!")
+        logger.error("pasta base não encontrada", extra={"pasta": PASTA_BASE})
         return False
     
-    print(f"✅ Pasta base encontrada: {PASTA_BASE}")
-    
     try:
-        documentos = carregar_documentos()
-        print(f"✅ Documentos carregados: {len(documentos)}")
+        if fontes is None:
+            fontes = fontes_da_pasta()
+        falhas = set()
+        documentos = carregar_documentos(fontes, falhas)
+        logger.info("documentos carregados", extra={"fontes": len(fontes), "paginas": len(documentos), "falhas": len(falhas)})
         
         chunks = dividir_chuncks(documentos)
-        print(f"✅ Chunks criados: {len(chunks)}")
         
-        db = vetorizar_chuncks(chunks)
-        print("✅ Banco de dados criado com sucesso!")
+        db = vetorizar_chuncks(chunks, preservar=falhas)
+        if estatisticas is not None:
+            estatisticas.update(contar_por_documento(fontes, documentos, chunks, falhas))
         return True
         
     except Exception as e:
-        print(f"❌ Erro durante criação do banco: {str(e)}")
+        logger.error("erro durante a indexação", extra={"erro": str(e)})
         return False
 
 async def criar_db_async():
     """Versão async - não bloqueia a aplicação"""
-    print("🔄 Processando PDFs em background...")
     loop = asyncio.get_event_loop()
     
     # Roda a função pesada em thread separada
-    result = await loop.run_in_executor(executor, criar_db_sync)
+    inicio = time.perf_counter()
+    fontes = await listar_fontes()
+    estatisticas = {}
+    # No contexto da requisição: os logs da thread saem com o trace_id dela
+    contexto = contextvars.copy_context()
+    result = await loop.run_in_executor(executor, contexto.run, criar_db_sync, fontes, estatisticas)
+    DURACAO_INGESTAO.labels(resultado="sucesso" if result else "erro").observe(time.perf_counter() - inicio)
+    try:
+        await registrar_indexacao(estatisticas, result)
+    except Exception as e:
+        logger.warning("indexação feita, mas falhou ao atualizar o catálogo", extra={"erro": str(e)})
     
     if result:
-        print("✅ Indexação concluída! IA atualizada.")
+        logger.info("indexação concluída", extra={"documentos": len(fontes)})
     else:
-        print("❌ Erro na indexação.")
+        logger.error("indexação falhou", extra={"documentos": len(fontes)})
     
     return result
 
 def criar_db():
     """Função original - use criar_db_async() nos endpoints"""
-    return criar_db_sync()
+    return criar_db_sync(asyncio.run(listar_fontes()))
+
+def _abrir_fonte(fonte: FonteDocumento):
+    return obter_armazenamento().abrir(fonte.chave) if fonte.chave else open(fonte.caminho, "rb")
 
-def carregar_documentos():
-    print("📄 Carregando documentos...")
-    carregador = PyPDFDirectoryLoader(PASTA_BASE)
-    documentos = carregador.load() 
+def carregar_documentos(fontes: list[FonteDocumento], falhas: set | None = None):
+    """
+    Uma página por Document; o pypdf lê do arquivo aberto sob demanda (no S3, um temporário em memória/disco).
+    A origem (_origem) de cada PDF que não abriu vai para `falhas`.
+    """
+    documentos = []
+    for fonte in fontes:
+        origem = fonte.chave or fonte.caminho
+        try:
+            with _abrir_fonte(fonte) as arquivo:
+                leitor = PdfReader(arquivo)
+                paginas = [
+                    Document(
+                        page_content=pagina.extract_text() or "",
+                        metadata={"source": origem, "page": numero, "total_pages": len(leitor.pages), **fonte.metadados},
+                    )
+                    for numero, pagina in enumerate(leitor.pages)
+                ]
+            documentos.extend(paginas)
+        except Exception as e:
+            # Um PDF ilegível não derruba a indexação dos outros: fica com status "erro" no catálogo
+            if falhas is not None:
+                falhas.add(_origem(fonte.metadados))
+            logger.warning("falha ao ler PDF", extra={"nome_arquivo": fonte.nome_arquivo, "origem": origem, "erro": str(e)})
     return documentos
 
 def dividir_chuncks(documentos):
-    print("✂️ Dividindo documentos em chunks...")
     
     separador_documentos = RecursiveCharacterTextSplitter(
         chunk_size=2000,
@@ -79,24 +270,92 @@ def dividir_chuncks(documentos):
     chuncks = separador_documentos.split_documents(documentos)
     return chuncks
 
-def vetorizar_chuncks(chuncks):
-    print("🔍 Vetorizando chunks...")
+def vetorizar_chuncks(chuncks, preservar=frozenset()):
     
-    CAMINHO_BANCO_DE_DADOS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'banco_de_dados')
-    
-    # Criar pasta se não existir
-    os.makedirs(CAMINHO_BANCO_DE_DADOS, exist_ok=True)
+    indice = obter_indice(COLECAO_DOCUMENTOS)
+    ids = [_id_chunk(chunk) for chunk in chuncks]
+    textos = [chunk.page_content for chunk in chuncks]
+    # Mesmo modelo de embedding da pergunta (o padrão antigo do OpenAIEmbeddings aqui era outro modelo)
+    vetores = embeddings.embed_documents(textos)
+    indice.inserir(ids, vetores, textos, [chunk.metadata for chunk in chuncks])
+
+    # Remove chunks que não vieram desta indexação (PDF removido, ou ids aleatórios de versões antigas), menos
+    # os das origens em `preservar`: uma falha passageira de leitura não tira o documento da busca
+    novos = set(ids)
+    obsoletos = [
+        id_chunk for id_chunk, metadados in zip(*indice.obter())
+        if id_chunk not in novos and _origem(metadados) not in preservar
+    ]
+    if obsoletos:
+        indice.remover(ids=obsoletos)
+        logger.info("chunks obsoletos removidos", extra={"chunks": len(obsoletos)})
     
-    db = Chroma.from_documents(
-        documents=chuncks,
-        embedding=OpenAIEmbeddings(),
-        persist_directory=CAMINHO_BANCO_DE_DADOS
+    logger.info("base vetorial atualizada", extra={
+        "backend": settings.vetores_backend, "chunks_indexados": len(ids), "chunks_total": indice.contar(),
+    })
+    return indice
+
+
+# ========== ATUALIZAÇÃO SEM REINDEXAR ==========
+
+def _atualizar_metadados_sync(indice, documento_id: str, novos: dict) -> int:
+    ids, atuais = indice.obter(filtro={"id_documento": documento_id})
+    if not ids:
+        return 0
+    # atualizar_metadados mescla as chaves: tag que saiu precisa ir como None para ser apagada
+    metadados = []
+    for antigo in atuais:
+        tags_removidas = {chave: None for chave in antigo if chave.startswith(PREFIXO_TAG) and chave not in novos}
+        metadados.append({**tags_removidas, **novos})
+    indice.atualizar_metadados(ids, metadados)
+    return len(ids)
+
+
+async def atualizar_metadados_chunks(documento: Documento) -> int:
+    """Reaplica tags/ativo do documento nos chunks já indexados, sem gerar embeddings de novo"""
+    return await asyncio.to_thread(
+        _atualizar_metadados_sync, obter_indice(COLECAO_DOCUMENTOS), str(documento.id_documento), metadados_documento(documento)
     )
-    
-    print(f"✅ Banco salvo em: {CAMINHO_BANCO_DE_DADOS}")
-    return db
+
+
+def _completar_metadados_sync(indice, documentos: list[Documento]) -> int:
+    ids, metadados = indice.obter()
+    antigos = [(id_chunk, atuais) for id_chunk, atuais in zip(ids, metadados) if "ativo" not in atuais]
+    if not antigos:
+        return 0
+    # Mesma regra do listar_fontes: antigos com o mesmo nome dividiam o arquivo e valem pelo primeiro
+    por_nome: dict[str, Documento] = {}
+    for documento in documentos:
+        por_nome.setdefault(documento.nome_arquivo, documento)
+    novos = []
+    for _, atuais in antigos:
+        nome = atuais.get("nome_arquivo") or os.path.basename(atuais.get("source", ""))
+        documento = por_nome.get(nome)
+        novos.append(metadados_documento(documento) if documento else {"nome_arquivo": nome, "ativo": True})
+    indice.atualizar_metadados([id_chunk for id_chunk, _ in antigos], novos)
+    return len(antigos)
+
+
+async def completar_metadados_antigos() -> int:
+    """
+    Chunks indexados antes dos metadados de documento não têm `ativo` e ficariam fora do filtro padrão:
+    completa id/nome/ativo/tags pelo arquivo em `source`, sem gerar embeddings. Roda no aquecimento.
+    """
+    async with AsyncSessionLocal() as sessao:
+        documentos = list(await sessao.scalars(select(Documento).where(Documento.chave_armazenamento.is_(None))))
+    completados = await asyncio.to_thread(_completar_metadados_sync, obter_indice(COLECAO_DOCUMENTOS), documentos)
+    if completados:
+        logger.info("metadados completados em chunks antigos", extra={"chunks": completados})
+    return completados
+
+
+async def remover_chunks(documento_id) -> None:
+    indice = obter_indice(COLECAO_DOCUMENTOS)
+    await asyncio.to_thread(indice.remover, filtro={"id_documento": str(documento_id)})
 
 if __name__ == "__main__":
+    from app.core.logs import configurar_logging
+    configurar_logging()
     sucesso = criar_db()
     if sucesso:
         print("🎉 Banco de dados criado com sucesso!")
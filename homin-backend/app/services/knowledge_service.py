@@ -0,0 +1,84 @@
+import re
+import asyncio
+import logging
+from datetime import datetime
+from sqlalchemy import select
+from app.config import settings
+from app.database.config import AsyncSessionLocal
+from app.database.models import ConhecimentoWeb
+from app.services.web_search_service import normalizar_consulta
+from app.services.model_router import embeddings
+from app.services.vector_store import COLECAO_WEB, obter_indice
+
+logger = logging.getLogger(__name__)
+
+_REGEX_URL = re.compile(r"https?://[^\s<>\"')\]]+")
+
+def extrair_fontes(texto: str) -> list[str]:
+    """Extrai as URLs citadas no texto da busca web, sem repetir e na ordem em que aparecem"""
+    fontes = []
+    for url in _REGEX_URL.findall(texto or ""):
+        url = url.rstrip(".,;:")
+        if url not in fontes:
+            fontes.append(url)
+    return fontes
+
+
+async def enfileirar_para_revisao(pergunta: str, conteudo: str) -> None:
+    """
+    Guarda o contexto vindo da web para revisão de um admin (só se a promoção estiver habilitada).
+    Nunca levanta exceção: falhar aqui não pode derrubar o chat.
+    """
+    if not settings.promocao_web_habilitada or not conteudo:
+        return
+
+    consulta_normalizada = normalizar_consulta(pergunta)
+    try:
+        async with AsyncSessionLocal() as session:
+            # Evita enfileirar de novo uma pergunta que já está em revisão ou já foi aprovada
+            stmt = select(ConhecimentoWeb.id_conhecimento).where(
+                ConhecimentoWeb.consulta_normalizada == consulta_normalizada,
+                ConhecimentoWeb.status.in_(["pendente", "aprovado"])
+            ).limit(1)
+            if await session.scalar(stmt):
+                return
+
+            session.add(ConhecimentoWeb(
+                pergunta=pergunta,
+                consulta_normalizada=consulta_normalizada,
+                conteudo=conteudo,
+                fontes=extrair_fontes(conteudo),
+                status="pendente"
+            ))
+            await session.commit()
+    except Exception as e:
+        logger.warning("erro ao enfileirar conhecimento web para revisão", extra={"erro": str(e)})
+
+
+def _id_vetor(item: ConhecimentoWeb) -> str:
+    return f"web-{item.id_conhecimento}"
+
+
+async def indexar_conhecimento(item: ConhecimentoWeb) -> None:
+    """Vetoriza só este item na coleção web (incremental, sem reconstruir a base)"""
+    texto = f"Pergunta: {item.pergunta}\n{item.conteudo}"
+    metadados = {
+        "origem": "web",
+        "id_conhecimento": item.id_conhecimento,
+        "fontes": ", ".join(item.fontes or []),
+    }
+    vetores = await embeddings.aembed_documents([texto])
+    indice = obter_indice(COLECAO_WEB)
+    await asyncio.to_thread(indice.inserir, [_id_vetor(item)], vetores, [texto], [metadados])
+
+
+async def remover_conhecimento(item: ConhecimentoWeb) -> None:
+    """Remove o item da coleção web (ex.: admin rejeitou algo que já tinha aprovado)"""
+    indice = obter_indice(COLECAO_WEB)
+    await asyncio.to_thread(indice.remover, ids=[_id_vetor(item)])
+
+
+def marcar_revisao(item: ConhecimentoWeb, status: str, id_revisor) -> None:
+    item.status = status
+    item.id_revisor = id_revisor
+    item.data_revisao = datetime.utcnow()
@@ -0,0 +1,115 @@
+import time
+import asyncio
+import logging
+from typing import NamedTuple
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from app.config import settings
+from app.core.metrics import registrar_uso_llm, registrar_etapa_llm, FALHAS_MODELO
+
+logger = logging.getLogger(__name__)
+
+# Um pool HTTP para embeddings e chats: as conexões TLS abertas no aquecimento servem a todos
+cliente_http = httpx.AsyncClient(
+    timeout=httpx.Timeout(60.0, connect=10.0),
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+)
+
+# Um modelo de embedding só para indexar e para a pergunta: vetores de modelos diferentes não se comparam
+MODELO_EMBEDDING = 'text-embedding-3-small'
+embeddings = OpenAIEmbeddings(openai_api_key=settings.openai_api_key, model=MODELO_EMBEDDING, http_async_client=cliente_http)
+
+# USD por 1M de tokens (entrada, entrada lida do cache de prompt, saída); modelo fora da tabela fica sem custo
+PRECO_POR_MILHAO_TOKENS = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+
+
+class Rota(NamedTuple):
+    modelos: list[str]
+    timeout: float
+
+
+def rota(etapa: str) -> Rota:
+    """Modelos (em ordem de preferência) e timeout de uma etapa, lidos do Settings"""
+    rotas = {
+        "classificacao": Rota(settings.modelos_classificacao, settings.timeout_classificacao_segundos),
+        "social": Rota(settings.modelos_social, settings.timeout_social_segundos),
+        "resposta_medica": Rota(settings.modelos_resposta_medica, settings.timeout_resposta_medica_segundos),
+        "busca_web": Rota(settings.modelos_busca_web, settings.busca_web_timeout_segundos),
+    }
+    return rotas[etapa]
+
+
+_clientes: dict[tuple[str, float], ChatOpenAI] = {}
+
+
+def obter_chat(modelo: str, temperatura: float = 0) -> ChatOpenAI:
+    """ChatOpenAI criado uma vez por (modelo, temperatura), todos no mesmo pool HTTP"""
+    chave = (modelo, temperatura)
+    if chave not in _clientes:
+        _clientes[chave] = ChatOpenAI(
+            model=modelo, openai_api_key=settings.openai_api_key, temperature=temperatura, http_async_client=cliente_http
+        )
+    return _clientes[chave]
+
+
+def custo_estimado(modelo: str, tokens_entrada: int | None, tokens_saida: int | None,
+                   tokens_cache: int | None = None) -> float | None:
+    """tokens_entrada inclui os lidos do cache, que saem pelo preço reduzido"""
+    preco = PRECO_POR_MILHAO_TOKENS.get(modelo)
+    if preco is None or (tokens_entrada is None and tokens_saida is None):
+        return None
+    cache = min(tokens_cache or 0, tokens_entrada or 0)
+    return ((tokens_entrada or 0) - cache) * preco[0] / 1e6 + cache * preco[1] / 1e6 + (tokens_saida or 0) * preco[2] / 1e6
+
+
+def registrar_chamada(etapa: str, modelo: str, tipo: str, segundos: float, tokens_entrada: int | None = None,
+                      tokens_saida: int | None = None, tokens_cache: int | None = None) -> dict:
+    """Métricas por modelo e por etapa; devolve os atributos para o span da etapa"""
+    registrar_uso_llm(modelo, tipo, tokens_entrada, tokens_saida, tokens_cache)
+    custo = custo_estimado(modelo, tokens_entrada, tokens_saida, tokens_cache)
+    registrar_etapa_llm(etapa, modelo, segundos, custo)
+    return {
+        "modelo": modelo, "tokens_entrada": tokens_entrada, "tokens_saida": tokens_saida,
+        "tokens_cache": tokens_cache, "custo_usd": custo,
+    }
+
+
+def registrar_falha(etapa: str, modelo: str, erro: BaseException) -> None:
+    motivo = "timeout" if isinstance(erro, TimeoutError) else "erro"
+    FALHAS_MODELO.labels(etapa=etapa, modelo=modelo, motivo=motivo).inc()
+    logger.warning("modelo falhou, tentando o próximo da rota", extra={
+        "etapa": etapa, "modelo": modelo, "motivo": motivo, "erro": str(erro) or type(erro).__name__,
+    })
+
+
+async def invocar(etapa: str, mensagens, temperatura: float = 0):
+    """
+    Chama os modelos da rota da etapa em ordem até um responder dentro do timeout.
+    Retorna (mensagem, atributos da chamada); se todos falharem, repassa o último erro.
+    """
+    modelos, timeout = rota(etapa)
+    ultimo_erro: Exception | None = None
+    for modelo in modelos:
+        inicio = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout):
+                resposta = await obter_chat(modelo, temperatura).ainvoke(mensagens)
+        except Exception as e:
+            registrar_falha(etapa, modelo, e)
+            ultimo_erro = e
+            continue
+
+        uso = getattr(resposta, "usage_metadata", None) or {}
+        atributos = registrar_chamada(
+            etapa, modelo, "chat", time.perf_counter() - inicio,
+            uso.get("input_tokens"), uso.get("output_tokens"), (uso.get("input_token_details") or {}).get("cache_read"),
+        )
+        return resposta, atributos
+
+    raise ultimo_erro or RuntimeError(f"nenhum modelo configurado para a etapa {etapa}")
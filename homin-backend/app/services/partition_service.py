@@ -0,0 +1,226 @@
+import os
+import re
+import gzip
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from sqlalchemy import text
+from app.config import settings
+from app.database.config import async_engine
+from app.core.tracing import span
+from app.core.metrics import PARTICOES_ATE, LINHAS_PARTICAO_DEFAULT
+
+# historico_mensagem é particionada por mês de data_hora (migração a4f6c8e0b2d1)
+TABELA = "historico_mensagem"
+_REGEX_PARTICAO = re.compile(rf"^{TABELA}_p(\d{{4}})_(\d{{2}})$")
+# Recebe o que não tem partição do mês (manutenção parada além da folga); migração 7b3d5f9e1a26
+PARTICAO_DEFAULT = f"{TABELA}_default"
+
+PASTA_ARQUIVO_PADRAO = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'arquivo_historico')
+
+# Chave do advisory lock: com vários workers, só um roda a manutenção por vez
+_CHAVE_LOCK = 48_151_623
+
+logger = logging.getLogger(__name__)
+
+
+def somar_meses(mes: date, quantidade: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + quantidade
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nome_particao(mes: date) -> str:
+    return f"{TABELA}_p{mes:%Y_%m}"
+
+
+async def _existe(conexao, nome: str) -> bool:
+    return await conexao.scalar(text("SELECT to_regclass(:nome) IS NOT NULL"), {"nome": nome})
+
+
+async def criar_particoes(conexao, inicio: date, fim: date) -> list[str]:
+    """
+    Cria (se faltarem) as partições mensais de `inicio` até `fim`, inclusive. Mensagens desses meses que
+    caíram na partição DEFAULT passam para a nova: rodar numa transação, para a mudança ser atômica.
+    """
+    tem_default = await _existe(conexao, PARTICAO_DEFAULT)
+    criadas = []
+    mes = inicio.replace(day=1)
+    while mes <= fim:
+        nome = nome_particao(mes)
+        if not await _existe(conexao, nome):
+            de, ate = mes.isoformat(), somar_meses(mes, 1).isoformat()
+            movidas = 0
+            if tem_default:
+                # CREATE ... PARTITION OF falha se a DEFAULT tiver linhas do intervalo: elas saem antes e
+                # voltam pela tabela pai. O lock impede que outras caiam na DEFAULT no meio do caminho.
+                await conexao.execute(text(f"LOCK TABLE {PARTICAO_DEFAULT} IN ACCESS EXCLUSIVE MODE"))
+                intervalo = f"data_hora >= '{de}' AND data_hora < '{ate}'"
+                movidas = (await conexao.execute(text(
+                    f"CREATE TEMP TABLE {nome}_movidas ON COMMIT DROP AS "
+                    f"SELECT * FROM {PARTICAO_DEFAULT} WHERE {intervalo}"
+                ))).rowcount
+                if movidas:
+                    await conexao.execute(text(f"DELETE FROM {PARTICAO_DEFAULT} WHERE {intervalo}"))
+            await conexao.execute(text(
+                f"CREATE TABLE {nome} PARTITION OF {TABELA} FOR VALUES FROM ('{de}') TO ('{ate}')"
+            ))
+            if movidas:
+                await conexao.execute(text(f"INSERT INTO {TABELA} SELECT * FROM {nome}_movidas"))
+                logger.warning("mensagens da partição DEFAULT movidas", extra={"particao": nome, "linhas": movidas})
+            criadas.append(nome)
+        mes = somar_meses(mes, 1)
+    return criadas
+
+
+async def atualizar_metricas_particoes(conexao) -> None:
+    """Fim do último mês particionado e linhas na DEFAULT, para alertar antes de a folga acabar"""
+    resultado = await conexao.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:tabela)
+    """), {"tabela": TABELA})
+    meses = [
+        date(int(encontrado[1]), int(encontrado[2]), 1)
+        for (nome,) in resultado.all() if (encontrado := _REGEX_PARTICAO.match(nome))
+    ]
+    if meses:
+        # data_hora é gravada em UTC
+        fim = somar_meses(max(meses), 1)
+        PARTICOES_ATE.set(datetime(fim.year, fim.month, 1, tzinfo=timezone.utc).timestamp())
+    if await _existe(conexao, PARTICAO_DEFAULT):
+        LINHAS_PARTICAO_DEFAULT.set(await conexao.scalar(text(f"SELECT count(*) FROM {PARTICAO_DEFAULT}")))
+
+
+async def _particoes_antigas(conexao, corte: date) -> list[tuple[str, bool]]:
+    """Partições (anexadas ou já desanexadas) com mês anterior ao corte: (nome, anexada)"""
+    resultado = await conexao.execute(text("""
+        SELECT c.relname, i.inhparent IS NOT NULL AS anexada
+        FROM pg_class c
+        LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+        WHERE c.relkind = 'r' AND c.relname LIKE :padrao
+        ORDER BY c.relname
+    """), {"padrao": f"{TABELA}_p%"})
+
+    antigas = []
+    for nome, anexada in resultado.all():
+        encontrado = _REGEX_PARTICAO.match(nome)
+        if encontrado and date(int(encontrado[1]), int(encontrado[2]), 1) < corte:
+            antigas.append((nome, anexada))
+    return antigas
+
+
+# Bytes do COPY acumulados antes de cada compressão (feita fora do event loop)
+_BLOCO_EXPORTACAO = 4 * 1024 * 1024
+
+
+async def _exportar_particao(conexao, nome: str, pasta: str) -> tuple[str, int]:
+    """COPY da partição para pasta/<nome>.csv.gz (escreve em .tmp e renomeia no fim)"""
+    await asyncio.to_thread(os.makedirs, pasta, exist_ok=True)
+    destino = os.path.join(pasta, f"{nome}.csv.gz")
+    temporario = destino + ".tmp"
+
+    bruta = await conexao.get_raw_connection()
+    arquivo = await asyncio.to_thread(gzip.open, temporario, "wb")
+    try:
+        buffer = bytearray()
+
+        async def escrever(dados: bytes):
+            # O gzip de um mês inteiro travaria o loop: comprime em blocos numa thread
+            buffer.extend(dados)
+            if len(buffer) >= _BLOCO_EXPORTACAO:
+                bloco = bytes(buffer)
+                buffer.clear()
+                await asyncio.to_thread(arquivo.write, bloco)
+
+        status = await bruta.driver_connection.copy_from_table(nome, output=escrever, format="csv", header=True)
+        await asyncio.to_thread(arquivo.write, bytes(buffer))
+    finally:
+        await asyncio.to_thread(arquivo.close)
+
+    await asyncio.to_thread(os.replace, temporario, destino)
+    return destino, int(status.split()[-1])
+
+
+async def arquivar_particoes(conexao, retencao_meses: int, pasta: str) -> list[dict]:
+    """
+    Desanexa as partições mais antigas que a retenção, exporta cada uma para .csv.gz e só então apaga a
+    tabela. Se algo falhar no meio, a próxima execução retoma.
+    """
+    corte = somar_meses(date.today().replace(day=1), -retencao_meses)
+    arquivadas = []
+
+    for nome, anexada in await _particoes_antigas(conexao, corte):
+        if anexada:
+            pendente = await conexao.scalar(text(
+                "SELECT inhdetachpending FROM pg_inherits WHERE inhrelid = to_regclass(:nome)"
+            ), {"nome": nome})
+            if pendente:
+                # DETACH CONCURRENTLY interrompido (de antes da partição DEFAULT) deixa a partição pendente
+                await conexao.execute(text(f"ALTER TABLE {TABELA} DETACH PARTITION {nome} FINALIZE"))
+            else:
+                # Com partição DEFAULT o Postgres não aceita CONCURRENTLY: DETACH normal numa transação curta,
+                # que desiste pelo lock_timeout em vez de enfileirar as escritas do histórico atrás dela
+                async with async_engine.begin() as transacao:
+                    await transacao.execute(
+                        text("SELECT set_config('lock_timeout', :espera, true)"),
+                        {"espera": f"{int(settings.historico_desanexar_lock_timeout_segundos * 1000)}ms"},
+                    )
+                    await transacao.execute(text(f"ALTER TABLE {TABELA} DETACH PARTITION {nome}"))
+
+        caminho, linhas = await _exportar_particao(conexao, nome, pasta)
+        await conexao.execute(text(f"DROP TABLE {nome}"))
+        arquivadas.append({"particao": nome, "arquivo": caminho, "linhas": linhas})
+        logger.info("partição arquivada", extra={"particao": nome, "arquivo": caminho, "linhas": linhas})
+
+    return arquivadas
+
+
+async def executar_manutencao() -> dict:
+    """Garante as partições dos próximos meses e, se habilitado, arquiva as antigas"""
+    resumo = {"criadas": [], "arquivadas": [], "executou": False}
+
+    # AUTOCOMMIT: o advisory lock vale pela sessão e o FINALIZE de partição pendente não roda em transação
+    async with async_engine.connect() as conexao:
+        conexao = await conexao.execution_options(isolation_level="AUTOCOMMIT")
+        if not await conexao.scalar(text("SELECT pg_try_advisory_lock(:chave)"), {"chave": _CHAVE_LOCK}):
+            return resumo
+
+        try:
+            with span("manutencao.particoes") as s:
+                mes_atual = date.today().replace(day=1)
+                # Transação própria: a mudança de linhas da DEFAULT precisa ser atômica (esta conexão é AUTOCOMMIT)
+                async with async_engine.begin() as transacao:
+                    resumo["criadas"] = await criar_particoes(
+                        transacao, mes_atual, somar_meses(mes_atual, settings.historico_particoes_meses_a_frente)
+                    )
+                await atualizar_metricas_particoes(conexao)
+                if settings.historico_arquivamento_habilitado:
+                    resumo["arquivadas"] = await arquivar_particoes(
+                        conexao,
+                        settings.historico_retencao_meses,
+                        settings.historico_arquivo_dir or PASTA_ARQUIVO_PADRAO,
+                    )
+                resumo["executou"] = True
+                s.definir(criadas=len(resumo["criadas"]), arquivadas=len(resumo["arquivadas"]))
+        finally:
+            await conexao.scalar(text("SELECT pg_advisory_unlock(:chave)"), {"chave": _CHAVE_LOCK})
+
+    return resumo
+
+
+async def loop_manutencao() -> None:
+    """Tarefa de fundo iniciada no lifespan do FastAPI; roda logo na subida e depois a cada intervalo"""
+    while True:
+        try:
+            resumo = await executar_manutencao()
+            if resumo["criadas"] or resumo["arquivadas"]:
+                logger.info("manutenção do histórico concluída", extra={
+                    "criadas": resumo["criadas"],
+                    "arquivadas": [item["particao"] for item in resumo["arquivadas"]],
+                })
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("erro na manutenção das partições do histórico", extra={"erro": str(e)})
+
+        await asyncio.sleep(settings.historico_manutencao_intervalo_horas * 3600)
@@ -0,0 +1,42 @@
+import os
+import threading
+from app.config import settings
+from app.services.storage.base import ArmazenamentoDocumentos, chave_de_conteudo
+
+# Padrão do backend local; PDFs antigos continuam soltos em app/base_conhecimento (ver document_service)
+PASTA_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'base_conhecimento', 'objetos')
+
+BACKENDS = ("local", "s3")
+
+_armazenamento: ArmazenamentoDocumentos | None = None
+_trava = threading.Lock()
+
+
+def _criar_armazenamento(backend: str) -> ArmazenamentoDocumentos:
+    # import tardio: boto3 só é exigido de quem escolher o S3
+    if backend == "local":
+        from app.services.storage.local import ArmazenamentoLocal
+        return ArmazenamentoLocal(settings.armazenamento_dir or PASTA_PADRAO)
+    if backend == "s3":
+        from app.services.storage.s3 import ArmazenamentoS3
+        return ArmazenamentoS3(
+            settings.s3_bucket, prefixo=settings.s3_prefixo, endpoint_url=settings.s3_endpoint_url,
+            regiao=settings.s3_regiao, chave_acesso=settings.s3_access_key, segredo=settings.s3_secret_key,
+        )
+    raise ValueError(f"backend de armazenamento desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+
+
+def obter_armazenamento() -> ArmazenamentoDocumentos:
+    """Armazenamento dos PDFs no backend configurado (settings.armazenamento_backend), criado uma vez por processo"""
+    global _armazenamento
+    with _trava:
+        if _armazenamento is None:
+            _armazenamento = _criar_armazenamento(settings.armazenamento_backend)
+        return _armazenamento
+
+
+def descartar_armazenamento() -> None:
+    """Esquece o armazenamento criado (ex.: depois de trocar a pasta em benchmarks)"""
+    global _armazenamento
+    with _trava:
+        _armazenamento = None
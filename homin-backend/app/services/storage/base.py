@@ -0,0 +1,30 @@
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+from typing import BinaryIO
+from app.services.upload_service import ArquivoRecebido
+
+
+def chave_de_conteudo(hash_conteudo: str) -> str:
+    """Chave do objeto a partir do sha256: o mesmo conteúdo sempre cai no mesmo lugar (ex.: ab/ab12…ef.pdf)"""
+    return f"{hash_conteudo[:2]}/{hash_conteudo}.pdf"
+
+
+class ArmazenamentoDocumentos(ABC):
+    """
+    Onde ficam os PDFs enviados, endereçados pelo conteúdo. Os uploads são copiados primeiro para
+    `pasta_temporaria` (hash e limite de tamanho em upload_service) e depois entregues a salvar().
+    """
+
+    pasta_temporaria: str
+
+    @abstractmethod
+    async def salvar(self, recebido: ArquivoRecebido) -> str:
+        """Guarda o temporário sob a chave do conteúdo e devolve a chave; se já existir, só descarta o temporário"""
+
+    @abstractmethod
+    def abrir(self, chave: str) -> AbstractContextManager[BinaryIO]:
+        """Arquivo binário com seek para o parser de PDF (síncrono: usado na thread da indexação)"""
+
+    @abstractmethod
+    async def remover(self, chave: str) -> None:
+        ...
@@ -0,0 +1,38 @@
+import os
+from contextlib import contextmanager
+import aiofiles.os
+from app.services.storage.base import ArmazenamentoDocumentos, chave_de_conteudo
+from app.services.upload_service import ArquivoRecebido, descartar_upload
+
+
+class ArmazenamentoLocal(ArmazenamentoDocumentos):
+    """Objetos em <raiz>/<2 primeiros caracteres do hash>/<hash>.pdf; temporários em <raiz>/.tmp (mesmo disco)"""
+
+    def __init__(self, raiz: str):
+        self.raiz = raiz
+        self.pasta_temporaria = os.path.join(raiz, ".tmp")
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.raiz, *chave.split("/"))
+
+    async def salvar(self, recebido: ArquivoRecebido) -> str:
+        chave = chave_de_conteudo(recebido.hash_conteudo)
+        destino = self._caminho(chave)
+        if await aiofiles.os.path.exists(destino):
+            await descartar_upload(recebido.caminho_temporario)
+            return chave
+        await aiofiles.os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # os.replace: quem lê nunca vê o arquivo pela metade (temporário e destino no mesmo disco)
+        await aiofiles.os.replace(recebido.caminho_temporario, destino)
+        return chave
+
+    @contextmanager
+    def abrir(self, chave: str):
+        with open(self._caminho(chave), "rb") as arquivo:
+            yield arquivo
+
+    async def remover(self, chave: str) -> None:
+        try:
+            await aiofiles.os.remove(self._caminho(chave))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,74 @@
+import os
+import asyncio
+import tempfile
+from contextlib import contextmanager
+from app.config import settings
+from app.services.storage.base import ArmazenamentoDocumentos, chave_de_conteudo
+from app.services.upload_service import ArquivoRecebido, descartar_upload
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+
+class ArmazenamentoS3(ArmazenamentoDocumentos):
+    """
+    Bucket S3 ou compatível (MinIO com `endpoint_url`). O envio sai do temporário em disco com upload_file
+    (multipart acima de 8 MB) e a leitura baixa para um SpooledTemporaryFile, que só vai para disco
+    acima de ARMAZENAMENTO_LEITURA_MEMORIA_MB. O cliente do boto3 pode ser usado por várias threads.
+    """
+
+    def __init__(self, bucket: str, prefixo: str = "", endpoint_url: str | None = None, regiao: str | None = None,
+                 chave_acesso: str | None = None, segredo: str | None = None):
+        if boto3 is None:
+            raise RuntimeError("ARMAZENAMENTO_BACKEND=s3 requer o pacote boto3")
+        if not bucket:
+            raise ValueError("ARMAZENAMENTO_BACKEND=s3 requer S3_BUCKET")
+        self.bucket = bucket
+        self.prefixo = prefixo.strip("/")
+        self.pasta_temporaria = os.path.join(tempfile.gettempdir(), "homin-uploads")
+        # Sem chave/segredo, vale a cadeia padrão de credenciais da AWS (variáveis, perfil, IAM role)
+        self._cliente = boto3.client(
+            "s3", endpoint_url=endpoint_url, region_name=regiao,
+            aws_access_key_id=chave_acesso, aws_secret_access_key=segredo,
+        )
+
+    def _objeto(self, chave: str) -> str:
+        return f"{self.prefixo}/{chave}" if self.prefixo else chave
+
+    def _existe(self, chave: str) -> bool:
+        try:
+            self._cliente.head_object(Bucket=self.bucket, Key=self._objeto(chave))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def _enviar(self, recebido: ArquivoRecebido, chave: str) -> None:
+        if not self._existe(chave):
+            self._cliente.upload_file(
+                recebido.caminho_temporario, self.bucket, self._objeto(chave),
+                ExtraArgs={"ContentType": "application/pdf"},
+            )
+
+    async def salvar(self, recebido: ArquivoRecebido) -> str:
+        chave = chave_de_conteudo(recebido.hash_conteudo)
+        try:
+            await asyncio.to_thread(self._enviar, recebido, chave)
+        finally:
+            await descartar_upload(recebido.caminho_temporario)
+        return chave
+
+    @contextmanager
+    def abrir(self, chave: str):
+        limite = settings.armazenamento_leitura_memoria_mb * 1024 * 1024
+        with tempfile.SpooledTemporaryFile(max_size=limite) as arquivo:
+            self._cliente.download_fileobj(self.bucket, self._objeto(chave), arquivo)
+            arquivo.seek(0)
+            yield arquivo
+
+    async def remover(self, chave: str) -> None:
+        await asyncio.to_thread(self._cliente.delete_object, Bucket=self.bucket, Key=self._objeto(chave))
@@ -0,0 +1,241 @@
+import os
+import uuid
+import hashlib
+import zipfile
+import zlib
+from typing import NamedTuple
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+from starlette.responses import JSONResponse
+from app.config import settings
+
+
+class ArquivoGrandeDemais(Exception):
+    def __init__(self, limite_bytes: int):
+        self.limite_bytes = limite_bytes
+        super().__init__(f"arquivo maior que o limite de {limite_bytes // (1024 * 1024)} MB")
+
+
+class ArquivoRecebido(NamedTuple):
+    caminho_temporario: str
+    hash_conteudo: str  # sha256 em hexadecimal
+    tamanho_bytes: int
+
+
+class LoteInvalido(Exception):
+    pass
+
+
+class LoteGrandeDemais(Exception):
+    """O lote inteiro passou de UPLOAD_LOTE_MAXIMO_ARQUIVOS PDFs ou UPLOAD_LOTE_MAXIMO_MB descompactados"""
+
+
+class OrcamentoLote:
+    """Quanto ainda cabe no lote, descontado enquanto os arquivos chegam e os ZIPs são abertos"""
+
+    def __init__(self):
+        self.arquivos = settings.upload_lote_maximo_arquivos
+        self.bytes = settings.upload_lote_maximo_mb * 1024 * 1024
+
+    def reservar_arquivos(self, quantidade: int) -> None:
+        if quantidade > self.arquivos:
+            raise LoteGrandeDemais(f"Lote com mais de {settings.upload_lote_maximo_arquivos} PDFs")
+        self.arquivos -= quantidade
+
+    def consumir_bytes(self, quantidade: int) -> None:
+        self.bytes -= quantidade
+        if self.bytes < 0:
+            raise LoteGrandeDemais(f"Lote com mais de {settings.upload_lote_maximo_mb} MB descompactados")
+
+
+def limite_upload_bytes() -> int:
+    return settings.upload_tamanho_maximo_mb * 1024 * 1024
+
+
+# Multipart em volta do arquivo (boundary, cabeçalhos das partes, tags)
+_FOLGA_MULTIPART = 1024 * 1024
+
+
+def _limite_corpo(metodo: str, caminho: str) -> int | None:
+    if metodo != "POST":
+        return None
+    if caminho == "/documents/upload":
+        return limite_upload_bytes() + _FOLGA_MULTIPART
+    if caminho == "/documents/upload/bulk":
+        # ZIP comprimido não passa do que vira descompactado, então o orçamento do lote também limita o corpo
+        return settings.upload_lote_maximo_mb * 1024 * 1024 + _FOLGA_MULTIPART
+    return None
+
+
+class _CorpoGrandeDemais(Exception):
+    pass
+
+
+class LimiteCorpoUploadMiddleware:
+    """
+    Middleware ASGI que recusa com 413 os uploads acima do limite antes de o Starlette gravar o multipart
+    no spool: pelo Content-Length quando vem, ou contando os bytes recebidos (corpo chunked).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limite = _limite_corpo(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if limite is None:
+            await self.app(scope, receive, send)
+            return
+
+        resposta = JSONResponse(
+            status_code=413, content={"detail": f"Corpo da requisição maior que {limite // (1024 * 1024)} MB"},
+            headers={"Connection": "close"},
+        )
+        cabecalhos = dict(scope["headers"])
+        try:
+            declarado = int(cabecalhos.get(b"content-length", b""))
+        except ValueError:
+            declarado = None
+        if declarado is not None and declarado > limite:
+            await resposta(scope, receive, send)
+            return
+
+        recebidos = 0
+        estourou = iniciada = False
+
+        async def receber():
+            nonlocal recebidos, estourou
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebidos += len(mensagem.get("body", b""))
+                if recebidos > limite:
+                    estourou = True
+                    raise _CorpoGrandeDemais
+            return mensagem
+
+        async def enviar(mensagem):
+            nonlocal iniciada
+            if estourou:
+                # O FastAPI transforma a falha no parse do form em 400: essa resposta é trocada pelo 413
+                return
+            iniciada = iniciada or mensagem["type"] == "http.response.start"
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receber, enviar)
+        except _CorpoGrandeDemais:
+            if iniciada:
+                raise
+        if estourou and not iniciada:
+            await resposta(scope, receive, send)
+
+
+async def receber_upload(arquivo: UploadFile, pasta: str) -> ArquivoRecebido:
+    """
+    Copia o upload em blocos para um temporário em `pasta` (a pasta_temporaria do armazenamento),
+    calculando o sha256 no caminho. Passou do limite: apaga o temporário e levanta ArquivoGrandeDemais.
+    """
+    limite = limite_upload_bytes()
+    # O multipart já foi lido pelo Starlette: quando o tamanho é conhecido, recusa sem copiar nada
+    if arquivo.size is not None and arquivo.size > limite:
+        raise ArquivoGrandeDemais(limite)
+
+    await aiofiles.os.makedirs(pasta, exist_ok=True)
+    caminho = _caminho_temporario(pasta)
+    resumo = hashlib.sha256()
+    tamanho = 0
+    try:
+        async with aiofiles.open(caminho, "wb") as destino:
+            while bloco := await arquivo.read(settings.upload_bloco_bytes):
+                tamanho += len(bloco)
+                if tamanho > limite:
+                    raise ArquivoGrandeDemais(limite)
+                resumo.update(bloco)
+                await destino.write(bloco)
+    except BaseException:
+        await descartar_upload(caminho)
+        raise
+    return ArquivoRecebido(caminho, resumo.hexdigest(), tamanho)
+
+
+def _caminho_temporario(pasta: str) -> str:
+    return os.path.join(pasta, f".upload-{uuid.uuid4().hex}.parcial")
+
+
+def _copiar_com_hash(origem, pasta: str, limite: int, orcamento: OrcamentoLote | None = None) -> ArquivoRecebido:
+    caminho = _caminho_temporario(pasta)
+    resumo = hashlib.sha256()
+    tamanho = 0
+    try:
+        with open(caminho, "wb") as destino:
+            while bloco := origem.read(settings.upload_bloco_bytes):
+                tamanho += len(bloco)
+                if tamanho > limite:
+                    raise ArquivoGrandeDemais(limite)
+                if orcamento is not None:
+                    # bytes descompactados contam mesmo de entradas que depois falharem: barra ZIP-bomba
+                    orcamento.consumir_bytes(len(bloco))
+                resumo.update(bloco)
+                destino.write(bloco)
+    except BaseException:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        raise
+    return ArquivoRecebido(caminho, resumo.hexdigest(), tamanho)
+
+
+def extrair_pdfs_do_zip(
+    caminho_zip: str, pasta: str, orcamento: OrcamentoLote | None = None,
+) -> list[tuple[str, ArquivoRecebido | str]]:
+    """
+    Extrai os PDFs do ZIP para temporários em `pasta` (síncrono: rodar com asyncio.to_thread).
+    Cada item é (nome do arquivo, recebido) ou (nome, motivo do erro). O limite de tamanho vale por PDF e é
+    conferido nos bytes descompactados, não só no tamanho declarado no ZIP. Com `orcamento`, a quantidade de
+    PDFs e o total descompactado do lote são descontados durante a extração (LoteGrandeDemais ao estourar).
+    """
+    if orcamento is None:
+        orcamento = OrcamentoLote()
+    limite = limite_upload_bytes()
+    try:
+        arquivo_zip = zipfile.ZipFile(caminho_zip)
+    except zipfile.BadZipFile:
+        raise LoteInvalido("ZIP inválido ou corrompido")
+
+    with arquivo_zip:
+        entradas = [
+            entrada for entrada in arquivo_zip.infolist()
+            if not entrada.is_dir() and entrada.filename.lower().endswith(".pdf")
+            # pastas de metadados do macOS e arquivos ocultos
+            and not any(parte.startswith(("__MACOSX", ".")) for parte in entrada.filename.split("/"))
+        ]
+        orcamento.reservar_arquivos(len(entradas))
+
+        resultados = []
+        try:
+            for entrada in entradas:
+                nome = os.path.basename(entrada.filename)
+                if entrada.file_size > limite:
+                    resultados.append((nome, str(ArquivoGrandeDemais(limite))))
+                    continue
+                try:
+                    with arquivo_zip.open(entrada) as origem:
+                        resultados.append((nome, _copiar_com_hash(origem, pasta, limite, orcamento)))
+                except (ArquivoGrandeDemais, zipfile.BadZipFile, RuntimeError) as e:
+                    # RuntimeError: entrada protegida por senha
+                    resultados.append((nome, str(e)))
+                except (zlib.error, OSError, EOFError):
+                    # fluxo deflate corrompido ou entrada truncada: só esta entrada falha
+                    resultados.append((nome, "entrada corrompida no ZIP"))
+        except BaseException:
+            for _, item in resultados:
+                if isinstance(item, ArquivoRecebido) and os.path.exists(item.caminho_temporario):
+                    os.remove(item.caminho_temporario)
+            raise
+        return resultados
+
+
+async def descartar_upload(caminho: str) -> None:
+    try:
+        await aiofiles.os.remove(caminho)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,48 @@
+import os
+import threading
+from app.config import settings
+from app.services.vector_store.base import IndiceVetorial, filtro_aceita, relevancia_de_cosseno
+
+# Coleções da aplicação: chunks dos PDFs e conhecimento web aprovado por admin
+COLECAO_DOCUMENTOS = "documentos"
+COLECAO_WEB = "conhecimento_web"
+
+CAMINHO_BANCO_DE_DADOS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'banco_de_dados')
+
+BACKENDS = ("chroma", "pgvector", "numpy")
+
+_indices: dict[tuple[str, str], IndiceVetorial] = {}
+_trava = threading.Lock()
+
+
+def _criar_indice(backend: str, colecao: str) -> IndiceVetorial:
+    pasta = settings.vetores_dir or CAMINHO_BANCO_DE_DADOS
+    # imports tardios: cada backend só carrega a dependência dele (chromadb, pgvector, numpy)
+    if backend == "chroma":
+        from app.services.vector_store.chroma import IndiceChroma
+        return IndiceChroma(colecao, pasta)
+    if backend == "pgvector":
+        from app.services.vector_store.pgvector import IndicePgvector
+        return IndicePgvector(colecao)
+    if backend == "numpy":
+        from app.services.vector_store.numpy_index import IndiceNumpy
+        return IndiceNumpy(
+            colecao, os.path.join(pasta, "numpy"), hnsw=settings.vetores_hnsw, quantizacao=settings.vetores_quantizacao,
+            dimensoes=settings.vetores_dimensoes, reordenar=settings.vetores_reordenar,
+        )
+    raise ValueError(f"backend de vetores desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+
+
+def obter_indice(colecao: str, backend: str | None = None) -> IndiceVetorial:
+    """Índice da coleção no backend configurado (settings.vetores_backend), aberto uma vez por processo"""
+    chave = (backend or settings.vetores_backend, colecao)
+    with _trava:
+        if chave not in _indices:
+            _indices[chave] = _criar_indice(*chave)
+        return _indices[chave]
+
+
+def descartar_indices() -> None:
+    """Esquece os índices abertos (ex.: depois de trocar a pasta da base em benchmarks)"""
+    with _trava:
+        _indices.clear()
@@ -0,0 +1,86 @@
+import math
+from abc import ABC, abstractmethod
+from langchain_core.documents import Document
+
+# Escala dos scores devolvidos por buscar(): a mesma relevância que o Chroma (distância L2 ao quadrado)
+# entregava via langchain, 1 - d²/√2. Os limiares de gerar_resposta foram calibrados nela.
+# Com vetores normalizados d² = 2 - 2·cos, então a conversão a partir do cosseno é direta.
+
+
+def relevancia_de_cosseno(cosseno: float) -> float:
+    return 1.0 - (2.0 - 2.0 * cosseno) / math.sqrt(2)
+
+
+def relevancia_de_distancia_l2(distancia_quadrada: float) -> float:
+    return 1.0 - distancia_quadrada / math.sqrt(2)
+
+
+def filtro_aceita(metadados: dict, filtro: dict | None) -> bool:
+    """Avalia um filtro `where` no formato do Chroma ($and, $or, $eq, $ne, $in, $nin) contra um metadado"""
+    if not filtro:
+        return True
+    for chave, condicao in filtro.items():
+        if chave == "$and":
+            if not all(filtro_aceita(metadados, parte) for parte in condicao):
+                return False
+        elif chave == "$or":
+            if not any(filtro_aceita(metadados, parte) for parte in condicao):
+                return False
+        elif not _condicao_aceita(metadados.get(chave), condicao):
+            return False
+    return True
+
+
+def _condicao_aceita(valor, condicao) -> bool:
+    if not isinstance(condicao, dict):
+        return valor == condicao
+    operador, esperado = next(iter(condicao.items()))
+    if operador == "$eq":
+        return valor == esperado
+    if operador == "$ne":
+        return valor != esperado
+    if operador == "$in":
+        return valor in esperado
+    if operador == "$nin":
+        return valor not in esperado
+    raise ValueError(f"operador de filtro não suportado: {operador}")
+
+
+def mesclar_metadados(atuais: dict, novos: dict) -> dict:
+    """Mesma semântica do update do Chroma: mescla e apaga as chaves que vierem com None"""
+    mesclados = {**atuais, **novos}
+    return {chave: valor for chave, valor in mesclados.items() if valor is not None}
+
+
+class IndiceVetorial(ABC):
+    """
+    Coleção de vetores com texto e metadados. Métodos síncronos: quem chama do event loop usa
+    asyncio.to_thread. Os vetores chegam já calculados (o embedding é feito fora do índice).
+    """
+
+    nome: str
+
+    @abstractmethod
+    def buscar(self, vetor: list[float], k: int, filtro: dict | None = None) -> list[tuple[Document, float]]:
+        """Top-k por similaridade, só entre os itens que passam no filtro; score na escala de relevância acima"""
+
+    @abstractmethod
+    def inserir(self, ids: list[str], vetores: list[list[float]], textos: list[str], metadados: list[dict]) -> None:
+        """Insere ou substitui (upsert) pelos ids"""
+
+    @abstractmethod
+    def atualizar_metadados(self, ids: list[str], metadados: list[dict]) -> None:
+        """Mescla as chaves nos metadados existentes; chave com valor None é apagada"""
+
+    @abstractmethod
+    def obter(self, filtro: dict | None = None) -> tuple[list[str], list[dict]]:
+        """ids e metadados dos itens que passam no filtro (todos, se não houver filtro)"""
+
+    @abstractmethod
+    def remover(self, ids: list[str] | None = None, filtro: dict | None = None) -> None:
+        ...
+
+    @abstractmethod
+    def contar(self) -> int:
+        ...
+
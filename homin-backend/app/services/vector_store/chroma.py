@@ -0,0 +1,59 @@
+import threading
+import chromadb
+from langchain_core.documents import Document
+from app.services.vector_store.base import IndiceVetorial, relevancia_de_distancia_l2
+
+# A coleção dos PDFs foi criada pelo wrapper do langchain, que usa "langchain" como nome padrão
+NOMES_LEGADOS = {"documentos": "langchain"}
+
+# O chromadb mantém um cliente por pasta e não é seguro criá-lo em duas threads ao mesmo tempo
+# (aquecimento e primeira requisição abrindo a mesma pasta davam KeyError no cache de clientes)
+_trava_abertura = threading.Lock()
+
+
+class IndiceChroma(IndiceVetorial):
+    """Coleção do Chroma persistida em disco (HNSW do próprio Chroma, distância L2)"""
+
+    def __init__(self, nome: str, pasta: str):
+        self.nome = nome
+        with _trava_abertura:
+            cliente = chromadb.PersistentClient(path=pasta)
+            self._colecao = cliente.get_or_create_collection(NOMES_LEGADOS.get(nome, nome))
+
+    def buscar(self, vetor, k, filtro=None):
+        resultado = self._colecao.query(
+            query_embeddings=[vetor], n_results=k, where=filtro or None,
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            (Document(page_content=texto or "", metadata=metadados or {}), relevancia_de_distancia_l2(distancia))
+            for texto, metadados, distancia in zip(
+                resultado["documents"][0], resultado["metadatas"][0], resultado["distances"][0]
+            )
+        ]
+
+    def inserir(self, ids, vetores, textos, metadados):
+        # O Chroma limita o tamanho de cada lote
+        lote = self._colecao._client.get_max_batch_size()
+        for inicio in range(0, len(ids), lote):
+            fim = inicio + lote
+            self._colecao.upsert(
+                ids=ids[inicio:fim], embeddings=vetores[inicio:fim],
+                documents=textos[inicio:fim], metadatas=metadados[inicio:fim],
+            )
+
+    def atualizar_metadados(self, ids, metadados):
+        if ids:
+            self._colecao.update(ids=ids, metadatas=metadados)
+
+    def obter(self, filtro=None):
+        resultado = self._colecao.get(where=filtro or None, include=["metadatas"])
+        return resultado["ids"], resultado["metadatas"]
+
+    def remover(self, ids=None, filtro=None):
+        if ids is not None and not ids:
+            return
+        self._colecao.delete(ids=ids, where=filtro or None)
+
+    def contar(self):
+        return self._colecao.count()
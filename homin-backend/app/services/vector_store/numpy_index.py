@@ -0,0 +1,312 @@
+import os
+import json
+import uuid
+import threading
+from typing import NamedTuple
+import numpy as np
+from langchain_core.documents import Document
+from app.services.vector_store.base import IndiceVetorial, filtro_aceita, mesclar_metadados, relevancia_de_cosseno
+from app.services.vector_store.quantizacao import comprimir, descomprimir, produtos, truncar
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos, só entre threads
+    fcntl = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+MANIFESTO = "atual.json"
+ARQUIVOS_VERSAO = (("vetores", "npy"), ("compactos", "npy"), ("escala", "npy"), ("itens", "json"), ("hnsw", "bin"))
+
+
+class _Versao(NamedTuple):
+    marca: tuple
+    versao: str
+    completos: np.ndarray | None  # float32 em precisão total, só lidos nas linhas a reordenar
+    compactos: np.ndarray  # matriz varrida na busca; é a própria `completos` quando não há compressão
+    escala: np.ndarray | None
+    ids: list
+    textos: list
+    metadados: list
+    grafo: object
+
+
+class IndiceNumpy(IndiceVetorial):
+    """
+    Matriz (N x D, linhas normalizadas) num .npy aberto com mmap e top-k por produto escalar.
+
+    Cada escrita grava uma versão nova (vetores-<v>.npy + itens-<v>.json) e troca o manifesto atual.json
+    com os.replace; leitores de outros workers percebem pela troca do manifesto e reabrem. Buscas não
+    pegam trava nenhuma. Com `hnsw=True` e hnswlib instalado, usa um grafo HNSW em vez da busca exata.
+
+    Com `quantizacao` (float16/int8) e/ou `dimensoes` (truncamento), a busca varre uma matriz compacta
+    (compactos-<v>.npy) e reordena os `k * reordenar` melhores pelo produto exato com os vetores float32,
+    que ficam em disco e só têm essas linhas lidas. `reordenar=0` nem grava os vetores completos.
+    """
+
+    def __init__(self, nome: str, pasta: str, hnsw: bool = False, quantizacao: str = "float32",
+                 dimensoes: int | None = None, reordenar: int = 4):
+        self.nome = nome
+        self.pasta = os.path.join(pasta, nome)
+        self.usar_hnsw = hnsw and hnswlib is not None
+        self.quantizacao = quantizacao
+        self.dimensoes = dimensoes
+        self.reordenar = reordenar
+        comprimir(np.zeros((1, 1), dtype=np.float32), quantizacao)  # valida o formato já na abertura
+        self._trava_escrita = threading.Lock()
+        self._estado: _Versao | None = None
+        self._mascaras: dict[str, np.ndarray] = {}
+
+    # ========== LEITURA ==========
+
+    def _caminho(self, arquivo: str) -> str:
+        return os.path.join(self.pasta, arquivo)
+
+    def _carregar(self):
+        for _ in range(3):
+            try:
+                return self._abrir_versao_atual()
+            except FileNotFoundError:
+                # Outro processo trocou de versão entre a leitura do manifesto e a abertura dos arquivos
+                if not os.path.exists(self._caminho(MANIFESTO)):
+                    return None
+        return self._abrir_versao_atual()
+
+    def _abrir_versao_atual(self):
+        # os.replace cria um inode novo a cada versão: não depende da resolução da mtime
+        info = os.stat(self._caminho(MANIFESTO))
+        marca = (info.st_ino, info.st_mtime_ns)
+        if self._estado is not None and self._estado.marca == marca:
+            return self._estado
+
+        with open(self._caminho(MANIFESTO), encoding="utf-8") as arquivo:
+            manifesto = json.load(arquivo)
+        versao = manifesto["versao"]
+        completos = None
+        if manifesto.get("completos", True):
+            completos = np.load(self._caminho(f"vetores-{versao}.npy"), mmap_mode="r")
+        compactos, escala = completos, None
+        if manifesto.get("compactos", False):
+            compactos = np.load(self._caminho(f"compactos-{versao}.npy"), mmap_mode="r")
+            if manifesto.get("formato") == "int8":
+                escala = np.load(self._caminho(f"escala-{versao}.npy"))
+        with open(self._caminho(f"itens-{versao}.json"), encoding="utf-8") as arquivo:
+            itens = json.load(arquivo)
+
+        grafo = None
+        caminho_grafo = self._caminho(f"hnsw-{versao}.bin")
+        if self.usar_hnsw and os.path.exists(caminho_grafo):
+            grafo = hnswlib.Index(space="ip", dim=compactos.shape[1])
+            grafo.load_index(caminho_grafo, max_elements=len(compactos))
+            grafo.set_ef(64)
+
+        self._estado = _Versao(
+            marca, versao, completos, compactos, escala, itens["ids"], itens["textos"], itens["metadados"], grafo
+        )
+        self._mascaras = {}
+        return self._estado
+
+    def _mascara(self, metadados: list[dict], filtro: dict) -> np.ndarray:
+        # Avaliar o filtro em Python custa O(N); guarda por filtro enquanto a versão não muda
+        chave = json.dumps(filtro, sort_keys=True)
+        mascara = self._mascaras.get(chave)
+        if mascara is None:
+            if len(self._mascaras) >= 64:
+                self._mascaras.clear()
+            mascara = np.fromiter((filtro_aceita(m, filtro) for m in metadados), dtype=bool, count=len(metadados))
+            self._mascaras[chave] = mascara
+        return mascara
+
+    def buscar(self, vetor, k, filtro=None):
+        estado = self._carregar()
+        if estado is None:
+            return []
+        ids, textos, metadados = estado.ids, estado.textos, estado.metadados
+
+        consulta = np.asarray(vetor, dtype=np.float32)
+        consulta /= np.linalg.norm(consulta) or 1.0
+        consulta_compacta = truncar(consulta, estado.compactos.shape[1])
+
+        if filtro:
+            candidatos = np.flatnonzero(self._mascara(metadados, filtro))
+        else:
+            candidatos = None
+        total = len(ids) if candidatos is None else len(candidatos)
+
+        # Matriz compacta: pega mais candidatos que o k e reordena com os vetores completos
+        reordenar = estado.completos is not None and estado.completos is not estado.compactos
+        limite = min(total, k * max(self.reordenar, 1) if reordenar else k)
+        if limite == 0:
+            return []
+
+        if estado.grafo is not None:
+            permitidos = None if candidatos is None else set(candidatos.tolist())
+            rotulos, _ = estado.grafo.knn_query(
+                consulta_compacta, k=limite, filter=None if permitidos is None else permitidos.__contains__
+            )
+            melhores = rotulos[0].astype(np.int64)
+            scores = produtos(estado.compactos[melhores], estado.escala, consulta_compacta)
+        else:
+            matriz = estado.compactos if candidatos is None else estado.compactos[candidatos]
+            todos = produtos(matriz, estado.escala, consulta_compacta)
+            topo = np.argpartition(-todos, limite - 1)[:limite]
+            melhores = topo if candidatos is None else candidatos[topo]
+            scores = todos[topo]
+
+        if reordenar:
+            # Produto exato só dos poucos candidatos (no mmap, lê só essas linhas do disco)
+            scores = estado.completos[melhores] @ truncar(consulta, estado.completos.shape[1])
+
+        resultados = []
+        for j in np.argsort(-scores)[:k]:
+            i = int(melhores[j])
+            resultados.append((Document(page_content=textos[i], metadata=metadados[i]), relevancia_de_cosseno(float(scores[j]))))
+        return resultados
+
+    def obter(self, filtro=None):
+        estado = self._carregar()
+        if estado is None:
+            return [], []
+        ids, metadados = estado.ids, estado.metadados
+        if not filtro:
+            return list(ids), list(metadados)
+        posicoes = np.flatnonzero(self._mascara(metadados, filtro))
+        return [ids[i] for i in posicoes], [metadados[i] for i in posicoes]
+
+    def contar(self):
+        estado = self._carregar()
+        return 0 if estado is None else len(estado.ids)
+
+    def memoria_busca(self) -> int:
+        """Bytes da matriz varrida em cada busca (o que precisa ficar no page cache para buscar rápido)"""
+        estado = self._carregar()
+        if estado is None:
+            return 0
+        return estado.compactos.nbytes + (estado.escala.nbytes if estado.escala is not None else 0)
+
+    # ========== ESCRITA ==========
+
+    def _gravar(self, vetores: np.ndarray, ids: list, textos: list, metadados: list) -> None:
+        os.makedirs(self.pasta, exist_ok=True)
+        anterior = self._estado.versao if self._estado else None
+        versao = uuid.uuid4().hex[:12]
+
+        vetores = vetores.astype(np.float32, copy=False)
+        truncados = truncar(vetores, self.dimensoes)
+        compacta = self.quantizacao != "float32" or truncados is not vetores
+        completos = not compacta or self.reordenar > 0
+        if completos:
+            np.save(self._caminho(f"vetores-{versao}.npy"), vetores)
+        matriz_busca = vetores
+        if compacta:
+            codigos, escala = comprimir(truncados, self.quantizacao)
+            np.save(self._caminho(f"compactos-{versao}.npy"), codigos)
+            if escala is not None:
+                np.save(self._caminho(f"escala-{versao}.npy"), escala)
+            matriz_busca = descomprimir(codigos, escala)
+        with open(self._caminho(f"itens-{versao}.json"), "w", encoding="utf-8") as arquivo:
+            json.dump({"ids": ids, "textos": textos, "metadados": metadados}, arquivo, ensure_ascii=False)
+        if self.usar_hnsw and len(ids):
+            grafo = hnswlib.Index(space="ip", dim=matriz_busca.shape[1])
+            grafo.init_index(max_elements=len(ids), ef_construction=200, M=16)
+            grafo.add_items(matriz_busca, np.arange(len(ids)))
+            grafo.save_index(self._caminho(f"hnsw-{versao}.bin"))
+
+        temporario = self._caminho(f"{MANIFESTO}.tmp")
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                "versao": versao, "itens": len(ids), "dimensao": int(vetores.shape[1]),
+                "completos": completos, "compactos": compacta,
+                "formato": self.quantizacao, "dimensoes_busca": int(matriz_busca.shape[1]),
+            }, arquivo)
+        os.replace(temporario, self._caminho(MANIFESTO))
+
+        # Quem ainda tem a versão anterior mapeada continua lendo (no Linux o arquivo some só do diretório)
+        if anterior:
+            for prefixo, extensao in ARQUIVOS_VERSAO:
+                try:
+                    os.remove(self._caminho(f"{prefixo}-{anterior}.{extensao}"))
+                except FileNotFoundError:
+                    pass
+        self._carregar()
+
+    def _escrever(self, alterar) -> None:
+        """
+        Lê a versão atual, aplica `alterar(vetores, ids, textos, metadados)` e grava uma versão nova.
+        `vetores` são os completos; se a versão só tem a matriz compacta, vão os descomprimidos dela.
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        with self._trava_escrita, open(self._caminho(".trava"), "w") as trava:
+            if fcntl:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+            estado = self._carregar()
+            if estado is None:
+                vetores, ids, textos, metadados = np.zeros((0, 0), dtype=np.float32), [], [], []
+            else:
+                if estado.completos is not None:
+                    vetores = np.array(estado.completos)
+                else:
+                    vetores = descomprimir(estado.compactos, estado.escala)
+                ids, textos, metadados = list(estado.ids), list(estado.textos), list(estado.metadados)
+            self._gravar(*alterar(vetores, ids, textos, metadados))
+
+    def inserir(self, ids, vetores, textos, metadados):
+        if not ids:
+            return
+        novos = np.asarray(vetores, dtype=np.float32)
+        novos /= np.maximum(np.linalg.norm(novos, axis=1, keepdims=True), 1e-12)
+
+        def alterar(atuais, ids_atuais, textos_atuais, metadados_atuais):
+            posicao = {id_: i for i, id_ in enumerate(ids_atuais)}
+            if atuais.size == 0:
+                atuais = np.zeros((0, novos.shape[1]), dtype=np.float32)
+            # Versão gravada sem os completos (reordenar=0) ficou na dimensão truncada
+            entrada = truncar(novos, atuais.shape[1])
+            acrescimos = []
+            for j, id_ in enumerate(ids):
+                if id_ in posicao:
+                    i = posicao[id_]
+                    atuais[i] = entrada[j]
+                    textos_atuais[i], metadados_atuais[i] = textos[j], metadados[j]
+                else:
+                    posicao[id_] = len(ids_atuais)
+                    ids_atuais.append(id_)
+                    textos_atuais.append(textos[j])
+                    metadados_atuais.append(metadados[j])
+                    acrescimos.append(j)
+            if acrescimos:
+                atuais = np.vstack([atuais, entrada[acrescimos]])
+            return atuais, ids_atuais, textos_atuais, metadados_atuais
+
+        self._escrever(alterar)
+
+    def atualizar_metadados(self, ids, metadados):
+        if not ids:
+            return
+        novos = dict(zip(ids, metadados))
+
+        def alterar(vetores, ids_atuais, textos, metadados_atuais):
+            for i, id_ in enumerate(ids_atuais):
+                if id_ in novos:
+                    metadados_atuais[i] = mesclar_metadados(metadados_atuais[i], novos[id_])
+            return vetores, ids_atuais, textos, metadados_atuais
+
+        self._escrever(alterar)
+
+    def remover(self, ids=None, filtro=None):
+        if ids is not None and not ids:
+            return
+        alvo = None if ids is None else set(ids)
+
+        def alterar(vetores, ids_atuais, textos, metadados):
+            manter = [
+                i for i, (id_, meta) in enumerate(zip(ids_atuais, metadados))
+                if not ((alvo is None or id_ in alvo) and filtro_aceita(meta, filtro))
+            ]
+            vetores = vetores[manter] if len(vetores) else vetores
+            return vetores, [ids_atuais[i] for i in manter], [textos[i] for i in manter], [metadados[i] for i in manter]
+
+        self._escrever(alterar)
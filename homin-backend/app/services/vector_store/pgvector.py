@@ -0,0 +1,157 @@
+import json
+import threading
+from sqlalchemy import text
+from langchain_core.documents import Document
+from app.database.config import obter_sync_engine
+from app.services.vector_store.base import IndiceVetorial, relevancia_de_cosseno
+
+
+def _literal_vetor(vetor) -> str:
+    return "[" + ",".join(f"{float(v):.7g}" for v in vetor) + "]"
+
+
+def traduzir_filtro(filtro: dict, parametros: dict) -> str:
+    """Filtro `where` do Chroma -> SQL sobre a coluna jsonb `metadados` (contenção @>, usa o índice GIN)"""
+    partes = []
+    for chave, condicao in filtro.items():
+        if chave in ("$and", "$or"):
+            juncao = " AND " if chave == "$and" else " OR "
+            partes.append("(" + juncao.join(traduzir_filtro(parte, parametros) for parte in condicao) + ")")
+            continue
+
+        operador, valor = next(iter(condicao.items())) if isinstance(condicao, dict) else ("$eq", condicao)
+        valores = valor if operador in ("$in", "$nin") else [valor]
+        contidos = []
+        for item in valores:
+            nome = f"p{len(parametros)}"
+            parametros[nome] = json.dumps({chave: item})
+            contidos.append(f"metadados @> CAST(:{nome} AS jsonb)")
+        sql = "(" + " OR ".join(contidos or ["false"]) + ")"
+        partes.append(f"NOT {sql}" if operador in ("$ne", "$nin") else sql)
+    return " AND ".join(partes) or "true"
+
+
+class IndicePgvector(IndiceVetorial):
+    """
+    Tabela vetores_<nome> no Postgres da aplicação, com índice HNSW (pgvector) por cosseno e GIN nos metadados.
+    A tabela é criada no primeiro insert porque a dimensão depende do modelo de embedding; por isso fica
+    fora das migrações (e a extensão só é exigida de quem escolher este backend).
+    """
+
+    def __init__(self, nome: str, engine=None):
+        self.nome = nome
+        self.tabela = f"vetores_{nome}"
+        # Engine síncrono compartilhado da aplicação (ver obter_sync_engine): a interface do índice é síncrona
+        self._engine = engine or obter_sync_engine()
+        self._trava = threading.Lock()
+        self._existe = False
+
+    def _tabela_existe(self, conexao) -> bool:
+        if not self._existe:
+            self._existe = bool(conexao.scalar(text("SELECT to_regclass(:tabela) IS NOT NULL"), {"tabela": self.tabela}))
+        return self._existe
+
+    def _criar_tabela(self, conexao, dimensao: int) -> None:
+        conexao.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conexao.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {self.tabela} (
+                id TEXT PRIMARY KEY,
+                embedding vector({dimensao}) NOT NULL,
+                documento TEXT NOT NULL DEFAULT '',
+                metadados JSONB NOT NULL DEFAULT '{{}}'
+            )
+        """))
+        conexao.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{self.tabela}_embedding ON {self.tabela} USING hnsw (embedding vector_cosine_ops)"
+        ))
+        conexao.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{self.tabela}_metadados ON {self.tabela} USING gin (metadados jsonb_path_ops)"
+        ))
+        self._existe = True
+
+    def buscar(self, vetor, k, filtro=None):
+        parametros = {"vetor": _literal_vetor(vetor), "k": k}
+        condicao = traduzir_filtro(filtro, parametros) if filtro else "true"
+        with self._engine.connect() as conexao:
+            if not self._tabela_existe(conexao):
+                return []
+            # Com filtro, o HNSW filtra depois de achar os candidatos: ef_search maior evita voltar menos de k
+            if filtro:
+                conexao.execute(text("SET LOCAL hnsw.ef_search = 200"))
+            linhas = conexao.execute(text(f"""
+                SELECT documento, metadados, 1 - (embedding <=> CAST(:vetor AS vector)) AS cosseno
+                FROM {self.tabela}
+                WHERE {condicao}
+                ORDER BY embedding <=> CAST(:vetor AS vector)
+                LIMIT :k
+            """), parametros).all()
+        return [
+            (Document(page_content=documento, metadata=metadados), relevancia_de_cosseno(cosseno))
+            for documento, metadados, cosseno in linhas
+        ]
+
+    def inserir(self, ids, vetores, textos, metadados):
+        if not ids:
+            return
+        linhas = [
+            {"id": id_, "vetor": _literal_vetor(vetor), "documento": texto, "metadados": json.dumps(meta)}
+            for id_, vetor, texto, meta in zip(ids, vetores, textos, metadados)
+        ]
+        with self._trava, self._engine.begin() as conexao:
+            if not self._tabela_existe(conexao):
+                self._criar_tabela(conexao, len(vetores[0]))
+            conexao.execute(text(f"""
+                INSERT INTO {self.tabela} (id, embedding, documento, metadados)
+                VALUES (:id, CAST(:vetor AS vector), :documento, CAST(:metadados AS jsonb))
+                ON CONFLICT (id) DO UPDATE
+                SET embedding = EXCLUDED.embedding, documento = EXCLUDED.documento, metadados = EXCLUDED.metadados
+            """), linhas)
+
+    def atualizar_metadados(self, ids, metadados):
+        if not ids:
+            return
+        linhas = [
+            {
+                "id": id_,
+                "novos": json.dumps({c: v for c, v in meta.items() if v is not None}),
+                "removidas": [c for c, v in meta.items() if v is None],
+            }
+            for id_, meta in zip(ids, metadados)
+        ]
+        with self._engine.begin() as conexao:
+            if not self._tabela_existe(conexao):
+                return
+            conexao.execute(text(f"""
+                UPDATE {self.tabela}
+                SET metadados = (metadados || CAST(:novos AS jsonb)) - CAST(:removidas AS text[])
+                WHERE id = :id
+            """), linhas)
+
+    def obter(self, filtro=None):
+        parametros = {}
+        condicao = traduzir_filtro(filtro, parametros) if filtro else "true"
+        with self._engine.connect() as conexao:
+            if not self._tabela_existe(conexao):
+                return [], []
+            linhas = conexao.execute(text(f"SELECT id, metadados FROM {self.tabela} WHERE {condicao}"), parametros).all()
+        return [linha.id for linha in linhas], [linha.metadados for linha in linhas]
+
+    def remover(self, ids=None, filtro=None):
+        if ids is not None and not ids:
+            return
+        parametros = {}
+        condicoes = []
+        if ids is not None:
+            parametros["ids"] = list(ids)
+            condicoes.append("id = ANY(:ids)")
+        if filtro:
+            condicoes.append(traduzir_filtro(filtro, parametros))
+        with self._engine.begin() as conexao:
+            if self._tabela_existe(conexao):
+                conexao.execute(text(f"DELETE FROM {self.tabela} WHERE {' AND '.join(condicoes) or 'true'}"), parametros)
+
+    def contar(self):
+        with self._engine.connect() as conexao:
+            if not self._tabela_existe(conexao):
+                return 0
+            return conexao.scalar(text(f"SELECT count(*) FROM {self.tabela}"))
@@ -0,0 +1,49 @@
+import numpy as np
+
+# Representações da matriz varrida na busca. text-embedding-3 aceita truncar as dimensões (os primeiros
+# componentes concentram a informação), então truncar e renormalizar ainda dá um cosseno utilizável.
+FORMATOS = ("float32", "float16", "int8")
+
+# Linhas convertidas para float32 de cada vez (~12 MB com 1536 dimensões): não materializa a matriz
+# inteira descomprimida e, nos testes, foi mais rápido que blocos maiores
+BLOCO = 2048
+
+
+def truncar(vetores: np.ndarray, dimensoes: int | None) -> np.ndarray:
+    """Mantém as primeiras `dimensoes` colunas e renormaliza (sem truncar, devolve como veio)"""
+    if not dimensoes or dimensoes >= vetores.shape[-1]:
+        return vetores
+    cortados = np.ascontiguousarray(vetores[..., :dimensoes], dtype=np.float32)
+    return cortados / np.maximum(np.linalg.norm(cortados, axis=-1, keepdims=True), 1e-12)
+
+
+def comprimir(vetores: np.ndarray, formato: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """(códigos, escala por dimensão); a escala só existe no int8"""
+    if formato == "float32":
+        return vetores.astype(np.float32, copy=False), None
+    if formato == "float16":
+        return vetores.astype(np.float16), None
+    if formato == "int8":
+        # Quantização escalar simétrica por dimensão, calibrada no maior valor absoluto de cada coluna
+        maximos = np.abs(vetores).max(axis=0) if len(vetores) else np.ones(vetores.shape[1], dtype=np.float32)
+        escala = (np.maximum(maximos, 1e-12) / 127).astype(np.float32)
+        return np.clip(np.rint(vetores / escala), -127, 127).astype(np.int8), escala
+    raise ValueError(f"formato de vetores desconhecido: {formato} (opções: {', '.join(FORMATOS)})")
+
+
+def descomprimir(codigos: np.ndarray, escala: np.ndarray | None) -> np.ndarray:
+    vetores = codigos.astype(np.float32)
+    return vetores * escala if escala is not None else vetores
+
+
+def produtos(codigos: np.ndarray, escala: np.ndarray | None, consulta: np.ndarray) -> np.ndarray:
+    """Produto escalar aproximado de cada linha com a consulta, em blocos (float16/int8 não têm BLAS)"""
+    if codigos.dtype == np.float32:
+        return codigos @ consulta
+    # No int8 a escala vai na consulta: (c * e) · q = c · (e * q)
+    consulta = consulta * escala if escala is not None else consulta
+    scores = np.empty(len(codigos), dtype=np.float32)
+    for inicio in range(0, len(codigos), BLOCO):
+        fim = inicio + BLOCO
+        scores[inicio:fim] = codigos[inicio:fim].astype(np.float32) @ consulta
+    return scores
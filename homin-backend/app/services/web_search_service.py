@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from agno.agent import Agent
+from agno.models.openai import OpenAIChat
+from agno.run.agent import RunEvent
+from agno.tools.duckduckgo import DuckDuckGoTools
+from app.config import settings
+from app.core.tracing import span
+from app.core.metrics import registrar_cache
+from app.services.model_router import cliente_http, rota, registrar_chamada, registrar_falha
+
+logger = logging.getLogger(__name__)
+
+CAMINHO_CACHE = settings.busca_web_cache_dir or os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'cache_busca_web'
+)
+
+def novo_agente(modelo: str) -> Agent:
+    """
+    Agente novo a cada busca: o Agent do agno guarda o estado da execução (mensagens, run_response, sessão)
+    na instância, então buscas simultâneas não podem dividir um. O caro é a conexão, e essa vem do pool
+    HTTP compartilhado (cliente_http do model_router).
+    """
+    return Agent(
+        model=OpenAIChat(id=modelo, http_client=cliente_http),
+        tools=[DuckDuckGoTools()],
+        instructions="Busque informações sobre saúde do homem e cite as URLs das fontes usadas",
+    )
+
+# Limita quantas buscas web rodam ao mesmo tempo no processo
+_semaforo_busca = asyncio.Semaphore(settings.busca_web_max_concorrencia)
+
+# Cache em memória na frente do cache em disco: chave -> (criado_em, conteudo), em ordem de uso (LRU)
+_cache_memoria: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+
+def normalizar_consulta(consulta: str) -> str:
+    """Normaliza a pergunta para usar como chave: minúsculas, sem acentos e espaços extras."""
+    sem_acento = unicodedata.normalize("NFKD", consulta).encode("ascii", "ignore").decode("ascii")
+    return " ".join(sem_acento.lower().split())
+
+
+def _chave_cache(consulta_normalizada: str) -> str:
+    return hashlib.sha256(consulta_normalizada.encode("utf-8")).hexdigest()
+
+
+def _ler_cache_disco(chave: str) -> tuple[float, str] | None:
+    caminho = os.path.join(CAMINHO_CACHE, f"{chave}.json")
+    try:
+        with open(caminho, "r", encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+        return dados["criado_em"], dados["conteudo"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _gravar_cache_disco(chave: str, consulta: str, criado_em: float, conteudo: str) -> None:
+    os.makedirs(CAMINHO_CACHE, exist_ok=True)
+    caminho = os.path.join(CAMINHO_CACHE, f"{chave}.json")
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump({"consulta": consulta, "criado_em": criado_em, "conteudo": conteudo}, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)  # escrita atômica
+
+
+def _guardar_na_memoria(chave: str, entrada: tuple[float, str]) -> None:
+    # Consultas diferentes não fazem o dicionário crescer para sempre: sai a usada há mais tempo
+    _cache_memoria[chave] = entrada
+    _cache_memoria.move_to_end(chave)
+    while len(_cache_memoria) > settings.busca_web_cache_memoria_max:
+        _cache_memoria.popitem(last=False)
+
+
+async def _buscar_no_cache(chave: str) -> str | None:
+    entrada = _cache_memoria.get(chave)
+    if entrada is None:
+        entrada = await asyncio.to_thread(_ler_cache_disco, chave)
+        if entrada is None:
+            return None
+
+    criado_em, conteudo = entrada
+    if time.time() - criado_em > settings.busca_web_cache_ttl_segundos:
+        _cache_memoria.pop(chave, None)
+        return None
+    _guardar_na_memoria(chave, entrada)
+    return conteudo
+
+
+async def _executar_agente(agente: Agent, consulta: str, partes: list[str]) -> tuple[int | None, ...]:
+    """Roda o agente em streaming, acumulando o conteúdo em `partes`; retorna (entrada, saída, cache) do evento final."""
+    tokens = (None, None, None)
+    async for evento in agente.arun(consulta, stream=True):
+        tipo = getattr(evento, "event", None)
+        if tipo == RunEvent.run_content.value and evento.content:
+            partes.append(str(evento.content))
+        elif tipo == RunEvent.run_completed.value and getattr(evento, "metrics", None):
+            metricas = evento.metrics
+            tokens = (metricas.input_tokens, metricas.output_tokens, getattr(metricas, "cache_read_tokens", None))
+    return tokens
+
+
+async def buscar_na_web(consulta: str, timeout: float | None = None) -> str:
+    """
+    Busca na web via DuckDuckGo com cache por consulta normalizada (memória + disco, com TTL).
+
+    Respeita um orçamento de tempo por requisição: se o prazo estourar, devolve o que já
+    foi gerado até ali (resultados parciais não entram no cache). Retorna "" em caso de erro.
+    """
+    orcamento = settings.busca_web_timeout_segundos if timeout is None else timeout
+    consulta_normalizada = normalizar_consulta(consulta)
+    chave = _chave_cache(consulta_normalizada)
+
+    conteudo_cache = await _buscar_no_cache(chave)
+    registrar_cache("busca_web", conteudo_cache is not None)
+    if conteudo_cache is not None:
+        logger.debug("busca web servida do cache")
+        return conteudo_cache
+
+    partes: list[str] = []
+    completo = False
+    modelo = None
+    with span("busca_web.agente", orcamento_s=orcamento) as s:
+        try:
+            # A espera pela vaga no semáforo também consome o orçamento da requisição
+            async with asyncio.timeout(orcamento):
+                async with _semaforo_busca:
+                    # Fallback pelos modelos da rota enquanto nada foi gerado; o orçamento vale para a rota toda
+                    for modelo in rota("busca_web").modelos:
+                        inicio = time.perf_counter()
+                        try:
+                            tokens = await _executar_agente(novo_agente(modelo), consulta, partes)
+                        except Exception as e:
+                            if partes:
+                                raise
+                            registrar_falha("busca_web", modelo, e)
+                            continue
+                        s.definir(**registrar_chamada("busca_web", modelo, "agente", time.perf_counter() - inicio, *tokens))
+                        completo = True
+                        break
+        except TimeoutError as e:
+            if modelo:
+                registrar_falha("busca_web", modelo, e)
+            logger.warning("busca web excedeu o orçamento, usando resultado parcial", extra={"orcamento_s": orcamento, "partes": len(partes)})
+        except Exception as e:
+            logger.warning("erro na busca web", extra={"erro": str(e)})
+            return ""
+        finally:
+            s.definir(completo=completo, partes=len(partes))
+
+    conteudo = "".join(partes).strip()
+
+    if completo and conteudo:
+        criado_em = time.time()
+        _guardar_na_memoria(chave, (criado_em, conteudo))
+        try:
+            await asyncio.to_thread(_gravar_cache_disco, chave, consulta_normalizada, criado_em, conteudo)
+        except OSError as e:
+            logger.warning("não foi possível gravar o cache da busca web", extra={"erro": str(e)})
+
+    return conteudo
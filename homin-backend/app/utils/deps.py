@@ -1,8 +1,11 @@
 import os
 import json
+import time
+import logging
+import threading
 import requests
 from typing import Annotated, AsyncGenerator, Dict
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio.session import AsyncSession
@@ -10,34 +13,63 @@ from sqlalchemy.orm import selectinload
 from jose import jwt
 from dotenv import load_dotenv
 
+from app.config import settings
 from app.database.models import Usuario
-from app.database.config import get_async_db
+from app.database.config import (
+    get_async_db, AsyncSessionLocal, AsyncReplicaSessionLocal, COOKIE_CONSISTENCIA, CABECALHO_CONSISTENCIA,
+    lsn_do_token, pausar_replica, replica_alcancou, replica_disponivel,
+)
+from app.core.metrics import LEITURAS_BANCO
+from app.core.tracing import span
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN")
 AUTH0_CLIENT_ID = os.getenv("AUTH0_CLIENT_ID")
 AUTH0_AUDIENCE = os.getenv("AUTH0_AUDIENCE", f"https://{AUTH0_DOMAIN}/api/v2/")
 
 security = HTTPBearer()
 
+# JWKS do Auth0 em cache: antes era baixado a cada verify_jwt (duas vezes por requisição)
+_jwks_cache = {"chaves": None, "expira_em": 0.0, "baixado_em": 0.0}
+_jwks_lock = threading.Lock()
+# Recarga forçada por kid desconhecido no máximo uma vez por minuto (token forjado não vira tráfego pro Auth0)
+_JWKS_INTERVALO_MINIMO = 60.0
+
+def obter_jwks(forcar: bool = False) -> Dict:
+    """JWKS do Auth0, recarregado após o TTL ou quando forçado (kid desconhecido = rotação de chave)"""
+    with _jwks_lock:
+        agora = time.monotonic()
+        forcar = forcar and agora - _jwks_cache["baixado_em"] >= _JWKS_INTERVALO_MINIMO
+        if forcar or _jwks_cache["chaves"] is None or agora >= _jwks_cache["expira_em"]:
+            with span("auth.baixar_jwks"):
+                jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
+                _jwks_cache["chaves"] = requests.get(jwks_url, timeout=10).json()
+            _jwks_cache["baixado_em"] = agora
+            _jwks_cache["expira_em"] = agora + settings.jwks_cache_ttl_segundos
+        return _jwks_cache["chaves"]
+
+def _chave_rsa(jwks: Dict, kid: str) -> Dict:
+    for key in jwks["keys"]:
+        if key["kid"] == kid:
+            return {
+                "kty": key["kty"],
+                "kid": key["kid"],
+                "use": key["use"],
+                "n": key["n"],
+                "e": key["e"],
+            }
+    return {}
+
 def verify_jwt(token: str):
     """Verifica e decodifica um JWT emitido pelo Auth0"""
     try:
         header = jwt.get_unverified_header(token)
-        jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
-        jwks = requests.get(jwks_url).json()
-        rsa_key = {}
-
-        for key in jwks["keys"]:
-            if key["kid"] == header["kid"]:
-                rsa_key = {
-                    "kty": key["kty"],
-                    "kid": key["kid"],
-                    "use": key["use"],
-                    "n": key["n"],
-                    "e": key["e"],
-                }
+        rsa_key = _chave_rsa(obter_jwks(), header["kid"])
+        if not rsa_key:
+            rsa_key = _chave_rsa(obter_jwks(forcar=True), header["kid"])
         if rsa_key:
             payload = jwt.decode(
                 token,
@@ -94,7 +126,7 @@ async def sync_user_to_local_db(token: str, payload: Dict, db_session: AsyncSess
             db_session.add(user)
             await db_session.commit()
             await db_session.refresh(user)
-            print(f"✅ Novo usuário criado na base local: {email}")
+            logger.info("novo usuário criado na base local", extra={"email": email})
         else:
             if nome and user.nome != nome:
                 user.nome = nome
@@ -102,20 +134,22 @@ async def sync_user_to_local_db(token: str, payload: Dict, db_session: AsyncSess
                 
         return user
     except Exception as e:
-        print(f"⚠️ Erro ao sincronizar usuário: {e}")
+        logger.warning("erro ao sincronizar usuário", extra={"erro": str(e)})
         raise HTTPException(status_code=500, detail=f"Erro ao sincronizar usuário: {e}")
 
 async def get_logged_user(
-    db_session: "SessionDep",
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> Dict:
     """Obter usuário logado validando Auth0 JWT + sincronizar na base local"""
     try:
         token = credentials.credentials
-        payload = verify_jwt(token)
+        with span("auth.verificar_jwt"):
+            payload = verify_jwt(token)
         
-        # Sincronizar com base local (não bloqueia se der erro)
-        await sync_user_to_local_db(token, payload, db_session)
+        # Sincronizar com base local numa sessão curta (ver get_local_user)
+        with span("auth.sincronizar_usuario"):
+            async with AsyncSessionLocal() as sessao:
+                await sync_user_to_local_db(token, payload, sessao)
         
         return payload
     except Exception as e:
@@ -126,16 +160,19 @@ async def get_logged_user(
         )
 
 async def get_local_user(
-    db_session: "SessionDep",
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> Usuario:
     """Obter objeto Usuario da base local após validação Auth0"""
     try:
         token = credentials.credentials
-        payload = verify_jwt(token)
+        with span("auth.verificar_jwt"):
+            payload = verify_jwt(token)
         
-        # Sincronizar com base local e retornar objeto Usuario
-        user = await sync_user_to_local_db(token, payload, db_session)
+        # Sincronizar com base local numa sessão própria e curta: a conexão do primário volta ao pool
+        # antes da rota (as rotas só de leitura não seguram o primário durante a requisição)
+        with span("auth.sincronizar_usuario"):
+            async with AsyncSessionLocal() as sessao:
+                user = await sync_user_to_local_db(token, payload, sessao)
         
         return user
     except Exception as e:
@@ -145,7 +182,41 @@ async def get_local_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+async def _abrir_sessao_replica(lsn: str | None) -> tuple[AsyncSession | None, str]:
+    """
+    Sessão na réplica já com conexão, se ela já reproduziu o `lsn` da última escrita do cliente.
+    (None, "primario") se está atrasada; (None, "fallback") e réplica pausada se não conectar.
+    """
+    session = AsyncReplicaSessionLocal()
+    try:
+        await session.connection()
+        if lsn is None or await replica_alcancou(session, lsn):
+            return session, "replica"
+        await session.close()
+        return None, "primario"
+    except Exception as e:
+        await session.close()
+        pausar_replica()
+        logger.warning("réplica de leitura indisponível, usando o primário", extra={"erro": str(e)})
+        return None, "fallback"
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Sessão para rotas só de leitura: réplica quando configurada, primário como fallback
+    e quando a réplica ainda não tem a última escrita do cliente (read-your-writes, ver marcar_escrita).
+    """
+    session = None
+    destino = "primario"
+    if replica_disponivel():
+        token = request.headers.get(CABECALHO_CONSISTENCIA) or request.cookies.get(COOKIE_CONSISTENCIA)
+        session, destino = await _abrir_sessao_replica(lsn_do_token(token))
+    LEITURAS_BANCO.labels(destino=destino).inc()
+
+    async with (session or AsyncSessionLocal()) as session:
+        yield session
+
 # Type annotations para dependências
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
 LoggedUserDep = Annotated[Dict, Depends(get_logged_user)]
-LocalUserDep = Annotated[Usuario, Depends(get_local_user)]
\ No newline at end of file
+LocalUserDep = Annotated[Usuario, Depends(get_local_user)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
\ No newline at end of file
@@ -0,0 +1,38 @@
+import json
+import base64
+from datetime import datetime
+from fastapi import HTTPException, status
+from app.config import settings
+
+
+def codificar_cursor(*valores) -> str:
+    """Cursor opaco (base64) com os valores da chave de ordenação do último item da página"""
+    serializados = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(serializados).encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str, *tipos) -> tuple:
+    """
+    Decodifica um cursor gerado por codificar_cursor, convertendo cada valor pelo tipo informado.
+    Valores nulos continuam None (ex.: data_ultima_msg de conversa sem mensagens).
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if len(valores) != len(tipos):
+            raise ValueError("quantidade de valores inesperada")
+        return tuple(
+            None if valor is None else (datetime.fromisoformat(valor) if tipo is datetime else tipo(valor))
+            for valor, tipo in zip(valores, tipos)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido")
+
+
+def tamanho_pagina(limite: int | None, padrao: int | None) -> int | None:
+    """
+    Tamanho da página pedido pelo cliente, limitado ao máximo configurado.
+    None = sem limite: cliente que não manda `limite` numa rota com padrão None recebe tudo, como antes da paginação.
+    """
+    if limite is None and padrao is None:
+        return None
+    return min(limite or padrao, settings.paginacao_limite_maximo)
@@ -0,0 +1,34 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+from app.core.metrics import registrar_cache
+
+
+class SingleFlight:
+    """
+    Chamadas concorrentes com a mesma chave compartilham uma única execução em andamento.
+    Nada é guardado depois que ela termina: não é cache, só evita trabalho duplicado simultâneo.
+    """
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self._em_andamento: dict[str, asyncio.Future] = {}
+
+    async def executar(self, chave: str, fabrica: Callable[[], Awaitable[Any]]) -> Any:
+        tarefa = self._em_andamento.get(chave)
+        compartilhada = tarefa is not None
+        if not compartilhada:
+            tarefa = asyncio.ensure_future(fabrica())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda concluida: self._liberar(chave, concluida))
+
+        # Conta como "hit" quem pegou carona numa execução já em andamento
+        registrar_cache(self.nome, compartilhada)
+        # shield: se uma requisição for cancelada, as outras que esperam a mesma execução seguem
+        return await asyncio.shield(tarefa)
+
+    def _liberar(self, chave: str, concluida: asyncio.Future) -> None:
+        if self._em_andamento.get(chave) is concluida:
+            del self._em_andamento[chave]
+        # Evita "exception was never retrieved" quando todos os interessados foram cancelados
+        if not concluida.cancelled():
+            concluida.exception()
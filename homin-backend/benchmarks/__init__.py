@@ -0,0 +1 @@
+# Benchmark offline da API (ver benchmarks/run.py)
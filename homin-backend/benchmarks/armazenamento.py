@@ -0,0 +1,181 @@
+"""
+Conferência e latência dos backends de armazenamento dos PDFs (app/services/storage): salvar, abrir e remover.
+
+Cada backend recebe PDFs sintéticos pelo mesmo caminho do upload (temporário em `pasta_temporaria` com sha256)
+e o script confere: chave pelo conteúdo, temporário apagado depois de salvar, mesmo conteúdo salvo de novo sem
+erro (dedup), bytes idênticos na leitura e objeto indisponível depois de remover. Sai com código 1 se alguma
+conferência falhar. Nada toca os PDFs da aplicação: o local grava num diretório temporário e os de S3 usam um
+prefixo próprio, apagado no fim.
+
+Backends:
+    local    pasta temporária
+    s3_moto  S3 simulado em memória pelo moto (pip install boto3 "moto[s3]"), sem rede
+    s3       bucket configurado (S3_BUCKET, S3_ENDPOINT_URL para MinIO, credenciais do .env ou da AWS)
+
+Uso (a partir de homin-backend/):
+
+    python -m benchmarks.armazenamento
+    python -m benchmarks.armazenamento --backends local,s3_moto --arquivos 50 --tamanho-kb 2048
+    S3_BUCKET=homin S3_ENDPOINT_URL=http://localhost:9000 python -m benchmarks.armazenamento --backends s3
+"""
+import os
+import sys
+import time
+import uuid
+import shutil
+import asyncio
+import hashlib
+import argparse
+import tempfile
+from contextlib import ExitStack
+
+BACKENDS = ("local", "s3_moto")
+BUCKET_MOTO = "homin-benchmark"
+
+
+def abrir(backend: str, pilha: ExitStack):
+    """Armazenamento novo do backend; o que precisar ser desfeito no fim vai para a `pilha`"""
+    if backend == "local":
+        from app.services.storage.local import ArmazenamentoLocal
+        pasta = tempfile.mkdtemp(prefix="homin-armazenamento-")
+        pilha.callback(shutil.rmtree, pasta, ignore_errors=True)
+        return ArmazenamentoLocal(pasta)
+    if backend == "s3_moto":
+        from moto import mock_aws
+        for chave in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+            os.environ.setdefault(chave, "benchmark")
+        pilha.enter_context(mock_aws())
+        from app.services.storage.s3 import ArmazenamentoS3
+        armazenamento = ArmazenamentoS3(BUCKET_MOTO, prefixo="bench", regiao="us-east-1")
+        armazenamento._cliente.create_bucket(Bucket=BUCKET_MOTO)
+        return armazenamento
+    if backend == "s3":
+        from app.config import settings
+        from app.services.storage.s3 import ArmazenamentoS3
+        prefixo = f"{settings.s3_prefixo.strip('/')}/bench-{uuid.uuid4().hex[:8]}".strip("/")
+        return ArmazenamentoS3(
+            settings.s3_bucket, prefixo=prefixo, endpoint_url=settings.s3_endpoint_url,
+            regiao=settings.s3_regiao, chave_acesso=settings.s3_access_key, segredo=settings.s3_secret_key,
+        )
+    raise ValueError(backend)
+
+
+def _receber(conteudo: bytes, pasta: str):
+    """O que o receber_upload entrega: temporário em `pasta` com o sha256 do conteúdo"""
+    from app.services.upload_service import ArquivoRecebido
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f".upload-{uuid.uuid4().hex}.parcial")
+    with open(caminho, "wb") as destino:
+        destino.write(conteudo)
+    return ArquivoRecebido(caminho, hashlib.sha256(conteudo).hexdigest(), len(conteudo))
+
+
+def _percentis(latencias: list[float]) -> tuple[float, float]:
+    latencias = sorted(latencias)
+    return (
+        round(latencias[len(latencias) // 2] * 1000, 2),
+        round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000, 2),
+    )
+
+
+async def avaliar(armazenamento, conteudos: list[bytes]) -> tuple[dict, list[str]]:
+    from app.services.storage.base import chave_de_conteudo
+
+    falhas = []
+    latencias = {"salvar": [], "abrir": [], "remover": []}
+    chaves = []
+    for conteudo in conteudos:
+        recebido = _receber(conteudo, armazenamento.pasta_temporaria)
+        inicio = time.perf_counter()
+        chave = await armazenamento.salvar(recebido)
+        latencias["salvar"].append(time.perf_counter() - inicio)
+        chaves.append(chave)
+        if chave != chave_de_conteudo(recebido.hash_conteudo):
+            falhas.append(f"chave {chave} não é a do conteúdo")
+        if os.path.exists(recebido.caminho_temporario):
+            falhas.append(f"temporário ficou depois de salvar {chave}")
+
+    # Mesmo conteúdo de novo (upload repetido): mesma chave, sem erro e sem sobrar temporário
+    repetido = _receber(conteudos[0], armazenamento.pasta_temporaria)
+    if await armazenamento.salvar(repetido) != chaves[0]:
+        falhas.append("conteúdo repetido recebeu outra chave")
+    if os.path.exists(repetido.caminho_temporario):
+        falhas.append("temporário ficou depois de salvar conteúdo repetido")
+
+    for chave, conteudo in zip(chaves, conteudos):
+        inicio = time.perf_counter()
+        # Como a indexação lê: síncrono, numa thread fora do loop
+        lidos = await asyncio.to_thread(_ler, armazenamento, chave)
+        latencias["abrir"].append(time.perf_counter() - inicio)
+        if lidos != conteudo:
+            falhas.append(f"{chave}: bytes lidos diferentes dos salvos")
+
+    for chave in chaves:
+        inicio = time.perf_counter()
+        await armazenamento.remover(chave)
+        latencias["remover"].append(time.perf_counter() - inicio)
+    for chave in chaves[:3]:
+        try:
+            await asyncio.to_thread(_ler, armazenamento, chave)
+            falhas.append(f"{chave} ainda abre depois de remover")
+        except Exception:
+            pass
+
+    resultado = {}
+    for operacao, valores in latencias.items():
+        resultado[f"{operacao}_p50_ms"], resultado[f"{operacao}_p95_ms"] = _percentis(valores)
+    return resultado, falhas
+
+
+def _ler(armazenamento, chave: str) -> bytes:
+    with armazenamento.abrir(chave) as arquivo:
+        return arquivo.read()
+
+
+def imprimir(resultados: dict) -> None:
+    colunas = ("salvar_p50_ms", "salvar_p95_ms", "abrir_p50_ms", "abrir_p95_ms", "remover_p50_ms", "conferencias")
+    print(f"\n{'backend':<10}" + "".join(f"{c:>16}" for c in colunas))
+    for nome, dados in resultados.items():
+        if "erro" in dados:
+            print(f"{nome:<10}  indisponível: {dados['erro']}")
+            continue
+        print(f"{nome:<10}" + "".join(f"{dados.get(c, ''):>16}" for c in colunas))
+        for falha in dados.get("falhas", []):
+            print(f"{'':<10}  falhou: {falha}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Conferência e latência dos backends de armazenamento de PDFs")
+    parser.add_argument("--arquivos", type=int, default=20)
+    parser.add_argument("--tamanho-kb", type=int, default=512, help="tamanho de cada PDF sintético")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    args = parser.parse_args(argv)
+
+    from benchmarks.run import _preparar_ambiente
+    _preparar_ambiente()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    # Conteúdos distintos (chaves distintas) com cabeçalho de PDF
+    conteudos = [b"%PDF-1.4\n" + os.urandom(args.tamanho_kb * 1024) for _ in range(args.arquivos)]
+    print(f"{args.arquivos} arquivos de {args.tamanho_kb} KB")
+
+    resultados, falhou = {}, False
+    for backend in args.backends.split(","):
+        print(f"  {backend}...", flush=True)
+        with ExitStack() as pilha:
+            try:
+                armazenamento = abrir(backend, pilha)
+                dados, falhas = asyncio.run(avaliar(armazenamento, conteudos))
+            except Exception as e:
+                resultados[backend] = {"erro": str(e).splitlines()[0] if str(e) else type(e).__name__}
+                continue
+        dados["conferencias"] = "ok" if not falhas else f"{len(falhas)} falhas"
+        dados["falhas"] = falhas
+        resultados[backend] = dados
+        falhou = falhou or bool(falhas)
+    imprimir(resultados)
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
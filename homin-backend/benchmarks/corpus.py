@@ -0,0 +1,101 @@
+"""Corpus sintético de PDFs (gerados à mão, sem dependências) para o benchmark de ingestão e busca."""
+import os
+import random
+
+_TEMAS = [
+    "próstata", "hipertensão", "diabetes", "colesterol", "saúde mental", "tabagismo",
+    "alcoolismo", "atividade física", "alimentação", "sono", "câncer de pênis", "infarto",
+    "obesidade", "testosterona", "infecções sexualmente transmissíveis", "vacinação",
+]
+
+_FRASES = [
+    "O acompanhamento de {tema} deve ser feito na atenção primária com consultas regulares.",
+    "Homens acima de 40 anos devem conversar com o médico sobre {tema} e exames de rotina.",
+    "Os principais sinais de alerta relacionados a {tema} incluem cansaço, dor e alterações no peso.",
+    "A prevenção de {tema} envolve hábitos saudáveis, exercícios e redução do estresse.",
+    "O tratamento de {tema} pode combinar medicamentos, mudanças no estilo de vida e terapia.",
+    "A unidade básica de saúde oferece orientação gratuita sobre {tema} para toda a população.",
+]
+
+
+def _texto_ascii(texto: str) -> str:
+    # Fonte Type1 padrão só garante ASCII; o texto sintético não precisa de acentos
+    import unicodedata
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+def _escapar(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def escrever_pdf(caminho: str, paginas: list[list[str]]) -> None:
+    """Escreve um PDF mínimo válido (uma fonte, texto simples, uma lista de linhas por página)"""
+    objetos: list[bytes] = []
+    n_paginas = len(paginas)
+    ids_paginas = [4 + 2 * i for i in range(n_paginas)]
+
+    objetos.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{i} 0 R" for i in ids_paginas)
+    objetos.append(f"<< /Type /Pages /Kids [{kids}] /Count {n_paginas} >>".encode())
+    objetos.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for indice, linhas in enumerate(paginas):
+        id_conteudo = ids_paginas[indice] + 1
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {id_conteudo} 0 R >>".encode()
+        )
+        comandos = ["BT", "/F1 10 Tf", "12 TL", "40 800 Td"]
+        for linha in linhas:
+            comandos.append(f"({_escapar(_texto_ascii(linha))}) Tj T*")
+        comandos.append("ET")
+        fluxo = "\n".join(comandos).encode("latin-1")
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(fluxo) + fluxo + b"\nendstream")
+
+    saida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for numero, corpo in enumerate(objetos, start=1):
+        offsets.append(len(saida))
+        saida += f"{numero} 0 obj\n".encode() + corpo + b"\nendobj\n"
+
+    inicio_xref = len(saida)
+    saida += f"xref\n0 {len(objetos) + 1}\n".encode()
+    saida += b"0000000000 65535 f \n"
+    for offset in offsets:
+        saida += f"{offset:010d} 00000 n \n".encode()
+    saida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(saida)
+
+
+def gerar_corpus(pasta: str, documentos: int = 20, paginas_por_documento: int = 8, semente: int = 42) -> list[str]:
+    """Gera `documentos` PDFs determinísticos em `pasta` e retorna os caminhos"""
+    os.makedirs(pasta, exist_ok=True)
+    aleatorio = random.Random(semente)
+    caminhos = []
+
+    for indice in range(documentos):
+        paginas = []
+        for _ in range(paginas_por_documento):
+            tema = aleatorio.choice(_TEMAS)
+            linhas = [aleatorio.choice(_FRASES).format(tema=tema) for _ in range(50)]
+            paginas.append(linhas)
+
+        caminho = os.path.join(pasta, f"guia_sintetico_{indice:03d}.pdf")
+        escrever_pdf(caminho, paginas)
+        caminhos.append(caminho)
+
+    return caminhos
+
+
+def perguntas_do_corpus(quantidade: int, semente: int = 7) -> list[str]:
+    """Perguntas sobre os temas do corpus (misturando algumas sociais)"""
+    aleatorio = random.Random(semente)
+    perguntas = []
+    for indice in range(quantidade):
+        if indice % 10 == 0:
+            perguntas.append("oi, tudo bem?")
+        else:
+            perguntas.append(f"Como funciona a prevenção de {aleatorio.choice(_TEMAS)}?")
+    return perguntas
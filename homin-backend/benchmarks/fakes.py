@@ -0,0 +1,220 @@
+"""
+Fakes locais e determinísticos para rodar o benchmark sem OpenAI, Auth0 ou DuckDuckGo.
+
+Os patches são aplicados nas classes (ChatOpenAI, OpenAIEmbeddings, Agent) e no
+requests.get, então valem para qualquer módulo da aplicação que as use.
+"""
+import time
+import base64
+import asyncio
+import hashlib
+import math
+from types import SimpleNamespace
+from unittest import mock
+
+DIMENSOES_FAKE = 256
+
+
+class Latencias:
+    """Latências simuladas (em segundos) de cada serviço externo"""
+
+    def __init__(self, llm=0.4, embedding=0.05, busca_web=1.5, jwks=0.05):
+        self.llm = llm
+        self.embedding = embedding
+        self.busca_web = busca_web
+        self.jwks = jwks
+
+    def para_dict(self) -> dict:
+        return vars(self).copy()
+
+
+# ========== EMBEDDINGS ==========
+
+def vetor_deterministico(texto: str) -> list[float]:
+    """Hashing de palavras: textos parecidos geram vetores próximos, sempre iguais entre execuções"""
+    vetor = [0.0] * DIMENSOES_FAKE
+    for palavra in texto.lower().split():
+        digest = hashlib.md5(palavra.encode("utf-8")).digest()
+        indice = int.from_bytes(digest[:4], "little") % DIMENSOES_FAKE
+        vetor[indice] += 1.0 if digest[4] % 2 else -1.0
+    norma = math.sqrt(sum(v * v for v in vetor)) or 1.0
+    return [v / norma for v in vetor]
+
+
+def _fakes_embeddings(latencias: Latencias) -> dict:
+    def embed_documents(self, texts, chunk_size=0):
+        time.sleep(latencias.embedding)
+        return [vetor_deterministico(t) for t in texts]
+
+    def embed_query(self, text):
+        time.sleep(latencias.embedding)
+        return vetor_deterministico(text)
+
+    async def aembed_documents(self, texts, chunk_size=0):
+        await asyncio.sleep(latencias.embedding)
+        return [vetor_deterministico(t) for t in texts]
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(latencias.embedding)
+        return vetor_deterministico(text)
+
+    return {
+        "embed_documents": embed_documents,
+        "embed_query": embed_query,
+        "aembed_documents": aembed_documents,
+        "aembed_query": aembed_query,
+    }
+
+
+# ========== LLM (langchain) ==========
+
+def _classificar(texto: str) -> str:
+    palavras = set(texto.lower().replace(",", " ").replace("!", " ").split())
+    if palavras & {"oi", "olá", "obrigado", "tchau"}:
+        return "SOCIAL"
+    return "MEDICA"
+
+
+def _fake_chat(latencias: Latencias):
+    from langchain_core.messages import AIMessage
+
+    # Imita o cache de prompt do provedor: mensagem de sistema já vista conta como lida do cache
+    prefixos_vistos = set()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        await asyncio.sleep(latencias.llm)
+        tokens_entrada = max(1, len(str(input)) // 4)
+        tokens_cache = 0
+        if isinstance(input, list) and getattr(input[0], "type", None) == "system":
+            chave = (self.model_name, input[0].content)
+            if chave in prefixos_vistos:
+                tokens_cache = len(input[0].content) // 4
+            prefixos_vistos.add(chave)
+        # O classificador manda as instruções como mensagem de sistema e a pergunta por último
+        if isinstance(input, list) and "classificador" in str(input[0]).lower():
+            conteudo = _classificar(input[-1].content)
+        else:
+            conteudo = "Resposta simulada do benchmark sobre saúde do homem."
+        return AIMessage(
+            content=conteudo,
+            usage_metadata={
+                "input_tokens": tokens_entrada,
+                "output_tokens": len(conteudo) // 4,
+                "total_tokens": tokens_entrada + len(conteudo) // 4,
+                "input_token_details": {"cache_read": tokens_cache},
+            },
+        )
+
+    return ainvoke
+
+
+# ========== AGENTES (agno) ==========
+
+def _fake_agente(latencias: Latencias):
+    from agno.run.agent import RunEvent
+
+    def _eh_classificador(agente) -> bool:
+        return "classificador" in str(getattr(agente, "instructions", "")).lower()
+
+    async def _completo(agente, entrada):
+        await asyncio.sleep(latencias.llm if _eh_classificador(agente) else latencias.busca_web)
+        conteudo = _classificar(str(entrada)) if _eh_classificador(agente) else (
+            "Resultado simulado da web sobre saúde do homem. Fonte: https://exemplo.org/saude"
+        )
+        return SimpleNamespace(content=conteudo, metrics=SimpleNamespace(input_tokens=50, output_tokens=5))
+
+    async def _stream(agente, entrada):
+        resultado = await _completo(agente, entrada)
+        for pedaco in resultado.content.split(". "):
+            yield SimpleNamespace(event=RunEvent.run_content.value, content=pedaco + ". ")
+
+    def arun(self, input, *args, stream=False, **kwargs):
+        if stream:
+            return _stream(self, input)
+        return _completo(self, input)
+
+    return arun
+
+
+# ========== AUTH0 (JWKS) ==========
+
+class FakeAuth0:
+    """Par de chaves RSA local: publica o JWKS fake e assina tokens aceitos por verify_jwt"""
+
+    KID = "benchmark"
+
+    def __init__(self, dominio: str, audience: str):
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.hazmat.primitives import serialization
+
+        self.dominio = dominio
+        self.audience = audience
+        chave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.chave_privada_pem = chave.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode()
+        numeros = chave.public_key().public_numbers()
+        self.jwks = {"keys": [{
+            "kty": "RSA",
+            "kid": self.KID,
+            "use": "sig",
+            "alg": "RS256",
+            "n": self._b64(numeros.n),
+            "e": self._b64(numeros.e),
+        }]}
+
+    @staticmethod
+    def _b64(numero: int) -> str:
+        dados = numero.to_bytes((numero.bit_length() + 7) // 8, "big")
+        return base64.urlsafe_b64encode(dados).rstrip(b"=").decode()
+
+    def emitir_token(self, indice_usuario: int, permissoes=("chat:access", "admin:documents")) -> str:
+        from jose import jwt
+
+        agora = int(time.time())
+        claims = {
+            "sub": f"benchmark|{indice_usuario}",
+            "email": f"usuario{indice_usuario}@benchmark.local",
+            "name": f"Usuario Benchmark {indice_usuario}",
+            "aud": self.audience,
+            "iss": f"https://{self.dominio}/",
+            "iat": agora,
+            "exp": agora + 3600,
+            "permissions": list(permissoes),
+        }
+        return jwt.encode(claims, self.chave_privada_pem, algorithm="RS256", headers={"kid": self.KID})
+
+
+def _fake_requests_get(auth0: FakeAuth0, latencias: Latencias, get_original):
+    def get(url, *args, **kwargs):
+        if url.endswith("/.well-known/jwks.json"):
+            time.sleep(latencias.jwks)
+            return SimpleNamespace(status_code=200, json=lambda: auth0.jwks)
+        return get_original(url, *args, **kwargs)
+
+    return get
+
+
+# ========== INSTALAÇÃO ==========
+
+def instalar_fakes(latencias: Latencias, auth0: FakeAuth0) -> SimpleNamespace:
+    """Aplica todos os fakes e devolve um patcher; chame .stop() para desfazer"""
+    import requests
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from agno.agent import Agent
+
+    patches = [
+        mock.patch.object(ChatOpenAI, "ainvoke", _fake_chat(latencias)),
+        mock.patch.object(Agent, "arun", _fake_agente(latencias)),
+        mock.patch.object(requests, "get", _fake_requests_get(auth0, latencias, requests.get)),
+    ]
+    patches += [
+        mock.patch.object(OpenAIEmbeddings, nome, funcao)
+        for nome, funcao in _fakes_embeddings(latencias).items()
+    ]
+
+    for patch in patches:
+        patch.start()
+    return SimpleNamespace(stop=lambda: [p.stop() for p in reversed(patches)])
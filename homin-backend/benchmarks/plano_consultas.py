@@ -0,0 +1,158 @@
+"""
+Verificação de regressão dos planos de consulta das rotas de conversa (roda contra um Postgres local).
+
+Popula dados sintéticos dentro de uma transação, roda ANALYZE + EXPLAIN nas consultas quentes e
+confere se o planner usa os índices compostos esperados. No fim faz ROLLBACK: nada fica no banco.
+
+Uso (a partir de homin-backend/, com o banco migrado via `alembic upgrade head`):
+
+    python -m benchmarks.plano_consultas            # sai com código 1 se algum plano regredir
+    python -m benchmarks.plano_consultas --escala 5
+"""
+import sys
+import json
+import asyncio
+import argparse
+from datetime import date
+from sqlalchemy import text
+
+# Cada consulta espelha o caminho de acesso de uma rota; o índice esperado vem das migrações
+CONSULTAS = {
+    "chat_with_ai: últimas mensagens da conversa": (
+        """
+        SELECT * FROM historico_mensagem
+        WHERE id_conversa = :id_conversa
+        ORDER BY data_hora DESC LIMIT 10
+        """,
+        "ix_historico_mensagem_conversa_data_hora",
+    ),
+    "obter_conversa_com_historico: página de mensagens (keyset)": (
+        """
+        SELECT * FROM historico_mensagem
+        WHERE id_conversa = :id_conversa
+          AND (data_hora, id_historico) < (now(), 9223372036854775807)
+        ORDER BY data_hora DESC, id_historico DESC LIMIT 101
+        """,
+        "ix_historico_mensagem_conversa_data_hora",
+    ),
+    "listar_conversas: página de conversas (keyset)": (
+        """
+        SELECT * FROM conversas
+        WHERE id_usuario = :id_usuario
+          AND (data_ultima_msg, id_conversa) < (now(), 9223372036854775807)
+        ORDER BY data_ultima_msg DESC, id_conversa DESC LIMIT 51
+        """,
+        "ix_conversas_usuario_ultima_msg",
+    ),
+    "buscar_no_historico: busca textual nas mensagens do usuário": (
+        """
+        SELECT id_historico, ts_rank_cd(mensagem_tsv, websearch_to_tsquery('portugues_unaccent', 'hipertensão')) AS relevancia
+        FROM historico_mensagem
+        WHERE id_usuario = :id_usuario
+          AND mensagem_tsv @@ websearch_to_tsquery('portugues_unaccent', 'hipertensão')
+        ORDER BY relevancia DESC, id_historico DESC LIMIT 51
+        """,
+        "ix_historico_mensagem_tsv",
+    ),
+}
+
+SQL_SEMENTE = [
+    """
+    INSERT INTO usuarios (id_usuario, nome, email, role, data_cadastro)
+    SELECT gen_random_uuid(), 'Plano ' || g, 'plano' || g || '@plano.local', 'user', now()
+    FROM generate_series(1, :usuarios) g
+    """,
+    """
+    INSERT INTO conversas (id_usuario, titulo, data_inicio, data_ultima_msg)
+    SELECT u.id_usuario, 'plano', now(), now() - random() * interval '90 days'
+    FROM usuarios u CROSS JOIN generate_series(1, :conversas_por_usuario)
+    WHERE u.email LIKE 'plano%@plano.local'
+    """,
+    """
+    INSERT INTO historico_mensagem (id_conversa, id_usuario, mensagem_texto, tipo, origem_contexto, data_hora)
+    SELECT c.id_conversa, c.id_usuario, 'mensagem ' || g, CASE WHEN g % 2 = 0 THEN 'user' ELSE 'assistant' END,
+           'none', c.data_ultima_msg - g * interval '1 minute'
+    FROM conversas c CROSS JOIN generate_series(1, :mensagens_por_conversa) g
+    WHERE c.titulo = 'plano'
+    """,
+]
+
+
+def _nos_do_plano(no: dict):
+    yield no
+    for filho in no.get("Plans", []):
+        yield from _nos_do_plano(filho)
+
+
+async def indices_equivalentes(conexao, indice: str) -> set[str]:
+    """O índice e os índices das partições anexados a ele (historico_mensagem é particionada)"""
+    resultado = await conexao.execute(text("""
+        SELECT filho.relname FROM pg_inherits i
+        JOIN pg_class filho ON filho.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:indice)
+    """), {"indice": indice})
+    return {indice, *resultado.scalars()}
+
+
+def usa_indice(plano: dict, indices: set[str]) -> bool:
+    return any(
+        no.get("Index Name") in indices and no["Node Type"] in ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+        for no in _nos_do_plano(plano["Plan"])
+    )
+
+
+def resumo_do_plano(plano: dict) -> str:
+    return " > ".join(
+        f"{no['Node Type']}" + (f" ({no['Index Name']})" if "Index Name" in no else "")
+        for no in _nos_do_plano(plano["Plan"])
+    )
+
+
+async def verificar(escala: int) -> int:
+    from app.database.config import async_engine
+    from app.services.partition_service import criar_particoes, somar_meses
+
+    falhas = 0
+    async with async_engine.connect() as conexao:
+        transacao = await conexao.begin()
+        try:
+            # A semente espalha mensagens pelos últimos ~90 dias
+            hoje = date.today().replace(day=1)
+            await criar_particoes(conexao, somar_meses(hoje, -4), hoje)
+
+            parametros = {"usuarios": 50 * escala, "conversas_por_usuario": 40, "mensagens_por_conversa": 20 * escala}
+            for sql in SQL_SEMENTE:
+                await conexao.execute(text(sql), parametros)
+            await conexao.execute(text("ANALYZE usuarios, conversas, historico_mensagem"))
+
+            alvo = (await conexao.execute(text(
+                "SELECT c.id_conversa, c.id_usuario FROM conversas c WHERE c.titulo = 'plano' LIMIT 1"
+            ))).one()
+            valores = {"id_conversa": alvo.id_conversa, "id_usuario": alvo.id_usuario}
+
+            for nome, (sql, indice) in CONSULTAS.items():
+                resultado = await conexao.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), valores)
+                plano = resultado.scalar()
+                plano = (json.loads(plano) if isinstance(plano, str) else plano)[0]
+                ok = usa_indice(plano, await indices_equivalentes(conexao, indice))
+                falhas += 0 if ok else 1
+                print(f"{'OK  ' if ok else 'FALHA'} {nome}\n      esperado: {indice}\n      plano: {resumo_do_plano(plano)}")
+        finally:
+            await transacao.rollback()
+
+    await async_engine.dispose()
+    return falhas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Confere o uso de índices nas consultas de conversa")
+    parser.add_argument("--escala", type=int, default=1, help="multiplica o volume de dados sintéticos")
+    args = parser.parse_args(argv)
+
+    falhas = asyncio.run(verificar(args.escala))
+    print(f"\n{len(CONSULTAS) - falhas}/{len(CONSULTAS)} consultas usando o índice esperado")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Comparação dos backends da base vetorial (app/services/vector_store): recall@k e latência de busca.
+
+Usa vetores sintéticos normalizados e agrupados (como embeddings de chunks de poucos documentos) e
+compara cada backend com o top-k exato calculado em NumPy, sem e com filtro de metadados (metade dos
+itens "inativos"). Nada toca a base da aplicação: Chroma e NumPy gravam num diretório temporário e o
+pgvector usa uma tabela própria, apagada no fim.
+
+Variantes compactas do backend numpy têm o nome montado por partes: numpy_<float16|int8>_d<dimensões>_r<fator
+de reordenação>, ex. numpy_int8_d512 ou numpy_float16_r0 (r0 = sem reordenar e sem guardar os float32).
+`--quantizacao` roda a grade GRADE_QUANTIZACAO; a coluna memoria_mb é a matriz varrida em cada busca.
+
+Uso (a partir de homin-backend/; pgvector precisa de DATABASE_URL com a extensão `vector` disponível):
+
+    python -m benchmarks.vetores
+    python -m benchmarks.vetores --n 20000 --dim 1536 --backends numpy,numpy_hnsw,pgvector
+    python -m benchmarks.vetores --quantizacao --vetores app/banco_de_dados/numpy/documentos/vetores-<v>.npy
+
+Com `--vetores` (matriz .npy de embeddings reais, como a gravada pelo backend numpy) as consultas são
+linhas separadas do próprio corpus, que ficam fora do índice.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+BACKENDS = ("chroma", "pgvector", "numpy", "numpy_hnsw")
+GRADE_QUANTIZACAO = (
+    "numpy", "numpy_float16", "numpy_int8", "numpy_d512", "numpy_d256",
+    "numpy_int8_d512", "numpy_int8_d256", "numpy_int8_r0", "numpy_int8_d256_r0",
+)
+FILTRO = {"ativo": True}
+
+
+def gerar_dados(n: int, dim: int, consultas: int, grupos: int, semente: int):
+    gerador = np.random.default_rng(semente)
+    # Variância decrescente por dimensão, como nos modelos treinados para truncamento (text-embedding-3):
+    # sem isso o truncamento parece bem pior do que é com embeddings reais
+    perfil = (1 / np.sqrt(1 + np.arange(dim) / 32)).astype(np.float32)
+    centros = gerador.standard_normal((grupos, dim)).astype(np.float32) * perfil
+    rotulos = gerador.integers(0, grupos, n)
+    vetores = centros[rotulos] + 0.6 * gerador.standard_normal((n, dim)).astype(np.float32) * perfil
+    vetores /= np.linalg.norm(vetores, axis=1, keepdims=True)
+
+    # Consultas perto de itens existentes, como uma pergunta parecida com um trecho do PDF
+    origem = gerador.integers(0, n, consultas)
+    ruido = gerador.standard_normal((consultas, dim)).astype(np.float32) / np.sqrt(dim)
+    perguntas = vetores[origem] + 0.7 * ruido
+    perguntas /= np.linalg.norm(perguntas, axis=1, keepdims=True)
+
+    return vetores, perguntas
+
+
+def carregar_vetores(caminho: str, consultas: int, semente: int):
+    vetores = np.load(caminho).astype(np.float32)
+    vetores /= np.maximum(np.linalg.norm(vetores, axis=1, keepdims=True), 1e-12)
+    np.random.default_rng(semente).shuffle(vetores)
+    return vetores[consultas:], vetores[:consultas]
+
+
+def top_k_exato(vetores: np.ndarray, perguntas: np.ndarray, k: int, mascara: np.ndarray | None = None) -> list[set]:
+    scores = perguntas @ vetores.T
+    if mascara is not None:
+        scores[:, ~mascara] = -np.inf
+    return [set(np.argpartition(-linha, k - 1)[:k].tolist()) for linha in scores]
+
+
+def _tamanho_pasta(pasta: str) -> int:
+    return sum(os.path.getsize(os.path.join(raiz, nome)) for raiz, _, nomes in os.walk(pasta) for nome in nomes)
+
+
+def opcoes_numpy(backend: str) -> dict:
+    """numpy_int8_d512_r2 -> {"quantizacao": "int8", "dimensoes": 512, "reordenar": 2}"""
+    opcoes = {}
+    for parte in backend.split("_")[1:]:
+        if parte in ("float16", "int8"):
+            opcoes["quantizacao"] = parte
+        elif parte[0] == "d" and parte[1:].isdigit():
+            opcoes["dimensoes"] = int(parte[1:])
+        elif parte[0] == "r" and parte[1:].isdigit():
+            opcoes["reordenar"] = int(parte[1:])
+        elif parte == "hnsw":
+            opcoes["hnsw"] = True
+        else:
+            raise ValueError(f"parte desconhecida no nome da variante: {parte}")
+    return opcoes
+
+
+def abrir(backend: str, pasta: str):
+    """Índice novo e vazio do backend + função que devolve o tamanho ocupado em bytes"""
+    nome = f"bench_vetores_{os.getpid()}"
+    if backend == "chroma":
+        from app.services.vector_store.chroma import IndiceChroma
+        return IndiceChroma(nome, pasta), lambda indice: _tamanho_pasta(pasta)
+    if backend == "pgvector":
+        from sqlalchemy import text
+        from app.services.vector_store.pgvector import IndicePgvector
+
+        def tamanho(indice):
+            with indice._engine.connect() as conexao:
+                return conexao.scalar(text("SELECT pg_total_relation_size(:t)"), {"t": indice.tabela})
+        return IndicePgvector(nome), tamanho
+    if backend.split("_")[0] == "numpy":
+        from app.services.vector_store.numpy_index import IndiceNumpy, hnswlib
+        opcoes = opcoes_numpy(backend)
+        if opcoes.get("hnsw") and hnswlib is None:
+            raise RuntimeError("hnswlib não instalado")
+        return IndiceNumpy(nome, pasta, **opcoes), lambda indice: _tamanho_pasta(pasta)
+    raise ValueError(backend)
+
+
+def descartar(backend: str, indice) -> None:
+    if backend == "pgvector":
+        from sqlalchemy import text
+        with indice._engine.begin() as conexao:
+            conexao.execute(text(f"DROP TABLE IF EXISTS {indice.tabela}"))
+
+
+def medir_buscas(indice, perguntas: np.ndarray, k: int, verdade: list[set], filtro=None) -> dict:
+    latencias, acertos = [], 0
+    for pergunta, esperados in zip(perguntas, verdade):
+        inicio = time.perf_counter()
+        resultados = indice.buscar(pergunta.tolist(), k, filtro)
+        latencias.append(time.perf_counter() - inicio)
+        acertos += len({doc.metadata["posicao"] for doc, _ in resultados} & esperados)
+    latencias.sort()
+    return {
+        "recall": round(acertos / (len(verdade) * k), 4),
+        "p50_ms": round(latencias[len(latencias) // 2] * 1000, 2),
+        "p95_ms": round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000, 2),
+    }
+
+
+def avaliar(backend: str, vetores, perguntas, args, verdade, verdade_filtrada) -> dict:
+    pasta = tempfile.mkdtemp(prefix=f"homin-vetores-{backend}-")
+    indice = None
+    try:
+        indice, tamanho = abrir(backend, pasta)
+        ids = [f"item-{i}" for i in range(len(vetores))]
+        metadados = [{"posicao": i, "id_documento": str(i % 100), "ativo": bool(i % 2 == 0)} for i in range(len(vetores))]
+        textos = [f"chunk {i}" for i in range(len(vetores))]
+
+        inicio = time.perf_counter()
+        for comeco in range(0, len(ids), args.lote):
+            fim = comeco + args.lote
+            indice.inserir(ids[comeco:fim], vetores[comeco:fim].tolist(), textos[comeco:fim], metadados[comeco:fim])
+        insercao = time.perf_counter() - inicio
+
+        # Primeira busca abre arquivos/conexão: fica fora da medição
+        indice.buscar(perguntas[0].tolist(), args.k)
+        sem_filtro = medir_buscas(indice, perguntas, args.k, verdade)
+        com_filtro = medir_buscas(indice, perguntas, args.k, verdade_filtrada, FILTRO)
+        return {
+            "insercao_s": round(insercao, 2),
+            "recall": sem_filtro["recall"], "p50_ms": sem_filtro["p50_ms"], "p95_ms": sem_filtro["p95_ms"],
+            "recall_filtro": com_filtro["recall"], "p50_filtro_ms": com_filtro["p50_ms"],
+            "memoria_mb": round(indice.memoria_busca() / 1024 / 1024, 1) if hasattr(indice, "memoria_busca") else "",
+            "disco_mb": round(tamanho(indice) / 1024 / 1024, 1),
+        }
+    finally:
+        if indice is not None:
+            descartar(backend, indice)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def imprimir(resultados: dict) -> None:
+    colunas = ("insercao_s", "recall", "p50_ms", "p95_ms", "recall_filtro", "p50_filtro_ms", "memoria_mb", "disco_mb")
+    print(f"\n{'backend':<20}" + "".join(f"{c:>14}" for c in colunas))
+    for nome, dados in resultados.items():
+        if "erro" in dados:
+            print(f"{nome:<20}  indisponível: {dados['erro']}")
+            continue
+        print(f"{nome:<20}" + "".join(f"{dados.get(c, ''):>14}" for c in colunas))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Recall e latência dos backends da base vetorial")
+    parser.add_argument("--n", type=int, default=5000, help="vetores indexados")
+    parser.add_argument("--dim", type=int, default=1536, help="dimensão (text-embedding-3-small: 1536)")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--grupos", type=int, default=40, help="agrupamentos nos dados sintéticos")
+    parser.add_argument("--lote", type=int, default=500, help="itens por chamada de inserir")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--quantizacao", action="store_true", help="roda a grade de variantes compactas do numpy")
+    parser.add_argument("--vetores", metavar="NPY", help="embeddings reais no lugar dos sintéticos")
+    args = parser.parse_args(argv)
+
+    from benchmarks.run import _preparar_ambiente
+    _preparar_ambiente()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    if args.vetores:
+        vetores, perguntas = carregar_vetores(args.vetores, args.consultas, args.semente)
+    else:
+        vetores, perguntas = gerar_dados(args.n, args.dim, args.consultas, args.grupos, args.semente)
+    ativos = np.arange(len(vetores)) % 2 == 0
+    verdade = top_k_exato(vetores, perguntas, args.k)
+    verdade_filtrada = top_k_exato(vetores, perguntas, args.k, ativos)
+    print(f"{len(vetores)} vetores x {vetores.shape[1]} dimensões, {len(perguntas)} consultas, k={args.k}")
+
+    resultados = {}
+    for backend in GRADE_QUANTIZACAO if args.quantizacao else args.backends.split(","):
+        print(f"  {backend}...", flush=True)
+        try:
+            resultados[backend] = avaliar(backend, vetores, perguntas, args, verdade, verdade_filtrada)
+        except Exception as e:
+            resultados[backend] = {"erro": str(e).splitlines()[0] if str(e) else type(e).__name__}
+    imprimir(resultados)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())